@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from f1_23 import COMMANDS
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ("cv2", "numpy", "tkinter", "PIL", "moviepy")
+# Commands whose startup (up to parsing their arguments) must not load any of HEAVY_MODULES
+LIGHT_COMMANDS = (
+    "start", "match", "audio_offset", "index_library", "index_scenes", "proxy", "sprites", "ingest", "drift_map",
+    "autotune", "render", "render_moviepy", "job_server",
+)
+# GUI tools have no --help; only their import time is measured
+GUI_COMMANDS = ("search_frame", "create_mask")
+
+
+def run_python(args, importtime=False):
+    """Run the Python interpreter with args in the repo directory. Returns (wall-clock ms, stderr, return code)."""
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + args
+    start_time = time.perf_counter()
+    result = subprocess.run(cmd, cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return (time.perf_counter() - start_time) * 1000, result.stderr, result.returncode
+
+
+def parse_importtime(stderr):
+    """
+    Parse the report of python -X importtime.
+
+    Returns:
+    - (dict of top-level import -> cumulative ms, set of the root packages of every imported module)
+    """
+    top_level = {}
+    packages = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        packages.add(name.strip().split(".")[0])
+        if not name.startswith("  "):  # Nested imports are indented by two more spaces per level
+            top_level[name.strip()] = int(cumulative) / 1000
+    return top_level, packages
+
+
+def measure_command(command, repeat):
+    """
+    Measure the startup of one subcommand of f1_23.py (None for the bare f1_23.py) and the import of its module.
+
+    Returns:
+    - Dict with 'startup_ms' (median wall-clock time of '--help', None for GUI tools), 'import_ms'
+      (cumulative import time of the module), 'heavy' (heavy modules loaded at startup) and 'error'
+    """
+    cli_args = ["f1_23.py"] + ([command] if command else []) + ["--help"]
+    module = COMMANDS[command][0] if command else "f1_23"
+    result = {"startup_ms": None, "import_ms": None, "heavy": [], "error": None}
+
+    _, stderr, returncode = run_python(["-c", f"import {module}"], importtime=True)
+    if returncode != 0:
+        result["error"] = stderr.strip().splitlines()[-1]
+        return result
+    top_level, packages = parse_importtime(stderr)
+    result["import_ms"] = top_level.get(module)
+
+    if command not in GUI_COMMANDS:
+        _, stderr, returncode = run_python(cli_args, importtime=True)
+        if returncode != 0:
+            result["error"] = stderr.strip().splitlines()[-1]
+            return result
+        _, packages = parse_importtime(stderr)
+        result["startup_ms"] = statistics.median(run_python(cli_args)[0] for _ in range(repeat))
+    result["heavy"] = sorted(package for package in packages if package in HEAVY_MODULES)
+    return result
+
+
+def check_results(results, baseline, tolerance, slack_ms):
+    """Return a list of regressions: heavy imports in light commands and times above the baseline."""
+    failures = []
+    for name, result in results.items():
+        if result["error"]:
+            continue
+        if name in ("f1_23.py",) + LIGHT_COMMANDS and result["heavy"]:
+            failures.append(f"{name}: startup loads {', '.join(result['heavy'])}")
+        for key in ("startup_ms", "import_ms"):
+            previous = (baseline or {}).get(name, {}).get(key)
+            if previous is not None and result[key] is not None and result[key] > previous * (1 + tolerance) + slack_ms:
+                failures.append(f"{name}: {key} {result[key]:.0f} ms (baseline {previous:.0f} ms)")
+    return failures
+
+
+def main(repeat, baseline_path, save_baseline_path, tolerance, slack_ms):
+    results = {"python": {"startup_ms": statistics.median(run_python(["-c", "pass"])[0] for _ in range(repeat)),
+                          "import_ms": None, "heavy": [], "error": None}}
+    for command in [None] + list(COMMANDS):
+        results[command or "f1_23.py"] = measure_command(command, repeat)
+
+    def milliseconds(value):
+        return "-" if value is None else f"{value:.0f} ms"
+
+    print(f"{'command':<16} {'startup':>9} {'import':>9}  heavy modules loaded")
+    for name, result in results.items():
+        details = f"error: {result['error']}" if result["error"] else ", ".join(result["heavy"])
+        print(f"{name:<16} {milliseconds(result['startup_ms']):>9} {milliseconds(result['import_ms']):>9}  {details}")
+
+    baseline = None
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+    failures = check_results(results, baseline, tolerance, slack_ms)
+
+    if save_baseline_path:
+        with open(save_baseline_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {save_baseline_path}")
+
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure the startup time ('--help') and module import time of every f1_23.py subcommand, "
+                    "and fail if a light command loads OpenCV/NumPy/Tk/PIL/moviepy or a time regressed against a baseline."
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per command; the median startup time is reported.")
+    parser.add_argument("--baseline", default=None, help="Baseline JSON saved earlier with --save_baseline to compare against.")
+    parser.add_argument("--save_baseline", default=None, help="Save the measurements as a baseline JSON.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown relative to the baseline (default: 25%%).")
+    parser.add_argument("--slack_ms", type=float, default=10.0, help="Allowed absolute slowdown on top of the tolerance, for timing noise.")
+
+    args = parser.parse_args()
+
+    sys.exit(main(args.repeat, args.baseline, args.save_baseline, args.tolerance, args.slack_ms))
@@ -0,0 +1,131 @@
+import argparse
+import os
+import time
+import tracemalloc
+import cv2
+import numpy as np
+
+from f1_23_red_scorer import RedScorer
+from f1_23_search_matching_frame import crop_from_top_percentage, gaussian_blur_and_histogram_equalization
+
+
+# --------------- Previous per-frame implementations, kept for comparison ---------------
+
+def previous_red_score(frame, mask_pixels, nearby_penalty_pixels, nearby_penalty_weight):
+    rgb_frame = frame.astype(np.float32) / 255.0
+    r_channel = rgb_frame[:, :, 2]
+    g_channel = rgb_frame[:, :, 1]
+    b_channel = rgb_frame[:, :, 0]
+    distance_to_red = np.sqrt((1.0 - r_channel) ** 2 + g_channel ** 2 + b_channel ** 2)
+    closeness_to_red = 1.0 - (distance_to_red / np.sqrt(3.0))
+    red_dominance = np.clip(r_channel - np.maximum(g_channel, b_channel), 0.0, 1.0)
+    combined_score = (0.4 * closeness_to_red) + (0.6 * red_dominance)
+    in_mask_score = float(np.mean(combined_score[mask_pixels]))
+    nearby_penalty_score = float(np.mean(red_dominance[nearby_penalty_pixels]))
+    return float(np.clip(in_mask_score - (nearby_penalty_weight * nearby_penalty_score), -1.0, 1.0))
+
+
+def previous_preprocess(image):
+    blurred_image = cv2.GaussianBlur(image, (5, 5), 0)
+    ycrcb_image = cv2.cvtColor(blurred_image, cv2.COLOR_BGR2YCrCb)
+    y_channel, cr_channel, cb_channel = cv2.split(ycrcb_image)
+    merged_channels = cv2.merge((cv2.equalizeHist(y_channel), cr_channel, cb_channel))
+    return cv2.cvtColor(merged_channels, cv2.COLOR_YCrCb2BGR)
+
+
+# --------------- Measurement ---------------
+
+def load_frames(video_path, frame_count):
+    if video_path is None:
+        # Synthetic 1080p frames: smooth noise, like out-of-focus footage
+        rng = np.random.default_rng(0)
+        return [cv2.GaussianBlur(rng.integers(0, 256, (1080, 1920, 3), dtype=np.uint8), (31, 31), 0) for _ in range(frame_count)]
+
+    vid_cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < frame_count:
+        ret, frame = vid_cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    vid_cap.release()
+    return frames
+
+
+def measure(label, process_frame, frames):
+    """Print throughput and the peak memory allocated while processing one frame."""
+    process_frame(frames[0])  # Warm up so lazily allocated buffers are not counted
+    peaks = []
+    tracemalloc.start()
+    for frame in frames:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        process_frame(frame)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    start_time = time.perf_counter()
+    for frame in frames:
+        process_frame(frame)
+    elapsed = time.perf_counter() - start_time
+
+    print(f"{label:<34} {len(frames) / elapsed:8.1f} frames/s   {np.mean(peaks) / 1e6:8.2f} MB allocated per frame")
+
+
+def measure_decode(video_path, frame_count):
+    def decode(reuse_buffer):
+        vid_cap = cv2.VideoCapture(video_path)
+        frame, peaks = None, []
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        for _ in range(frame_count):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            ret, frame = vid_cap.read(frame) if reuse_buffer else vid_cap.read()
+            if not ret:
+                break
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        elapsed = time.perf_counter() - start_time
+        tracemalloc.stop()
+        vid_cap.release()
+        return len(peaks) / elapsed, np.mean(peaks[1:]) / 1e6
+
+    for label, reuse_buffer in (("decode: read() (before)", False), ("decode: read(buffer) (after)", True)):
+        frames_per_second, allocated = decode(reuse_buffer)
+        print(f"{label:<34} {frames_per_second:8.1f} frames/s   {allocated:8.2f} MB allocated per frame")
+
+
+def main(video_path, frame_count):
+    frames = load_frames(video_path, frame_count)
+    if not frames:
+        print("Error: No frames to benchmark.")
+        return
+    frame_height, frame_width = frames[0].shape[:2]
+
+    mask = cv2.imread(os.path.join(os.path.dirname(os.path.abspath(__file__)), "mask.png"), cv2.IMREAD_GRAYSCALE)
+    mask = cv2.resize(mask, (frame_width, frame_height), interpolation=cv2.INTER_NEAREST)
+    mask_pixels = mask > 127
+    dilated_mask = cv2.dilate(mask_pixels.astype(np.uint8) * 255, np.ones((21, 21), dtype=np.uint8)) > 0
+    nearby_penalty_pixels = np.logical_and(dilated_mask, np.logical_not(mask_pixels))
+
+    print(f"{len(frames)} frames of {frame_width}x{frame_height}")
+    measure("red score (before)", lambda frame: previous_red_score(frame, mask_pixels, nearby_penalty_pixels, 0.35), frames)
+    red_scorer = RedScorer(mask_pixels, nearby_penalty_pixels, 0.35)
+    measure("red score (after)", red_scorer.score, frames)
+
+    measure("blur + equalize (before)", lambda frame: previous_preprocess(crop_from_top_percentage(frame, 20, 65)), frames)
+    buffers = {}
+    measure("blur + equalize (after)", lambda frame: gaussian_blur_and_histogram_equalization(crop_from_top_percentage(frame, 20, 65), buffers), frames)
+
+    if video_path is not None:
+        measure_decode(video_path, len(frames))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-frame allocations and throughput of the scanning loops before and after buffer reuse.")
+    parser.add_argument("--video_path", default=None, help="Video to take frames from (default: synthetic 1080p frames). Also benchmarks decoding.")
+    parser.add_argument("--frames", type=int, default=100, help="Number of frames to process.")
+
+    args = parser.parse_args()
+
+    main(args.video_path, args.frames)
@@ -0,0 +1,52 @@
+import argparse
+import time
+import cv2
+
+from f1_23_search_matching_frame import find_most_similar_frame, find_resolution_scale_factor, scale_frame
+
+
+def main(video1_path, video1_time, video2_path, video2_start_time, duration, strides, top_k):
+    scale_factor1, scale_factor2 = find_resolution_scale_factor(video1_path, video2_path)
+    video1, video2 = cv2.VideoCapture(video1_path), cv2.VideoCapture(video2_path)
+    video1.set(cv2.CAP_PROP_POS_FRAMES, int(video1.get(cv2.CAP_PROP_FPS) * video1_time))
+    ret, reference_frame = video1.read()
+    video2_start_frame = int(video2.get(cv2.CAP_PROP_FPS) * video2_start_time)
+    video1.release(), video2.release()
+    if not ret:
+        print("Error reading reference frame of video 1.")
+        return
+    reference_frame = scale_frame(reference_frame, scale_factor1)
+
+    results = []
+    for stride in [0] + strides:
+        start_time = time.perf_counter()
+        frame_number, _, tiles_evaluated, _ = find_most_similar_frame(
+            reference_frame, video2_path, scale_factor2, duration, video2_start_frame,
+            show_progress=False, coarse_stride=stride, coarse_top_k=top_k,
+        )
+        results.append((stride, frame_number, len(tiles_evaluated), time.perf_counter() - start_time))
+
+    _, exhaustive_frame_number, _, exhaustive_time = results[0]
+    print(f"{'search':<22} {'frame':>8} {'full-res frames':>16} {'time':>9} {'speed-up':>9}  same frame")
+    for stride, frame_number, full_resolution_frames, elapsed in results:
+        label = "exhaustive" if stride == 0 else f"pyramid (stride {stride})"
+        same = "yes" if frame_number == exhaustive_frame_number else "NO"
+        print(f"{label:<22} {frame_number:>8} {full_resolution_frames:>16} {elapsed:>8.2f}s {exhaustive_time / elapsed:>8.2f}x  {same}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the temporal pyramid search of find_most_similar_frame against the exhaustive search: "
+                    "both must return the same frame."
+    )
+    parser.add_argument("video1_path", help="Video the reference frame is taken from.")
+    parser.add_argument("video1_time", type=float, help="Time (in seconds) of the reference frame in video 1.")
+    parser.add_argument("video2_path", help="Video that is searched.")
+    parser.add_argument("--video2_start", type=float, default=0, help="Start of the search window in video 2 (in seconds).")
+    parser.add_argument("--duration", type=float, default=60.0, help="Length of the search window (in seconds).")
+    parser.add_argument("--strides", type=int, nargs="+", default=[4, 8, 16], help="Coarse strides to compare.")
+    parser.add_argument("--top_k", type=int, default=3, help="Number of coarse candidates refined at full resolution.")
+
+    args = parser.parse_args()
+
+    main(args.video1_path, args.video1_time, args.video2_path, args.video2_start, args.duration, args.strides, args.top_k)
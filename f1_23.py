@@ -0,0 +1,44 @@
+import argparse
+import runpy
+import sys
+
+# Subcommand -> (module, description). A module is only imported when its subcommand runs, so picking a
+# subcommand never pays for the OpenCV/NumPy/Tk/moviepy imports of the other tools.
+COMMANDS = {
+    "search_frame": ("f1_23_search_frame", "Step through a video, save frames and auto-detect the start lights (GUI)."),
+    "create_mask": ("f1_23_create_image_mask", "Create a mask image by clicking on a frame (GUI)."),
+    "start": ("f1_23_search_start_frame", "Find the start frame of one or more videos."),
+    "match": ("f1_23_search_matching_frame", "Find the earliest mutually matching frames of two videos."),
+    "audio_offset": ("f1_23_search_audio_offset", "Find the offset between two videos from their audio."),
+    "index_library": ("f1_23_index_video_library", "Build or query a perceptual-hash index of a video library."),
+    "index_scenes": ("f1_23_index_scenes", "Build the scene index saved next to each video."),
+    "proxy": ("f1_23_proxy_frames", "Build memory-mapped proxies of downscaled frames."),
+    "sprites": ("f1_23_thumbnail_sprites", "Build the thumbnail sprite sheets of the timeline scrubber."),
+    "ingest": ("f1_23_ingest", "Watch a download directory and pre-analyse new videos."),
+    "drift_map": ("f1_23_drift_map", "Map the drift between two videos over the whole race."),
+    "autotune": ("f1_23_encoder_autotune", "Pick the encoder preset and CRF for a time budget."),
+    "render": ("f1_create_split_screen_video", "Render the split-screen video with ffmpeg."),
+    "render_moviepy": ("f1_23_create_split_screen_video", "Render the split-screen video with moviepy."),
+    "job_server": ("f1_23_job_server", "Run or submit jobs to the local job server."),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Video split screen tools. Run 'f1_23.py COMMAND -h' for the options of a command.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="commands:\n" + "\n".join(f"  {command:<16}{description}" for command, (_, description) in COMMANDS.items()),
+    )
+    parser.add_argument("command", choices=COMMANDS, metavar="COMMAND", help="Tool to run (see below).")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments of the tool.")
+
+    args = parser.parse_args(argv)
+
+    # Run the tool exactly as if its script had been started directly. alter_sys makes the tool the __main__
+    # module for the run, which its process pools need to pickle the functions they run.
+    sys.argv = [sys.argv[0]] + args.args
+    runpy.run_module(COMMANDS[args.command][0], run_name="__main__", alter_sys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import numpy as np
 import tkinter as tk
 from tkinter import filedialog
 from tkinter import messagebox
+from f1_23_mask_indices import save_mask_indices
 
 def initialize_mask(shape):
     """Initialize an empty mask without a border, matching the image shape."""
@@ -10,31 +11,45 @@ def initialize_mask(shape):
     return np.zeros((h, w), np.uint8)
 
 def click_event(event, x, y, flags, param):
-    global mask
     if event == cv2.EVENT_LBUTTONDOWN:
-        # Use the blurred image for the flood fill operation
-        blurred_image_for_floodfill = cv2.GaussianBlur(blurred_image, (5, 5), 0)
-
         # The color of the clicked point is used as a seed.
         seed_point = (x, y)
-        
+
         # Define the maximum difference in color (in BGR space) to be included in the mask
         loDiff = (5, 5, 10, 0)
         upDiff = (5, 5, 10, 0)
-        
-        # Prepare a temporary mask for floodFill with an additional 1-pixel border
-        h, w = blurred_image_for_floodfill.shape[:2]
-        temp_mask = np.zeros((h + 2, w + 2), np.uint8)
-        
-        # Perform floodFill
-        cv2.floodFill(blurred_image_for_floodfill, temp_mask, seed_point, (255, 0, 0), loDiff, upDiff, flags=cv2.FLOODFILL_MASK_ONLY)
-        
-        # Remove the 1-pixel border from the temp_mask and update the global mask
-        temp_mask = temp_mask[1:-1, 1:-1]
-        mask = np.maximum(mask, temp_mask)
-        
-        # Display the updated mask
-        cv2.imshow("Mask", mask * 255)  # Multiply by 255 to make the mask clearly visible
+
+        # Perform floodFill on the precomputed blurred image. flood_mask carries the
+        # 1-pixel border floodFill requires and is kept clear between clicks.
+        _, _, _, rect = cv2.floodFill(blurred_image_for_floodfill, flood_mask, seed_point, (255, 0, 0), loDiff, upDiff, flags=cv2.FLOODFILL_MASK_ONLY)
+        rx, ry, rw, rh = rect
+        if rw == 0 or rh == 0:
+            return
+
+        # Only the bounding box of the filled region changes
+        region = flood_mask[ry + 1:ry + 1 + rh, rx + 1:rx + 1 + rw]
+        mask_region = mask[ry:ry + rh, rx:rx + rw]
+        history.append((rect, mask_region.copy()))
+        np.maximum(mask_region, region, out=mask_region)
+        region[:] = 0
+
+        # Update the displayed mask in place and redraw
+        refresh_display(rect)
+
+def refresh_display(rect):
+    """Redraw the mask display buffer inside rect only."""
+    rx, ry, rw, rh = rect
+    np.multiply(mask[ry:ry + rh, rx:rx + rw], 255, out=mask_display[ry:ry + rh, rx:rx + rw])  # 255 makes the mask clearly visible
+    cv2.imshow("Mask", mask_display)
+
+def undo_last_click():
+    """Restore the mask region changed by the most recent click."""
+    if not history:
+        return
+    rect, previous_region = history.pop()
+    rx, ry, rw, rh = rect
+    mask[ry:ry + rh, rx:rx + rw] = previous_region
+    refresh_display(rect)
 
 def save_mask():
     global mask
@@ -44,29 +59,43 @@ def save_mask():
             # Ensure the mask is in the correct format (255 for white)
             final_mask = (mask * 255).astype(np.uint8)
             cv2.imwrite(save_path, final_mask)
+            save_mask_indices(save_path, mask)
             messagebox.showinfo("Save Mask", "The mask has been saved successfully!")
     else:
         messagebox.showinfo("Save Mask", "No mask to save.")
 
 def create_mask_from_click(image_path):
-    global image, blurred_image, mask
+    global image, blurred_image, blurred_image_for_floodfill, mask, mask_display, flood_mask, history
     image = cv2.imread(image_path)
     if image is None:
         print("Error loading image")
         return
-    
+
     # Apply Gaussian blurring to the original image
     blurred_image = cv2.GaussianBlur(image, (5, 5), 0)
-    
+    # The flood fill runs on a second blur pass; compute it once rather than per click
+    blurred_image_for_floodfill = cv2.GaussianBlur(blurred_image, (5, 5), 0)
+
     # Initialize the mask to match the image dimensions
     mask = initialize_mask(image.shape)
+    mask_display = initialize_mask(image.shape)
+    h, w = image.shape[:2]
+    flood_mask = np.zeros((h + 2, w + 2), np.uint8)
+    # One (rect, previous mask region) entry per click, for undo
+    history = []
 
     # Show the blurred image and set a mouse callback to capture clicks
     cv2.imshow('Blurred Image', blurred_image)
     cv2.setMouseCallback('Blurred Image', click_event)
-    cv2.waitKey(0)
+    print("Click to add a region to the mask. Press 'u' to undo the last click, any other key to finish.")
+    while True:
+        key = cv2.waitKey(0) & 0xFF
+        if key == ord('u'):
+            undo_last_click()
+        else:
+            break
     cv2.destroyAllWindows()
-    
+
     # After closing the image window, ask the user if they want to save the mask
     root = tk.Tk()
     root.withdraw()  # Hide the main window
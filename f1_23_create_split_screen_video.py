@@ -1,10 +1,12 @@
 import argparse
-from moviepy import VideoFileClip
-from moviepy.video.compositing.CompositeVideoClip import clips_array
-from moviepy import vfx
 import multiprocessing
 
 def process_and_combine_videos(left_video_path, left_start_time, right_video_path, right_start_time, output_length=None, output_path="combined_video.mp4"):
+    # moviepy takes long to import, so it is only imported once a render actually starts (not for --help)
+    from moviepy import VideoFileClip
+    from moviepy.video.compositing.CompositeVideoClip import clips_array
+    from moviepy import vfx
+
     # Load the video files and set start times
     left_clip = VideoFileClip(left_video_path).subclipped(left_start_time)
     right_clip = VideoFileClip(right_video_path).subclipped(right_start_time)
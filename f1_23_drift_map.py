@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+SIGNATURE_SIZE = (64, 16)  # Width and height of the downscaled 20-65% crop compared at each checkpoint
+
+
+def video_duration(video_path):
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    cap.release()
+    return frame_count / fps if fps > 0 else 0.0
+
+
+def read_signatures(video_path, start_time, duration):
+    """
+    Decode a short stretch of a video into tiny, contrast-normalized grayscale signatures.
+
+    Returns:
+    - (signatures as an array of shape (frames, height, width), fps)
+    """
+    import cv2
+    import numpy as np
+
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, max(0, int(round(start_time * fps))))
+    frame_count = max(1, int(round(duration * fps)))
+    signatures = np.empty((frame_count, SIGNATURE_SIZE[1], SIGNATURE_SIZE[0]), dtype=np.float32)
+
+    frame, small_frame, gray = None, None, None
+    frames_read = 0
+    while frames_read < frame_count:
+        ret, frame = cap.read(frame)
+        if not ret:
+            break
+        height = frame.shape[0]
+        crop = frame[int(0.2 * height):int(0.65 * height)]
+        small_frame = cv2.resize(crop, SIGNATURE_SIZE, dst=small_frame, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY, dst=gray)
+        signature = signatures[frames_read]
+        signature[:] = gray
+        # Normalize so brightness and contrast differences between the two feeds do not matter
+        signature -= signature.mean()
+        signature /= signature.std() + 1e-6
+        frames_read += 1
+    cap.release()
+    return signatures[:frames_read], fps
+
+
+def analyse_checkpoint(args):
+    """
+    Measure the remaining offset between the two videos around one point of the output.
+
+    Parameters:
+    - args: (left path, left time, right path, expected right time, clip length, search window), times in seconds
+
+    Returns:
+    - (offset in seconds to add to the right video's time, confidence between 0 and 1)
+    """
+    import numpy as np
+
+    left_video_path, left_time, right_video_path, right_time, clip_length, search_window = args
+    left_signatures, left_fps = read_signatures(left_video_path, left_time, clip_length)
+    right_signatures, right_fps = read_signatures(right_video_path, right_time - search_window, clip_length + 2 * search_window)
+    if len(left_signatures) == 0 or len(right_signatures) == 0:
+        return 0.0, 0.0
+
+    # Right frame shown at each left frame's time, for a lag of zero right frames
+    right_indices = np.round(np.arange(len(left_signatures)) * right_fps / left_fps).astype(int)
+    max_lag = len(right_signatures) - 1 - right_indices[-1]
+    if max_lag < 0:
+        return 0.0, 0.0
+    costs = np.array([np.mean(np.abs(left_signatures - right_signatures[right_indices + lag])) for lag in range(max_lag + 1)])
+
+    best_lag = int(np.argmin(costs))
+    # Confidence: how much better the best lag is than the best lag more than two frames away from it
+    distant = np.abs(np.arange(len(costs)) - best_lag) > 2
+    second_best = costs[distant].min() if np.any(distant) else costs[best_lag]
+    confidence = float(1.0 - costs[best_lag] / max(second_best, 1e-6))
+
+    window_start = max(0, int(round((right_time - search_window) * right_fps)))
+    offset = (window_start + best_lag) / right_fps - right_time
+    return offset, confidence
+
+
+def build_segments(checkpoints, duration, frame_duration, min_confidence):
+    """
+    Turn checkpoint measurements into piecewise constant offsets.
+
+    Low-confidence checkpoints keep the previous offset. Offsets are rounded to whole right-video
+    frames, and a new segment starts halfway between two checkpoints whose offsets differ.
+
+    Returns:
+    - List of {"start", "end", "offset"} dicts covering [0, duration)
+    """
+    segments = [{"start": 0.0, "end": duration, "offset": 0.0}]
+    previous_time = 0.0
+    for checkpoint in checkpoints:
+        if checkpoint["confidence"] < min_confidence:
+            continue
+        offset = round(checkpoint["offset"] / frame_duration) * frame_duration
+        if abs(offset - segments[-1]["offset"]) > frame_duration / 2:
+            boundary = (previous_time + checkpoint["time"]) / 2
+            if boundary <= segments[-1]["start"]:
+                # E.g. the first checkpoint at t=0: the whole current segment takes the new offset
+                segments[-1]["offset"] = offset
+            else:
+                segments[-1]["end"] = boundary
+                segments.append({"start": boundary, "end": duration, "offset": offset})
+        previous_time = checkpoint["time"]
+    return segments
+
+
+def build_drift_map(left_video_path, left_start_time, right_video_path, right_start_time, interval, clip_length, search_window, min_confidence, workers, output_length=None):
+    import cv2
+    import numpy as np
+
+    duration = min(video_duration(left_video_path) - left_start_time, video_duration(right_video_path) - right_start_time)
+    if output_length is not None:
+        duration = min(duration, output_length)
+
+    checkpoint_times = list(np.arange(0.0, max(duration - clip_length, 0.0), interval))
+    jobs = [
+        (left_video_path, left_start_time + t, right_video_path, right_start_time + t, clip_length, search_window)
+        for t in checkpoint_times
+    ]
+    print(f"Analysing {len(jobs)} checkpoints every {interval:.0f}s over {duration:.0f}s with {workers} workers...")
+
+    checkpoints = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for t, (offset, confidence) in zip(checkpoint_times, executor.map(analyse_checkpoint, jobs)):
+            checkpoints.append({"time": float(t), "offset": offset, "confidence": confidence})
+            print(f"  {t:8.1f}s  offset {offset:+.3f}s  confidence {confidence:.2f}")
+
+    cap = cv2.VideoCapture(right_video_path)
+    frame_duration = 1.0 / cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+
+    return {
+        "left_video_path": os.path.abspath(left_video_path), "left_start_time": left_start_time,
+        "right_video_path": os.path.abspath(right_video_path), "right_start_time": right_start_time,
+        "checkpoints": checkpoints,
+        "segments": build_segments(checkpoints, duration, frame_duration, min_confidence),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure how the alignment of two videos drifts over a race and write a piecewise offset map "
+                    "for f1_create_split_screen_video.py --drift_map."
+    )
+    parser.add_argument("left_video_path", help="Path to the left video file.")
+    parser.add_argument("left_start_time", type=float, help="Starting time of the left video in seconds, can be a decimal.")
+    parser.add_argument("right_video_path", help="Path to the right video file.")
+    parser.add_argument("right_start_time", type=float, help="Starting time of the right video in seconds, can be a decimal.")
+    parser.add_argument("--output_path", default="drift_map.json", help="Output path for the drift map.")
+    parser.add_argument("--output_length", type=float, default=None, help="Only analyse this many seconds of output.")
+    parser.add_argument("--interval", type=float, default=60.0, help="Seconds between checkpoints.")
+    parser.add_argument("--clip_length", type=float, default=2.0, help="Seconds of video compared at each checkpoint.")
+    parser.add_argument("--search_window", type=float, default=3.0, help="Largest drift (in seconds) searched for at each checkpoint.")
+    parser.add_argument("--min_confidence", type=float, default=0.1, help="Checkpoints below this confidence keep the previous offset.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of checkpoints analysed in parallel.")
+
+    args = parser.parse_args()
+
+    drift_map = build_drift_map(
+        args.left_video_path, args.left_start_time, args.right_video_path, args.right_start_time,
+        args.interval, args.clip_length, args.search_window, args.min_confidence, args.workers, args.output_length,
+    )
+    with open(args.output_path, "w") as f:
+        json.dump(drift_map, f, indent=2)
+
+    print(f"Drift map with {len(drift_map['segments'])} segments saved to {args.output_path}")
+    for segment in drift_map["segments"]:
+        print(f"  {segment['start']:8.1f}s - {segment['end']:8.1f}s  right offset {segment['offset']:+.3f}s")
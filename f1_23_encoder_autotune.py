@@ -0,0 +1,201 @@
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from f1_create_split_screen_video import load_drift_segments, output_duration, single_pass_filter_complex
+
+PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow"]
+
+
+def sample_start_times(final_duration, sample_count, sample_length):
+    """Start times (in output seconds) of sample_count samples spread evenly over the output."""
+    if final_duration <= sample_length:
+        return [0.0]
+    step = (final_duration - sample_length) / sample_count
+    return [step * (i + 0.5) for i in range(sample_count)]
+
+
+def encode_sample(left_video_path, left_time, right_video_path, right_time, sample_length, output_path, codec_args, threads):
+    """
+    Encode one sample of the composited split-screen graph (video only).
+
+    Input seeking keeps samples near the end of a race as cheap as samples near the start.
+
+    Returns:
+    - (wall-clock seconds, CPU seconds)
+    """
+    cmd = [
+        # -benchmark reports the CPU time ffmpeg used, which (unlike wall-clock time) is not inflated
+        # by the other encodes running at the same time
+        "ffmpeg", "-y", "-v", "info", "-nostats", "-benchmark",
+        "-ss", str(left_time), "-i", left_video_path,
+        "-ss", str(right_time), "-i", right_video_path,
+        "-filter_complex", single_pass_filter_complex(0, 0, sample_length, audio_mode="none"),
+        "-map", "[v]", "-an",
+    ] + codec_args + ["-threads", str(threads), output_path]
+
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    bench_match = re.search(r"bench: utime=([\d.]+)s stime=([\d.]+)s rtime=([\d.]+)s", result.stderr)
+    if result.returncode != 0 or bench_match is None:
+        raise RuntimeError(f"Encoding {output_path} failed: {result.stderr[-500:]}")
+    return float(bench_match.group(3)), float(bench_match.group(1)) + float(bench_match.group(2))
+
+
+def measure_quality(encoded_path, reference_path):
+    """
+    Compare an encoded sample against its near-lossless reference with ffmpeg's SSIM and PSNR filters.
+
+    Returns:
+    - (SSIM over all planes, average PSNR in dB)
+    """
+    cmd = [
+        "ffmpeg", "-v", "info", "-nostats",
+        "-i", encoded_path, "-i", reference_path,
+        "-filter_complex", "[0:v]split[e0][e1];[1:v]split[r0][r1];[e0][r0]ssim;[e1][r1]psnr",
+        "-f", "null", "-",
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    ssim_match = re.search(r"SSIM .*All:([\d.]+)", result.stderr)
+    psnr_match = re.search(r"PSNR .*average:([\d.]+|inf)", result.stderr)
+    if result.returncode != 0 or ssim_match is None or psnr_match is None:
+        raise RuntimeError(f"Measuring the quality of {encoded_path} failed: {result.stderr[-500:]}")
+    return float(ssim_match.group(1)), float(psnr_match.group(1))
+
+
+def auto_tune_encoder(
+    left_video_path, left_start_time,
+    right_video_path, right_start_time,
+    time_budget,
+    min_ssim=0.97,
+    min_psnr=None,
+    output_length=None,
+    drift_map_path=None,
+    presets=("veryfast", "fast", "medium", "slow"),
+    crfs=(18, 21, 24),
+    sample_count=3,
+    sample_length=4.0,
+    workers=None,
+):
+    """
+    Encode short samples of the composited split-screen graph at several preset/CRF settings in parallel
+    and pick the slowest preset that still renders the whole output within time_budget seconds and keeps
+    the quality floor. For that preset, the highest CRF (smallest file) that keeps the floor is used.
+
+    The full render time of each setting is estimated from the CPU time of its sample encodes,
+    spread over all cores, so the estimate is not skewed by running the samples side by side.
+
+    Returns:
+    - (chosen setting as a dict with 'preset' and 'crf', list of measurements for every setting)
+    """
+    drift_segments = load_drift_segments(drift_map_path, left_start_time, right_start_time) if drift_map_path else None
+    final_duration = output_duration(left_video_path, left_start_time, right_video_path, right_start_time, output_length, drift_segments)
+    sample_length = min(sample_length, final_duration)
+    sample_times = sample_start_times(final_duration, sample_count, sample_length)
+    sampled_duration = sample_length * len(sample_times)
+
+    cpu_count = os.cpu_count() or 1
+    workers = workers or cpu_count
+    threads = max(1, cpu_count // workers)
+    settings = [(preset, crf) for preset in presets for crf in crfs]
+    print(f"Auto-tuning {len(settings)} settings on {len(sample_times)} x {sample_length:.1f}s samples "
+          f"of a {final_duration:.0f}s output with {workers} parallel encodes...")
+
+    work_dir = tempfile.mkdtemp(prefix="f1_23_autotune_")
+    try:
+        def sample_args(index):
+            return (left_video_path, left_start_time + sample_times[index], right_video_path, right_start_time + sample_times[index], sample_length)
+
+        def encode_reference(index):
+            reference_path = os.path.join(work_dir, f"reference_{index}.mkv")
+            encode_sample(*sample_args(index), reference_path, ["-c:v", "libx264", "-preset", "ultrafast", "-qp", "0"], threads)
+            return reference_path
+
+        def encode_and_measure(job):
+            (preset, crf), index = job
+            encoded_path = os.path.join(work_dir, f"{preset}_{crf}_{index}.mp4")
+            _, cpu_time = encode_sample(*sample_args(index), encoded_path, ["-c:v", "libx264", "-preset", preset, "-crf", str(crf)], threads)
+            ssim, psnr = measure_quality(encoded_path, reference_paths[index])
+            size = os.path.getsize(encoded_path)
+            os.remove(encoded_path)
+            return cpu_time, ssim, psnr, size
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            reference_paths = list(executor.map(encode_reference, range(len(sample_times))))
+            jobs = [(setting, index) for setting in settings for index in range(len(sample_times))]
+            measurements = list(executor.map(encode_and_measure, jobs))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = []
+    for setting_index, (preset, crf) in enumerate(settings):
+        samples = measurements[setting_index * len(sample_times):(setting_index + 1) * len(sample_times)]
+        cpu_time = sum(sample[0] for sample in samples)
+        size = sum(sample[3] for sample in samples)
+        results.append({
+            "preset": preset,
+            "crf": crf,
+            "estimated_seconds": cpu_time / cpu_count * final_duration / sampled_duration,
+            "ssim": min(sample[1] for sample in samples),  # The worst sample decides whether the floor is met
+            "psnr": min(sample[2] for sample in samples),
+            "video_kbps": size * 8 / sampled_duration / 1000,
+        })
+
+    def meets_floor(result):
+        return result["ssim"] >= min_ssim and (min_psnr is None or result["psnr"] >= min_psnr)
+
+    good = [result for result in results if meets_floor(result)]
+    in_budget = [result for result in good if result["estimated_seconds"] <= time_budget]
+    if in_budget:
+        slowest_preset = max(in_budget, key=lambda result: PRESETS.index(result["preset"]))["preset"]
+        chosen = max((result for result in in_budget if result["preset"] == slowest_preset), key=lambda result: result["crf"])
+    elif good:
+        chosen = min(good, key=lambda result: result["estimated_seconds"])
+        print(f"Warning: no setting meets the quality floor within {time_budget:.0f}s; using the fastest one that meets the floor.")
+    else:
+        chosen = max(results, key=lambda result: result["ssim"])
+        print("Warning: no setting meets the quality floor; using the one with the highest SSIM.")
+
+    return {"preset": chosen["preset"], "crf": chosen["crf"]}, results
+
+
+def print_results(results, chosen):
+    print(f"{'preset':<10} {'crf':>4} {'est. time':>10} {'SSIM':>7} {'PSNR':>7} {'video kbps':>11}")
+    for result in results:
+        marker = "  <-" if (result["preset"], result["crf"]) == (chosen["preset"], chosen["crf"]) else ""
+        print(f"{result['preset']:<10} {result['crf']:>4} {result['estimated_seconds']:>9.0f}s {result['ssim']:>7.4f} "
+              f"{result['psnr']:>6.2f} {result['video_kbps']:>11.0f}{marker}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pick the libx264 preset and CRF for f1_create_split_screen_video.py by encoding short samples of the "
+                    "composited video at several settings and measuring speed, size and quality (SSIM/PSNR)."
+    )
+    parser.add_argument("left_video_path", help="Path to the left video file.")
+    parser.add_argument("left_start_time", type=float, help="Starting time of the left video in seconds, can be a decimal.")
+    parser.add_argument("right_video_path", help="Path to the right video file.")
+    parser.add_argument("right_start_time", type=float, help="Starting time of the right video in seconds, can be a decimal.")
+    parser.add_argument("time_budget", type=float, help="Time (in seconds) the full render may take.")
+    parser.add_argument("--min_ssim", type=float, default=0.97, help="Quality floor: lowest acceptable SSIM of any sample.")
+    parser.add_argument("--min_psnr", type=float, default=None, help="Optional quality floor: lowest acceptable PSNR (dB) of any sample.")
+    parser.add_argument("--output_length", type=float, default=None, help="Desired length of the output video in seconds.")
+    parser.add_argument("--drift_map", default=None, help="Drift map from f1_23_drift_map.py, used for the output length.")
+    parser.add_argument("--presets", nargs="+", default=["veryfast", "fast", "medium", "slow"], choices=PRESETS, help="Presets to try.")
+    parser.add_argument("--crfs", type=int, nargs="+", default=[18, 21, 24], help="CRF values to try.")
+    parser.add_argument("--samples", type=int, default=3, help="Number of samples spread over the output.")
+    parser.add_argument("--sample_length", type=float, default=4.0, help="Length of each sample in seconds.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of sample encodes run in parallel (default: one per core).")
+
+    args = parser.parse_args()
+
+    chosen, results = auto_tune_encoder(
+        args.left_video_path, args.left_start_time, args.right_video_path, args.right_start_time, args.time_budget,
+        min_ssim=args.min_ssim, min_psnr=args.min_psnr, output_length=args.output_length, drift_map_path=args.drift_map,
+        presets=args.presets, crfs=args.crfs, sample_count=args.samples, sample_length=args.sample_length, workers=args.workers,
+    )
+    print_results(results, chosen)
+    print(f"Use: --preset {chosen['preset']} --crf {chosen['crf']}")
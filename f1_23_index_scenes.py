@@ -0,0 +1,191 @@
+import argparse
+import os
+
+HISTOGRAM_BINS = 32
+INDEX_SCALE = 0.25  # Frames are analysed at a quarter of their resolution
+SHOT_CUT_THRESHOLD = 0.35  # Bhattacharyya distance between consecutive frames that counts as a cut
+
+
+def default_path(file_name):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name)
+
+
+def scene_index_path(video_path):
+    return f"{video_path}.scenes.npz"
+
+
+def luma_histogram(image):
+    """Normalized luma histogram (sums to 1) of a BGR image."""
+    import cv2
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    histogram = cv2.calcHist([gray], [0], None, [HISTOGRAM_BINS], [0, 256]).ravel()
+    return histogram / max(float(histogram.sum()), 1.0)
+
+
+def histogram_distances(histograms, reference_histogram):
+    """Bhattacharyya distance (0 = identical, 1 = disjoint) between each row of histograms and the reference."""
+    import numpy as np
+
+    coefficients = np.sqrt(histograms) @ np.sqrt(reference_histogram)
+    return np.sqrt(np.clip(1.0 - coefficients, 0.0, 1.0))
+
+
+def build_scene_index(video_path, mask_path=None):
+    """
+    Decode a video once at reduced resolution and record per-frame signatures and shot boundaries.
+
+    Returns:
+    - dict with 'fps', per-frame 'histograms' (luma) and 'red_scores' (masked red-light score, see
+      f1_23_red_scorer.RedScorer), and 'shot_starts' (first frame of each shot)
+    """
+    import cv2
+    import numpy as np
+    from f1_23_mask_indices import load_mask_indices
+    from f1_23_red_scorer import RedScorer
+
+    vid_cap = cv2.VideoCapture(video_path)
+    if not vid_cap.isOpened():
+        print(f"Error: Couldn't open video {video_path}")
+        return None
+
+    fps = vid_cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(vid_cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frame_width = int(vid_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(vid_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    small_size = (max(1, int(frame_width * INDEX_SCALE)), max(1, int(frame_height * INDEX_SCALE)))
+
+    red_scorer = None
+    mask_path = mask_path or default_path("mask.png")
+    mask = load_mask_indices(mask_path, frame_width, frame_height)
+    if mask is None:
+        mask = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
+    if mask is not None:
+        mask_pixels = cv2.resize(mask, small_size, interpolation=cv2.INTER_NEAREST) > 127
+        if np.any(mask_pixels):
+            # Same 10px penalty ring as VideoFrameExtractor, scaled to the index resolution
+            kernel_size = max(3, 2 * int(round(10 * INDEX_SCALE)) + 1)
+            dilated_mask = cv2.dilate(mask_pixels.astype(np.uint8), np.ones((kernel_size, kernel_size), dtype=np.uint8)) > 0
+            nearby_penalty_pixels = np.logical_and(dilated_mask, np.logical_not(mask_pixels))
+            red_scorer = RedScorer(mask_pixels, nearby_penalty_pixels if np.any(nearby_penalty_pixels) else None, 0.35)
+
+    histograms, red_scores = [], []
+    frame, small_frame, gray = None, None, None
+    while True:
+        ret, frame = vid_cap.read(frame)
+        if not ret:
+            break
+        small_frame = cv2.resize(frame, small_size, dst=small_frame, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY, dst=gray)
+        histograms.append(luma_histogram(gray))
+        red_scores.append(red_scorer.score(small_frame) if red_scorer is not None else -1.0)
+        if len(histograms) % max(int(fps), 1) == 0:
+            print(f"\rIndexing scenes of {os.path.basename(video_path)}: {100 * len(histograms) / max(total_frames, 1):.2f}%", end="")
+    vid_cap.release()
+    print(f"\rIndexing scenes of {os.path.basename(video_path)}: 100.00% ({len(histograms)} frames)")
+
+    histograms = np.array(histograms, dtype=np.float32).reshape(-1, HISTOGRAM_BINS)
+    # A shot starts wherever a frame's histogram jumps away from the previous frame's
+    consecutive_distances = np.sqrt(np.clip(1.0 - np.sum(np.sqrt(histograms[1:] * histograms[:-1]), axis=1), 0.0, 1.0))
+    shot_starts = np.concatenate(([0], np.flatnonzero(consecutive_distances > SHOT_CUT_THRESHOLD) + 1)).astype(np.int32)
+
+    return {
+        "fps": fps,
+        "histograms": histograms,
+        "red_scores": np.array(red_scores, dtype=np.float32),
+        "shot_starts": shot_starts,
+    }
+
+
+def save_scene_index(video_path, scene_index):
+    import numpy as np
+
+    stat = os.stat(video_path)
+    np.savez(scene_index_path(video_path), video_stat=np.array([stat.st_size, stat.st_mtime]), **scene_index)
+
+
+def load_scene_index(video_path):
+    """Load the scene index saved next to a video, or None if it is missing or older than the video."""
+    import numpy as np
+
+    index_path = scene_index_path(video_path)
+    if not os.path.exists(index_path):
+        return None
+    stat = os.stat(video_path)
+    with np.load(index_path) as data:
+        if tuple(data["video_stat"]) != (stat.st_size, stat.st_mtime):
+            print(f"Scene index {index_path} is out of date; ignoring it.")
+            return None
+        scene_index = {key: data[key] for key in ("histograms", "red_scores", "shot_starts")}
+        scene_index["fps"] = float(data["fps"])
+    return scene_index
+
+
+def candidate_frame_ranges(scene_index, start_frame, end_frame, reference_image=None, max_histogram_distance=0.4, min_red_score=None, fall_back_to_window=False):
+    """
+    Frame ranges within [start_frame, end_frame) that belong to shots which could contain a match.
+
+    Parameters:
+    - scene_index: Output of build_scene_index / load_scene_index
+    - reference_image: If given, a shot is kept only if some frame's luma histogram is within max_histogram_distance of it
+    - min_red_score: If given, a shot is kept only if some frame's masked red score reaches it
+    - fall_back_to_window: If no shot passes the filters, return the whole [start_frame, end_frame) window
+      instead of no ranges (for searches that must return a best frame)
+
+    Returns:
+    - List of (first frame, end frame exclusive) tuples in increasing order
+    """
+    import numpy as np
+
+    window = [(start_frame, end_frame)]
+    frame_count = len(scene_index["histograms"])
+    end_frame = min(end_frame, frame_count)
+    keep = np.ones(frame_count, dtype=bool)
+    if reference_image is not None:
+        keep &= histogram_distances(scene_index["histograms"], luma_histogram(reference_image)) <= max_histogram_distance
+    if min_red_score is not None:
+        keep &= scene_index["red_scores"] >= min_red_score
+
+    shot_bounds = np.append(scene_index["shot_starts"], frame_count)
+    ranges = []
+    for shot_start, shot_end in zip(shot_bounds[:-1], shot_bounds[1:]):
+        first, last = max(int(shot_start), start_frame), min(int(shot_end), end_frame)
+        if first >= last or not np.any(keep[shot_start:shot_end]):
+            continue
+        if ranges and ranges[-1][1] == first:
+            ranges[-1] = (ranges[-1][0], last)
+        else:
+            ranges.append((first, last))
+    if not ranges and fall_back_to_window:
+        print("Scene index: no shot passes the filter; searching the whole window instead.")
+        return window
+    return ranges
+
+
+def merge_frame_ranges(ranges):
+    """Merge overlapping or touching (start, end exclusive) frame ranges."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build a scene index (per-frame luma histograms, masked red scores and shot boundaries) "
+                    "next to each video, so the search tools can skip shots that cannot match."
+    )
+    parser.add_argument("video_paths", nargs="+", help="Videos to index. The index is saved as <video>.scenes.npz.")
+    parser.add_argument("--mask_path", default=default_path("mask.png"), help="Mask of the start lights used for the red scores.")
+
+    args = parser.parse_args()
+
+    for video_path in args.video_paths:
+        scene_index = build_scene_index(video_path, args.mask_path)
+        if scene_index is None:
+            continue
+        save_scene_index(video_path, scene_index)
+        print(f"Saved {scene_index_path(video_path)}: {len(scene_index['shot_starts'])} shots")
@@ -0,0 +1,282 @@
+import argparse
+import functools
+import os
+
+HASH_SIZE = 8  # 8x8 DCT coefficients -> 64-bit hash
+DCT_SIZE = 32
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".mov", ".webm")
+
+
+def default_path(file_name):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name)
+
+
+def prepare_mask(mask, frame_width, frame_height):
+    """
+    Resize the mask to the frame resolution and find the bounding box of its pixels.
+
+    Returns:
+    - (mask crop as a boolean array, (row slice, column slice)) or None if the mask is empty
+    """
+    import cv2
+    import numpy as np
+
+    resized_mask = cv2.resize(mask, (frame_width, frame_height), interpolation=cv2.INTER_NEAREST) > 127
+    ys, xs = np.nonzero(resized_mask)
+    if len(ys) == 0:
+        return None
+    bbox = (slice(ys.min(), ys.max() + 1), slice(xs.min(), xs.max() + 1))
+    return resized_mask[bbox], bbox
+
+
+def perceptual_hash(frame, prepared_mask):
+    """
+    Compute a 64-bit DCT perceptual hash of the masked region of a frame.
+
+    Parameters:
+    - frame: BGR cv2 image
+    - prepared_mask: Output of prepare_mask for the frame's resolution
+
+    Returns:
+    - 8 uint8 values holding the packed hash bits
+    """
+    import cv2
+    import numpy as np
+
+    mask_crop, bbox = prepared_mask
+    gray = cv2.cvtColor(frame[bbox], cv2.COLOR_BGR2GRAY)
+    # Fill outside the mask with the masked mean so the mask outline itself does not shape the hash
+    gray[~mask_crop] = int(gray[mask_crop].mean())
+    small = cv2.resize(gray, (DCT_SIZE, DCT_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low_frequencies = cv2.dct(small)[:HASH_SIZE, :HASH_SIZE].flatten()
+    # Ignore the DC term when picking the median so overall brightness does not dominate
+    bits = low_frequencies > np.median(low_frequencies[1:])
+    return np.packbits(bits)
+
+
+@functools.lru_cache(maxsize=1)
+def popcount_table():
+    """Number of set bits of every byte value, used for vectorized Hamming distances."""
+    import numpy as np
+
+    return np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+
+
+def hamming_distances(hashes, query_hash):
+    """Hamming distance between every row of hashes (N x 8 uint8) and query_hash."""
+    import numpy as np
+
+    return popcount_table()[np.bitwise_xor(hashes, query_hash)].sum(axis=1, dtype=np.uint16)
+
+
+def index_file_path(index_path):
+    """The index file name as np.savez writes it, which appends .npz if index_path has no such extension."""
+    return index_path if index_path.endswith(".npz") else f"{index_path}.npz"
+
+
+def load_index(index_path):
+    """
+    Load the on-disk index.
+
+    Returns:
+    - dict with 'videos' (path -> (size, mtime)), and per-frame 'hashes', 'video_ids', 'times'
+    """
+    import numpy as np
+
+    index_path = index_file_path(index_path)
+    if not os.path.exists(index_path):
+        return {
+            "videos": {},
+            "hashes": np.zeros((0, HASH_SIZE * HASH_SIZE // 8), dtype=np.uint8),
+            "video_ids": np.zeros(0, dtype=np.int32),
+            "times": np.zeros(0, dtype=np.float32),
+        }
+
+    with np.load(index_path) as data:
+        video_paths = [str(path) for path in data["video_paths"]]
+        video_stats = [tuple(stat) for stat in data["video_stats"]]
+        return {
+            "videos": dict(zip(video_paths, video_stats)),
+            "hashes": data["hashes"],
+            "video_ids": data["video_ids"],
+            "times": data["times"],
+        }
+
+
+def save_index(index_path, index):
+    import numpy as np
+
+    video_paths = list(index["videos"].keys())
+    np.savez(
+        index_file_path(index_path),
+        video_paths=np.array(video_paths, dtype=str),
+        video_stats=np.array([index["videos"][path] for path in video_paths], dtype=np.float64).reshape(-1, 2),
+        hashes=index["hashes"],
+        video_ids=index["video_ids"],
+        times=index["times"],
+    )
+
+
+def hash_video(video_path, mask, stride_frames):
+    """
+    Decode a video once and hash the masked region of every stride_frames-th frame.
+
+    Returns:
+    - (hashes as an N x 8 uint8 array, frame times in seconds)
+    """
+    import cv2
+    import numpy as np
+
+    vid_cap = cv2.VideoCapture(video_path)
+    if not vid_cap.isOpened():
+        print(f"Error: Couldn't open video {video_path}")
+        return None, None
+
+    fps = vid_cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(vid_cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frame_width = int(vid_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(vid_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    prepared_mask = prepare_mask(mask, frame_width, frame_height)
+    if prepared_mask is None:
+        print("Error: The mask does not contain any white pixels.")
+        vid_cap.release()
+        return None, None
+
+    hashes, times = [], []
+    frame_number = 0
+    frame = None  # Decode buffer reused for every hashed frame
+    while True:
+        # grab() skips the colour conversion for frames that are not hashed
+        if not vid_cap.grab():
+            break
+        if frame_number % stride_frames == 0:
+            ret, frame = vid_cap.retrieve(frame)
+            if ret:
+                hashes.append(perceptual_hash(frame, prepared_mask))
+                times.append(frame_number / fps if fps > 0 else 0.0)
+        if frame_number % max(int(fps), 1) == 0:
+            print(f"\rIndexing {os.path.basename(video_path)}: {100 * frame_number / max(total_frames, 1):.2f}%", end="")
+        frame_number += 1
+
+    vid_cap.release()
+    print(f"\rIndexing {os.path.basename(video_path)}: 100.00% ({len(hashes)} frames)")
+    return np.array(hashes, dtype=np.uint8).reshape(-1, HASH_SIZE * HASH_SIZE // 8), np.array(times, dtype=np.float32)
+
+
+def find_videos(paths):
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dir_path, _, file_names in os.walk(path):
+                videos.extend(os.path.join(dir_path, name) for name in sorted(file_names) if name.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            videos.append(path)
+    return [os.path.abspath(video) for video in videos]
+
+
+def build_index(paths, index_path, mask_path, stride_frames):
+    import cv2
+    import numpy as np
+
+    mask = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
+    if mask is None:
+        print(f"Error: Couldn't load mask {mask_path}")
+        return
+
+    index = load_index(index_path)
+    video_ids = {path: video_id for video_id, path in enumerate(index["videos"])}
+    new_hashes, new_video_ids, new_times = [index["hashes"]], [index["video_ids"]], [index["times"]]
+
+    for video_path in find_videos(paths):
+        stat = os.stat(video_path)
+        video_stat = (float(stat.st_size), float(stat.st_mtime))
+        if index["videos"].get(video_path) == video_stat:
+            print(f"Already indexed: {video_path}")
+            continue
+        if video_path in video_ids:
+            # The file changed since it was indexed; drop its old entries
+            keep = np.concatenate(new_video_ids) != video_ids[video_path]
+            new_hashes = [np.concatenate(new_hashes)[keep]]
+            new_times = [np.concatenate(new_times)[keep]]
+            new_video_ids = [np.concatenate(new_video_ids)[keep]]
+
+        hashes, times = hash_video(video_path, mask, stride_frames)
+        if hashes is None:
+            continue
+        video_id = video_ids.setdefault(video_path, len(video_ids))
+        index["videos"][video_path] = video_stat
+        new_hashes.append(hashes)
+        new_times.append(times)
+        new_video_ids.append(np.full(len(hashes), video_id, dtype=np.int32))
+
+    index["hashes"] = np.concatenate(new_hashes)
+    index["video_ids"] = np.concatenate(new_video_ids)
+    index["times"] = np.concatenate(new_times)
+    save_index(index_path, index)
+    print(f"Index saved to {index_file_path(index_path)}: {len(index['videos'])} videos, {len(index['hashes'])} frames")
+
+
+def query_index(image_path, index_path, mask_path, top_k, min_separation_seconds):
+    """
+    Find the video/time pairs whose masked region best matches the query image.
+
+    Returns:
+    - List of (video path, time in seconds, Hamming distance), best first
+    """
+    import cv2
+    import numpy as np
+
+    image = cv2.imread(image_path)
+    mask = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
+    if image is None or mask is None:
+        print("Error: Couldn't load the query image or the mask.")
+        return []
+
+    index = load_index(index_path)
+    if len(index["hashes"]) == 0:
+        print(f"Error: The index {index_path} is empty.")
+        return []
+
+    prepared_mask = prepare_mask(mask, image.shape[1], image.shape[0])
+    if prepared_mask is None:
+        print("Error: The mask does not contain any white pixels.")
+        return []
+
+    distances = hamming_distances(index["hashes"], perceptual_hash(image, prepared_mask))
+    video_paths = list(index["videos"].keys())
+
+    # Walk candidates best-first, skipping frames too close to an already reported match
+    matches = []
+    for position in np.argsort(distances, kind="stable"):
+        video_id, time_seconds = int(index["video_ids"][position]), float(index["times"][position])
+        if any(video_id == match_id and abs(time_seconds - match_time) < min_separation_seconds for match_id, match_time, _ in matches):
+            continue
+        matches.append((video_id, time_seconds, int(distances[position])))
+        if len(matches) >= top_k:
+            break
+
+    return [(video_paths[video_id], time_seconds, distance) for video_id, time_seconds, distance in matches]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and query a perceptual-hash index of the masked region of every frame in a library of videos.")
+    parser.add_argument("--index_path", default="video_index.npz", help="Path of the on-disk index file.")
+    parser.add_argument("--mask_path", default=default_path("mask.png"), help="Mask selecting the region that is hashed.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Add videos (or directories of videos) to the index. Unchanged videos are skipped.")
+    build_parser.add_argument("paths", nargs="+", help="Video files or directories to index.")
+    build_parser.add_argument("--stride_frames", type=int, default=1, help="Hash every n-th frame (default: every frame).")
+
+    query_parser = subparsers.add_parser("query", help="Find the videos and times that best match an image.")
+    query_parser.add_argument("image_path", nargs="?", default=default_path("reference_image.jpg"), help="Query image (default: reference_image.jpg).")
+    query_parser.add_argument("--top_k", type=int, default=10, help="Number of matches to report.")
+    query_parser.add_argument("--min_separation", type=float, default=1.0, help="Minimum time (in seconds) between two matches reported for the same video.")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_index(args.paths, args.index_path, args.mask_path, max(1, args.stride_frames))
+    else:
+        for video_path, time_seconds, distance in query_index(args.image_path, args.index_path, args.mask_path, args.top_k, args.min_separation):
+            print(f"{video_path}  {time_seconds:.3f}s  (distance {distance})")
@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from f1_23_proxy_frames import DEFAULT_PROXY_DURATION
+
+# yt-dlp writes these while downloading and merging; the final .mp4 only appears once it is complete
+PARTIAL_DOWNLOAD_PATTERN = re.compile(r"(\.part|\.ytdl|\.temp\.mp4|\.f\d+\.mp4)$", re.IGNORECASE)
+
+
+def default_path(file_name):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name)
+
+
+def manifest_path(video_path):
+    return f"{video_path}.ingest.json"
+
+
+def file_stat(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime]
+
+
+def start_options(mask_path, reference_path, limit_seconds, use_scene_index=False, use_proxy=False, proxy_tolerance=0.05):
+    """
+    Options of a start detection, including the size/mtime of the mask and reference, to tell whether a stored
+    result still applies. The scene index and proxy filters are part of it, because they can change the result.
+    """
+    return {
+        "mask_path": os.path.abspath(mask_path), "mask_stat": file_stat(mask_path),
+        "reference_path": os.path.abspath(reference_path), "reference_stat": file_stat(reference_path),
+        "limit_seconds": limit_seconds,
+        "use_scene_index": bool(use_scene_index), "use_proxy": bool(use_proxy),
+        "proxy_tolerance": proxy_tolerance if use_proxy else None,
+    }
+
+
+def load_manifest(video_path):
+    """Load the ingest manifest saved next to a video, or None if it is missing or older than the video."""
+    path = manifest_path(video_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("video_stat") != file_stat(video_path):
+        return None
+    return manifest
+
+
+def load_ingested_start(video_path, mask_path, reference_path, limit_seconds=None, use_scene_index=False, use_proxy=False, proxy_tolerance=0.05):
+    """Start frame found during ingest with the same mask, reference, limit and scene index/proxy options, or None."""
+    manifest = load_manifest(video_path)
+    if manifest is None or "start" not in manifest:
+        return None
+    try:
+        if manifest["start"]["options"] != start_options(mask_path, reference_path, limit_seconds, use_scene_index, use_proxy, proxy_tolerance):
+            return None
+    except OSError:
+        return None
+    return manifest["start"]["result"]
+
+
+def probe_video(video_path):
+    # Only the worker processes need OpenCV; the watch loop and the manifest readers don't load it
+    import cv2
+
+    vid_cap = cv2.VideoCapture(video_path)
+    if not vid_cap.isOpened():
+        raise ValueError(f"Couldn't open video: {video_path}")
+    fps = vid_cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(vid_cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    probe = {
+        "fps": fps, "frame_count": frame_count,
+        "width": int(vid_cap.get(cv2.CAP_PROP_FRAME_WIDTH)), "height": int(vid_cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "duration": frame_count / fps if fps > 0 else 0.0,
+    }
+    ret, _ = vid_cap.read()
+    vid_cap.release()
+    if not ret or frame_count <= 0:
+        raise ValueError(f"No frames could be decoded from {video_path}")
+    return probe
+
+
+def ingest_video(video_path, options):
+    """
+    Pre-analyse one video: probe it, then build its scene index, proxy and thumbnail sprite sheet and run
+    start detection, as selected in options. Everything is saved next to the video, where the search and
+    render tools look for it, and summarised in <video>.ingest.json.
+
+    Returns:
+    - The manifest
+    """
+    from f1_23_index_scenes import build_scene_index, save_scene_index
+    from f1_23_proxy_frames import build_proxy
+    from f1_23_search_start_frame import find_start_frame
+    from f1_23_thumbnail_sprites import load_or_build_sprite_sheet
+
+    video_stat = file_stat(video_path)
+    manifest = {"video_stat": video_stat, "probe": probe_video(video_path), "seconds": {}}
+
+    def timed(step, function, *args, **kwargs):
+        start_time = time.time()
+        result = function(*args, **kwargs)
+        manifest["seconds"][step] = time.time() - start_time
+        return result
+
+    if options["scene_index"]:
+        scene_index = timed("scene_index", build_scene_index, video_path, options["mask_path"])
+        if scene_index is not None:
+            save_scene_index(video_path, scene_index)
+    if options["proxy"]:
+        timed("proxy", build_proxy, video_path, duration=options["proxy_duration"])
+    if options["sprites"]:
+        timed("sprites", load_or_build_sprite_sheet, video_path)
+    if options["start"]:
+        result = timed(
+            "start", find_start_frame, video_path, options["mask_path"], options["reference_path"],
+            limit_seconds=options["limit_seconds"], use_scene_index=options["scene_index"], use_proxy=options["proxy"],
+            proxy_tolerance=options["proxy_tolerance"],
+        )
+        manifest["start"] = {
+            "options": start_options(
+                options["mask_path"], options["reference_path"], options["limit_seconds"],
+                options["scene_index"], options["proxy"], options["proxy_tolerance"],
+            ),
+            "result": result,
+        }
+
+    if file_stat(video_path) != video_stat:
+        raise ValueError(f"{video_path} changed while it was being ingested")
+    # Written under a temporary name first, so a crash never leaves a half-written manifest behind
+    temporary_path = manifest_path(video_path) + ".tmp"
+    with open(temporary_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temporary_path, manifest_path(video_path))
+    return manifest
+
+
+def is_candidate(file_name):
+    return file_name.lower().endswith(".mp4") and not PARTIAL_DOWNLOAD_PATTERN.search(file_name)
+
+
+def watch(directory, options, workers=1, interval=5.0, settle_seconds=10.0, once=False):
+    """
+    Ingest every new MP4 in directory on a pool of at most `workers` processes.
+
+    A file is ingested once its size and modification time have not changed for settle_seconds, so
+    downloads and copies still being written are left alone. Videos with an up-to-date manifest are skipped.
+    With once, the directory is processed until nothing is pending and the function returns.
+    """
+    last_seen = {}  # path -> ((size, mtime), time it was first seen with that size/mtime)
+    finished = set()
+    failed = {}  # path -> (size, mtime) it failed with; retried once the file changes
+    in_flight = {}  # future -> path
+    print(f"Watching {directory} for new MP4 files (Ctrl+C to stop)...")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            now = time.time()
+            waiting = 0
+            for entry in os.scandir(directory):
+                path = entry.path
+                if not entry.is_file() or not is_candidate(entry.name) or path in finished or path in in_flight.values():
+                    continue
+                stat = entry.stat()
+                signature = (stat.st_size, stat.st_mtime)
+                if failed.get(path) == signature:
+                    continue
+                if path not in last_seen or last_seen[path][0] != signature:
+                    last_seen[path] = (signature, now)
+                    waiting += 1
+                    continue
+                if now - last_seen[path][1] < settle_seconds:
+                    waiting += 1
+                    continue
+                if load_manifest(path) is not None:
+                    print(f"{entry.name}: already ingested")
+                    finished.add(path)
+                    continue
+                if len(in_flight) >= workers:
+                    # Keep the backlog in the directory rather than in the executor's queue
+                    waiting += 1
+                    continue
+                print(f"{entry.name}: ingesting")
+                in_flight[executor.submit(ingest_video, path, options)] = path
+
+            for future in [future for future in in_flight if future.done()]:
+                path = in_flight.pop(future)
+                try:
+                    manifest = future.result()
+                except Exception as e:
+                    print(f"{os.path.basename(path)}: failed: {e}")
+                    failed[path] = last_seen[path][0]
+                    continue
+                finished.add(path)
+                steps = ", ".join(f"{step} {seconds:.1f}s" for step, seconds in manifest["seconds"].items())
+                start = manifest.get("start", {}).get("result")
+                start_text = f" | start frame {start['frame_number']} ({start['time']:.3f}s)" if start else ""
+                print(f"{os.path.basename(path)}: done ({steps}){start_text}")
+
+            if once and not waiting and not in_flight:
+                return
+            time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Watch a download directory and pre-analyse every new, fully written MP4 in the background: "
+                    "probe, scene index, proxy, thumbnails and start detection, saved next to the video for the other tools."
+    )
+    parser.add_argument("directory", help="Directory to watch (e.g. where yt-dl.bash downloads to).")
+    parser.add_argument("--workers", type=int, default=1, help="Number of videos ingested at the same time.")
+    parser.add_argument("--interval", type=float, default=5.0, help="Seconds between directory scans.")
+    parser.add_argument("--settle_seconds", type=float, default=10.0, help="A file must be unchanged for this long before it is ingested.")
+    parser.add_argument("--once", action="store_true", help="Ingest what is in the directory now, then exit.")
+    parser.add_argument("--mask_path", default=default_path("mask.png"), help="Mask of the start lights.")
+    parser.add_argument("--reference_path", default=default_path("reference_image.jpg"), help="Reference image for start detection.")
+    parser.add_argument("--limit_seconds", type=int, default=None, help="Limit start detection to the first n seconds of each video.")
+    parser.add_argument("--proxy", action="store_true", help="Also build a proxy (f1_23_proxy_frames.py) of the start detection window.")
+    parser.add_argument("--proxy_tolerance", type=float, default=0.05, help="Start detection on the proxy: decode frames within this fraction of the best proxy score.")
+    parser.add_argument(
+        "--proxy_duration", type=float, default=None,
+        help=f"Build the proxy for the first n seconds of each video (default: --limit_seconds, or {DEFAULT_PROXY_DURATION:.0f}).",
+    )
+    parser.add_argument("--no_scene_index", action="store_true", help="Don't build scene indexes.")
+    parser.add_argument("--no_sprites", action="store_true", help="Don't build thumbnail sprite sheets.")
+    parser.add_argument("--no_start", action="store_true", help="Don't run start detection.")
+
+    args = parser.parse_args()
+
+    ingest_options = {
+        "mask_path": os.path.abspath(args.mask_path), "reference_path": os.path.abspath(args.reference_path),
+        "limit_seconds": args.limit_seconds,
+        "scene_index": not args.no_scene_index, "proxy": args.proxy,
+        "proxy_duration": args.proxy_duration or args.limit_seconds or DEFAULT_PROXY_DURATION,
+        "proxy_tolerance": args.proxy_tolerance,
+        "sprites": not args.no_sprites, "start": not args.no_start,
+    }
+    try:
+        watch(args.directory, ingest_options, args.workers, args.interval, args.settle_seconds, args.once)
+    except KeyboardInterrupt:
+        print("Stopped.")
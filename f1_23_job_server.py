@@ -0,0 +1,283 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from f1_23_index_scenes import scene_index_path
+from f1_23_proxy_frames import proxy_paths
+
+DEFAULT_SOCKET_PATH = "/tmp/f1_23_job_server.sock"
+
+
+def default_path(file_name):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name)
+
+
+class LRUCache:
+    """Small least-recently-used cache. on_evict is called with each value that is dropped."""
+
+    def __init__(self, max_size, on_evict=None):
+        self.max_size = max_size
+        self.on_evict = on_evict
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key not in self.items:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.items.move_to_end(key)
+        return self.items[key]
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_size:
+            _, evicted = self.items.popitem(last=False)
+            if self.on_evict is not None:
+                self.on_evict(evicted)
+
+    def stats(self):
+        return {"size": len(self.items), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+# --------------- Worker process side: these caches live in each pool process ---------------
+
+_video_handles = None
+
+
+def get_video(video_path):
+    """Return an open, cached cv2.VideoCapture for video_path."""
+    global _video_handles
+    import cv2
+
+    if _video_handles is None:
+        _video_handles = LRUCache(4, on_evict=lambda cap: cap.release())
+    cap = _video_handles.get(video_path)
+    if cap is None:
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Couldn't open video: {video_path}")
+        _video_handles.put(video_path, cap)
+    return cap
+
+
+def run_start_job(job):
+    """Find the frame most similar to the masked reference image (see f1_23_search_start_frame.py)."""
+    from f1_23_ingest import load_ingested_start
+    from f1_23_search_start_frame import find_start_frame
+
+    ingested = load_ingested_start(
+        job["video_path"], job["mask_path"], job["reference_path"], job.get("limit_seconds"),
+        use_scene_index=job.get("scene_index", False), use_proxy=job.get("proxy", False),
+    )
+    if ingested is not None:
+        return {"frame_number": ingested["frame_number"], "time": ingested["time"], "score": ingested["score"], "ingested": True}
+
+    # The compiled mask/reference is cached per worker process by find_start_frame
+    result = find_start_frame(
+        job["video_path"], job["mask_path"], job["reference_path"],
+        limit_seconds=job.get("limit_seconds"),
+        use_scene_index=job.get("scene_index", False),
+        use_proxy=job.get("proxy", False),
+        vid_cap=get_video(job["video_path"]),
+    )
+    return {"frame_number": result["frame_number"], "time": result["time"], "score": result["score"]}
+
+
+def run_match_job(job):
+    """Find mutually matching frames of two videos (see f1_23_search_matching_frame.py)."""
+    from f1_23_search_matching_frame import find_matching_frames
+
+    # The pool already runs jobs side by side, so each match job searches serially on the warm video handles
+    match = find_matching_frames(
+        job["video1_path"], job["video2_path"], job.get("duration", 10.0),
+        job.get("video1_start", 0), job.get("video2_start", 0), show_progress=False,
+        use_scene_index=job.get("scene_index", False),
+        coarse_stride=job.get("coarse_stride", 0), coarse_top_k=job.get("coarse_top_k", 3),
+        use_proxy=job.get("proxy", False),
+        parallel=False,
+        vid_caps=(get_video(job["video1_path"]), get_video(job["video2_path"])),
+    )
+    if match is None:
+        raise ValueError("No matching frames found.")
+    time_video1 = match["frame_number_video1"] / match["fps_video1"]
+    time_video2 = match["frame_number_video2"] / match["fps_video2"]
+    return {
+        "frame_number_video1": match["frame_number_video1"], "time_video1": time_video1,
+        "frame_number_video2": match["frame_number_video2"], "time_video2": time_video2,
+        "time_difference": time_video1 - time_video2,
+    }
+
+
+def run_render_job(job):
+    """Render a split-screen video (see f1_create_split_screen_video.py)."""
+    from f1_create_split_screen_video import output_container_args, process_and_combine_videos
+
+    output_path = job.get("output_path", "combined_video.mp4")
+    output_format = job.get("output_format", "mp4")
+    process_and_combine_videos(
+        job["left_video_path"], job["left_start_time"],
+        job["right_video_path"], job["right_start_time"],
+        job.get("output_length"), output_path,
+        preset=job.get("preset", "medium"),
+        use_hwaccel=job.get("hwaccel", False),
+        single_pass=not job.get("three_step", False),
+        drift_map_path=job.get("drift_map_path"),
+        crf=job.get("crf", 18),
+        output_format=output_format,
+        audio_mode=job.get("audio", "mix"),
+        audio_codec=job.get("audio_codec", "copy"),
+    )
+    _, watch_path = output_container_args(output_format, output_path)
+    return {"output_path": os.path.abspath(watch_path)}
+
+
+JOB_HANDLERS = {
+    "start": run_start_job,
+    "match": run_match_job,
+    "render": run_render_job,
+}
+
+# Render jobs write files, so their results are never served from the cache
+CACHEABLE_JOB_TYPES = {"start", "match"}
+
+
+def run_job(job):
+    return JOB_HANDLERS[job["type"]](job)
+
+
+# --------------- Server side ---------------
+
+def job_cache_key(job):
+    """Key a job by its parameters and the size/mtime of every file it reads, including the scene indexes and proxies it uses."""
+    files = {key: value for key, value in job.items() if key.endswith("_path") and isinstance(value, str)}
+    for key, video_path in list(files.items()):
+        if not key.startswith("video"):
+            continue
+        if job.get("scene_index", False):
+            files[f"{key}:scene_index"] = scene_index_path(video_path)
+        if job.get("proxy", False):
+            files[f"{key}:proxy_frames"], files[f"{key}:proxy_index"] = proxy_paths(video_path)
+
+    file_stats = {}
+    for key, path in files.items():
+        if os.path.exists(path):
+            stat = os.stat(path)
+            file_stats[key] = (stat.st_size, stat.st_mtime)
+    return json.dumps([job, file_stats], sort_keys=True)
+
+
+class JobServer:
+    def __init__(self, workers, cache_size):
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.results = LRUCache(cache_size)
+        self.stopped = asyncio.Event()
+
+    async def handle_job(self, job):
+        if job.get("type") == "stats":
+            return {"ok": True, "result": {"results": self.results.stats()}}
+        if job.get("type") == "shutdown":
+            self.stopped.set()
+            return {"ok": True, "result": "shutting down"}
+        if job.get("type") not in JOB_HANDLERS:
+            return {"ok": False, "error": f"Unknown job type: {job.get('type')}"}
+
+        if job["type"] == "start":
+            job = {"mask_path": default_path("mask.png"), "reference_path": default_path("reference_image.jpg"), **job}
+
+        start_time = time.time()
+        cache_key = job_cache_key(job) if job["type"] in CACHEABLE_JOB_TYPES else None
+        result = self.results.get(cache_key) if cache_key is not None else None
+        cached = result is not None
+        if not cached:
+            loop = asyncio.get_running_loop()
+            try:
+                result = await loop.run_in_executor(self.executor, run_job, job)
+            except Exception as e:
+                return {"ok": False, "error": str(e)}
+            if cache_key is not None:
+                self.results.put(cache_key, result)
+
+        return {"ok": True, "result": result, "cached": cached, "seconds": time.time() - start_time}
+
+    async def handle_client(self, reader, writer):
+        # One JSON job per line; one JSON response per line
+        try:
+            while line := await reader.readline():
+                try:
+                    job = json.loads(line)
+                except json.JSONDecodeError as e:
+                    response = {"ok": False, "error": f"Invalid JSON: {e}"}
+                else:
+                    response = await self.handle_job(job)
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+                if self.stopped.is_set():
+                    break
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path=None, port=None):
+        if port is not None:
+            server = await asyncio.start_server(self.handle_client, "127.0.0.1", port)
+            print(f"Listening on 127.0.0.1:{port}")
+        else:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            server = await asyncio.start_unix_server(self.handle_client, socket_path)
+            print(f"Listening on {socket_path}")
+
+        async with server:
+            await self.stopped.wait()
+        self.executor.shutdown()
+        if port is None and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+async def submit_job(job, socket_path=None, port=None):
+    """Send one job to a running server and return its response."""
+    # The server may run in a different working directory
+    job = {key: os.path.abspath(value) if key.endswith("_path") and isinstance(value, str) else value for key, value in job.items()}
+    if port is not None:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    else:
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+    writer.write((json.dumps(job) + "\n").encode())
+    await writer.drain()
+    response = json.loads(await reader.readline())
+    writer.close()
+    await writer.wait_closed()
+    return response
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Local job server for start-detection, matching and render jobs that keeps video handles and compiled masks warm between start and match jobs, and keeps recent results."
+    )
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help=f"Unix socket path (default: {DEFAULT_SOCKET_PATH}).")
+    parser.add_argument("--port", type=int, default=None, help="Listen on / connect to this localhost TCP port instead of the Unix socket.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Run the server.")
+    serve_parser.add_argument("--workers", type=int, default=2, help="Number of worker processes for CPU-heavy jobs.")
+    serve_parser.add_argument("--cache_size", type=int, default=64, help="Number of job results kept in memory.")
+
+    submit_parser = subparsers.add_parser(
+        "submit",
+        help='Send a job as JSON, e.g. \'{"type": "start", "video_path": "race.mp4", "limit_seconds": 600}\'. '
+             'Job types: start, match, render, stats, shutdown. Parameters match the other tools\' arguments.'
+    )
+    submit_parser.add_argument("job", help="Job as a JSON object.")
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        asyncio.run(JobServer(args.workers, args.cache_size).serve(args.socket, args.port))
+    else:
+        print(json.dumps(asyncio.run(submit_job(json.loads(args.job), args.socket, args.port)), indent=2))
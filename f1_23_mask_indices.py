@@ -0,0 +1,45 @@
+import os
+
+
+def mask_indices_path(mask_path):
+    """Path of the sparse index file that is saved next to a mask image."""
+    root, _ = os.path.splitext(mask_path)
+    return f"{root}_indices.npz"
+
+
+def save_mask_indices(mask_path, mask):
+    """
+    Save the flat indices of the non-zero mask pixels next to the mask image.
+
+    The search tools can load these directly instead of thresholding and
+    scanning the full mask image again.
+    """
+    import numpy as np
+
+    indices = np.flatnonzero(mask).astype(np.int32)
+    np.savez_compressed(mask_indices_path(mask_path), shape=np.array(mask.shape[:2]), indices=indices)
+
+
+def load_mask_indices(mask_path, frame_width, frame_height):
+    """
+    Binary mask (0/255 uint8) of the frame resolution from the sparse indices saved next to mask_path.
+
+    Returns:
+    - The mask, or None if there are no indices, they were saved for another resolution, or they are older
+      than the mask image (edited or replaced after the export). The caller then reads the mask image.
+    """
+    import numpy as np
+
+    indices_path = mask_indices_path(mask_path)
+    if not os.path.exists(indices_path):
+        return None
+    if os.path.exists(mask_path) and os.path.getmtime(indices_path) < os.path.getmtime(mask_path):
+        return None
+
+    with np.load(indices_path) as data:
+        if tuple(data["shape"]) != (frame_height, frame_width):
+            return None
+        binary_mask = np.zeros(frame_height * frame_width, dtype=np.uint8)
+        binary_mask[data["indices"]] = 255
+
+    return binary_mask.reshape(frame_height, frame_width)
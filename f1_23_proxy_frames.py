@@ -0,0 +1,138 @@
+import argparse
+import os
+
+DEFAULT_PROXY_SCALE = 0.25
+# The opening minutes, where the start searches look. A whole race at 1080p60 would take about 50 GB.
+DEFAULT_PROXY_DURATION = 300.0
+
+
+def proxy_paths(video_path):
+    """Paths of the proxy frame array and its index, saved next to the video."""
+    return f"{video_path}.proxy.npy", f"{video_path}.proxy.npz"
+
+
+class ProxyFrames:
+    """
+    Downscaled frames of a video in a read-only memory-mapped array.
+
+    Slicing frames returns views of the mapped file, so any number of tools and worker processes can
+    read the same proxy without decoding the video or copying the frames.
+    """
+
+    def __init__(self, frames, times, fps, scale, first_frame):
+        self.frames = frames
+        self.times = times  # Presentation time of each proxy frame in seconds
+        self.fps = fps
+        self.scale = scale
+        self.first_frame = first_frame  # Video frame number of proxy frame 0
+
+    def __len__(self):
+        return len(self.frames)
+
+    def covers(self, start_frame, end_frame):
+        """Whether video frames [start_frame, end_frame) are all in the proxy."""
+        return self.first_frame <= start_frame and end_frame <= self.first_frame + len(self.frames)
+
+    def frame(self, frame_number):
+        """Proxy of a video frame number (a view, not a copy)."""
+        return self.frames[frame_number - self.first_frame]
+
+    def frame_range(self, start_frame, end_frame):
+        """Proxies of video frames [start_frame, end_frame) as one (frames, height, width, 3) view."""
+        return self.frames[start_frame - self.first_frame:end_frame - self.first_frame]
+
+
+def build_proxy(video_path, scale=DEFAULT_PROXY_SCALE, start_time=0.0, duration=DEFAULT_PROXY_DURATION):
+    """
+    Decode a video once into a memory-mapped uint8 array of downscaled frames and a timestamp index.
+
+    Frames are resized straight into the mapped file, so memory use does not grow with the video length.
+    Only duration seconds from start_time are included (the whole video if duration is None), as the
+    proxy takes width x height x 3 bytes per frame on disk.
+
+    Returns:
+    - ProxyFrames opened on the new proxy, or None if the video could not be read
+    """
+    import cv2
+    import numpy as np
+    from numpy.lib.format import open_memmap
+
+    vid_cap = cv2.VideoCapture(video_path)
+    if not vid_cap.isOpened():
+        print(f"Error: Couldn't open video {video_path}")
+        return None
+
+    fps = vid_cap.get(cv2.CAP_PROP_FPS)
+    total_frames = int(vid_cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frame_width = int(vid_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(vid_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    proxy_width, proxy_height = max(1, int(round(frame_width * scale))), max(1, int(round(frame_height * scale)))
+
+    first_frame = min(int(round(start_time * fps)), total_frames)
+    end_frame = total_frames if duration is None else min(total_frames, first_frame + int(round(duration * fps)))
+    frame_count = max(end_frame - first_frame, 0)
+    size_gb = frame_count * proxy_width * proxy_height * 3 / 1e9
+    print(f"Building {proxy_width}x{proxy_height} proxy of {frame_count} frames ({size_gb:.2f} GB) for {os.path.basename(video_path)}")
+
+    frames_path, index_path = proxy_paths(video_path)
+    frames = open_memmap(frames_path, mode="w+", dtype=np.uint8, shape=(frame_count, proxy_height, proxy_width, 3))
+    times = np.zeros(frame_count, dtype=np.float64)
+
+    vid_cap.set(cv2.CAP_PROP_POS_FRAMES, first_frame)
+    frame = None
+    frames_read = 0
+    while frames_read < frame_count:
+        ret, frame = vid_cap.read(frame)
+        if not ret:
+            break
+        cv2.resize(frame, (proxy_width, proxy_height), dst=frames[frames_read], interpolation=cv2.INTER_AREA)
+        times[frames_read] = vid_cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        frames_read += 1
+        if frames_read % max(int(fps), 1) == 0:
+            print(f"\rBuilding proxy: {100 * frames_read / max(frame_count, 1):.2f}%", end="")
+    vid_cap.release()
+    frames.flush()
+    del frames
+    print(f"\rBuilding proxy: 100.00% ({frames_read} frames)")
+
+    # frame_count can be lower than the estimate from CAP_PROP_FRAME_COUNT; readers only see the frames read
+    stat = os.stat(video_path)
+    np.savez(
+        index_path, video_stat=np.array([stat.st_size, stat.st_mtime]), times=times[:frames_read],
+        fps=fps, scale=scale, first_frame=first_frame, frame_count=frames_read,
+    )
+    return load_proxy(video_path)
+
+
+def load_proxy(video_path):
+    """Open the proxy saved next to a video read-only, or return None if it is missing or older than the video."""
+    import numpy as np
+
+    frames_path, index_path = proxy_paths(video_path)
+    if not os.path.exists(frames_path) or not os.path.exists(index_path):
+        return None
+    stat = os.stat(video_path)
+    with np.load(index_path) as data:
+        if tuple(data["video_stat"]) != (stat.st_size, stat.st_mtime):
+            print(f"Proxy {frames_path} is out of date; ignoring it.")
+            return None
+        frame_count = int(data["frame_count"])
+        frames = np.load(frames_path, mmap_mode="r")[:frame_count]
+        return ProxyFrames(frames, data["times"], float(data["fps"]), float(data["scale"]), int(data["first_frame"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Decode videos once into memory-mapped proxies of downscaled frames (<video>.proxy.npy), "
+                    "which the search tools read instead of decoding the video again."
+    )
+    parser.add_argument("video_paths", nargs="+", help="Videos to build proxies for.")
+    parser.add_argument("--scale", type=float, default=DEFAULT_PROXY_SCALE, help="Proxy resolution as a fraction of the video's (default: 0.25).")
+    parser.add_argument("--start_time", type=float, default=0.0, help="First second of the video to include.")
+    parser.add_argument("--duration", type=float, default=DEFAULT_PROXY_DURATION, help=f"Seconds of video to include (default: {DEFAULT_PROXY_DURATION:.0f}).")
+    parser.add_argument("--whole_video", action="store_true", help="Include the whole video from --start_time; needs a lot of disk space.")
+
+    args = parser.parse_args()
+
+    for video_path in args.video_paths:
+        build_proxy(video_path, args.scale, args.start_time, None if args.whole_video else args.duration)
@@ -0,0 +1,69 @@
+import numpy as np
+
+
+class RedScorer:
+    """
+    Scores how red the masked pixels of a frame are.
+
+    Only the mask and penalty pixels are gathered and scored, and every intermediate is written
+    into arrays allocated once here, so scoring a frame allocates no frame-sized temporaries.
+    """
+
+    def __init__(self, mask_pixels, nearby_penalty_pixels, nearby_penalty_weight):
+        self.nearby_penalty_weight = nearby_penalty_weight
+        self.mask_indices = np.flatnonzero(mask_pixels)
+        self.mask_buffers = self.allocate_buffers(len(self.mask_indices))
+        self.nearby_penalty_indices = None
+        if nearby_penalty_pixels is not None:
+            self.nearby_penalty_indices = np.flatnonzero(nearby_penalty_pixels)
+            self.nearby_penalty_buffers = self.allocate_buffers(len(self.nearby_penalty_indices))
+
+    @staticmethod
+    def allocate_buffers(pixel_count):
+        return {
+            "pixels": np.empty((pixel_count, 3), dtype=np.uint8),
+            "rgb": np.empty((pixel_count, 3), dtype=np.float32),
+            "closeness": np.empty(pixel_count, dtype=np.float32),
+            "dominance": np.empty(pixel_count, dtype=np.float32),
+            "scratch": np.empty(pixel_count, dtype=np.float32),
+        }
+
+    @staticmethod
+    def red_dominance(frame, indices, buffers):
+        pixels, rgb, dominance = buffers["pixels"], buffers["rgb"], buffers["dominance"]
+        # mode="clip" lets take() write straight into out (indices are always in range)
+        np.take(frame.reshape(-1, 3), indices, axis=0, out=pixels, mode="clip")
+        np.multiply(pixels, np.float32(1.0 / 255.0), out=rgb)
+        np.maximum(rgb[:, 1], rgb[:, 0], out=dominance)
+        np.subtract(rgb[:, 2], dominance, out=dominance)
+        np.clip(dominance, 0.0, 1.0, out=dominance)
+        return dominance
+
+    def score(self, frame):
+        buffers = self.mask_buffers
+        red_dominance = self.red_dominance(frame, self.mask_indices, buffers)
+        rgb, closeness_to_red, scratch = buffers["rgb"], buffers["closeness"], buffers["scratch"]
+
+        # Blend geometric closeness to pure red with red dominance to reduce false positives.
+        # closeness = 1 - sqrt((1 - r)^2 + g^2 + b^2) / sqrt(3)
+        np.subtract(1.0, rgb[:, 2], out=closeness_to_red)
+        np.square(closeness_to_red, out=closeness_to_red)
+        np.square(rgb[:, 1], out=scratch)
+        closeness_to_red += scratch
+        np.square(rgb[:, 0], out=scratch)
+        closeness_to_red += scratch
+        np.sqrt(closeness_to_red, out=closeness_to_red)
+        closeness_to_red *= -1.0 / np.sqrt(3.0)
+        closeness_to_red += 1.0
+
+        # mean(0.4 * closeness + 0.6 * dominance) without building the combined array
+        in_mask_score = (0.4 * float(np.mean(closeness_to_red))) + (0.6 * float(np.mean(red_dominance)))
+
+        nearby_penalty_score = 0.0
+        if self.nearby_penalty_indices is not None:
+            # Penalize nearby red bleed outside the circles.
+            nearby_red_dominance = self.red_dominance(frame, self.nearby_penalty_indices, self.nearby_penalty_buffers)
+            nearby_penalty_score = float(np.mean(nearby_red_dominance))
+
+        final_score = in_mask_score - (self.nearby_penalty_weight * nearby_penalty_score)
+        return float(np.clip(final_score, -1.0, 1.0))
@@ -0,0 +1,158 @@
+import argparse
+import subprocess
+import time
+
+
+def extract_audio(video_path, start_time, duration, sample_rate):
+    """
+    Decode a low-rate mono audio segment of a video through an ffmpeg pipe.
+
+    Parameters:
+    - video_path: Path to the video file
+    - start_time: Segment start (in seconds)
+    - duration: Segment length (in seconds)
+    - sample_rate: Output sample rate in Hz; a few kHz is enough for alignment
+
+    Returns:
+    - 1-D float32 numpy array of samples, empty if the video has no audio stream
+    """
+    import numpy as np
+
+    cmd = [
+        "ffmpeg", "-v", "error",
+        "-ss", str(start_time), "-t", str(duration),
+        "-i", video_path,
+        "-vn", "-ac", "1", "-ar", str(sample_rate),
+        "-f", "f32le", "-",
+    ]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    except subprocess.CalledProcessError as e:
+        # ffmpeg fails this way when -vn leaves no stream to output; any other failure (missing or corrupt
+        # file, bad seek) is not a silent track
+        if "does not contain any stream" not in e.stderr.decode(errors="replace"):
+            raise
+        print(f"No audio stream in {video_path}")
+        return np.zeros(0, dtype=np.float32)
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def find_audio_offset(audio1, audio2, sample_rate, max_offset=None):
+    """
+    Find the lag between two audio signals with FFT-based cross-correlation.
+
+    Parameters:
+    - audio1, audio2: 1-D sample arrays at the same sample_rate
+    - sample_rate: Sample rate in Hz
+    - max_offset: Optional limit (in seconds) on the absolute lag searched
+
+    Returns:
+    - (lag in seconds, confidence). A sound at time a in audio1 and b in audio2 gives lag = a - b.
+      The confidence is the height of the correlation peak in standard deviations above the
+      rest of the correlation; values below ~5 mean the peak is not trustworthy.
+    """
+    import numpy as np
+
+    audio1 = (audio1 - audio1.mean()) / (audio1.std() + 1e-12)
+    audio2 = (audio2 - audio2.mean()) / (audio2.std() + 1e-12)
+
+    n = 1 << int(np.ceil(np.log2(len(audio1) + len(audio2) - 1)))
+    correlation = np.fft.irfft(np.fft.rfft(audio1, n) * np.conj(np.fft.rfft(audio2, n)), n)
+    # Index k holds lag k for k < len(audio1) and lag k - n for the wrapped negative lags
+    lags = np.arange(n)
+    lags[lags >= len(audio1)] -= n
+    valid = (lags > -len(audio2))
+    if max_offset is not None:
+        valid &= np.abs(lags) <= int(max_offset * sample_rate)
+
+    correlation = np.where(valid, correlation, -np.inf)
+    peak_index = int(np.argmax(correlation))
+
+    # Compare the peak against the correlation away from it (0.1s either side is excluded)
+    guard = max(1, int(0.1 * sample_rate))
+    sidelobes = valid & (np.abs(lags - lags[peak_index]) > guard)
+    if np.count_nonzero(sidelobes) > 1:
+        rest = correlation[sidelobes]
+        confidence = float((correlation[peak_index] - rest.mean()) / (rest.std() + 1e-12))
+    else:
+        confidence = 0.0
+
+    return float(lags[peak_index] / sample_rate), confidence
+
+
+def refine_with_frames(video1_path, video2_path, video1_time, predicted_video2_time, window):
+    """
+    Confirm an audio offset visually by searching a narrow window of video 2 around the predicted time.
+
+    Returns:
+    - Refined video 2 time (in seconds) matching video1_time, or None on failure
+    """
+    # Imported here so the audio-only path does not pay the OpenCV import cost
+    import cv2
+    from f1_23_search_matching_frame import find_most_similar_frame, find_resolution_scale_factor, scale_frame
+
+    scale_factor1, scale_factor2 = find_resolution_scale_factor(video1_path, video2_path)
+    video1, video2 = cv2.VideoCapture(video1_path), cv2.VideoCapture(video2_path)
+    fps_video1, fps_video2 = video1.get(cv2.CAP_PROP_FPS), video2.get(cv2.CAP_PROP_FPS)
+    video2.release()
+    video1.set(cv2.CAP_PROP_POS_FRAMES, int(fps_video1 * video1_time))
+    ret, reference_frame = video1.read()
+    video1.release()
+    if not ret:
+        print("Error reading reference frame of video 1.")
+        return None
+
+    start_frame = max(0, int(fps_video2 * (predicted_video2_time - window)))
+    frame_number, _, _, _ = find_most_similar_frame(scale_frame(reference_frame, scale_factor1), video2_path, scale_factor2, 2 * window, start_frame)
+    if frame_number < 0:
+        return None
+    return frame_number / fps_video2
+
+
+def main(video1_path, video2_path, duration, video1_start_time, video2_start_time, sample_rate, max_offset, refine_window):
+    start = time.time()
+    audio1 = extract_audio(video1_path, video1_start_time, duration, sample_rate)
+    audio2 = extract_audio(video2_path, video2_start_time, duration, sample_rate)
+    if len(audio1) == 0 or len(audio2) == 0:
+        print("Error: Couldn't extract audio from both videos. Use f1_23_search_matching_frame.py to match them visually.")
+        return
+    extract_time = time.time() - start
+
+    lag, confidence = find_audio_offset(audio1, audio2, sample_rate, max_offset)
+    # Same convention as f1_23_search_matching_frame.py: video 1 time minus video 2 time
+    time_difference = video1_start_time - video2_start_time + lag
+    correlate_time = time.time() - start - extract_time
+
+    print(f"Audio extraction time: {extract_time:.2f} seconds")
+    print(f"Cross-correlation time: {correlate_time:.2f} seconds")
+    print(f"Time Difference (audio): {time_difference:.6f} seconds (confidence: {confidence:.1f})")
+
+    if refine_window is not None:
+        predicted_video2_time = video1_start_time - time_difference
+        video2_time = refine_with_frames(video1_path, video2_path, video1_start_time, predicted_video2_time, refine_window)
+        if video2_time is None:
+            print("Visual refinement failed; keeping the audio offset.")
+            return
+        print(f"Matching Time Video 1: {video1_start_time:.6f} seconds")
+        print(f"Matching Time Video 2: {video2_time:.6f} seconds")
+        print(f"Time Difference (refined): {video1_start_time - video2_time:.6f} seconds")
+        print(f"Total time: {time.time() - start:.2f} seconds")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find the time offset between two videos by cross-correlating their audio tracks.")
+    parser.add_argument("video1_path", type=str, help="Path to the first video file.")
+    parser.add_argument("video2_path", type=str, help="Path to the second video file.")
+    parser.add_argument("--duration", type=float, default=300.0, help="Length (in seconds) of audio taken from each video.")
+    parser.add_argument("--video1_start", type=float, default=0, help="Video 1 start time (in seconds). Audio before this time is ignored.")
+    parser.add_argument("--video2_start", type=float, default=0, help="Video 2 start time (in seconds). Audio before this time is ignored.")
+    parser.add_argument("--sample_rate", type=int, default=4000, help="Sample rate (in Hz) the audio is decoded at.")
+    parser.add_argument("--max_offset", type=float, default=None, help="Largest offset (in seconds) between the two audio segments to consider.")
+    parser.add_argument(
+        "--refine", type=float, default=None, metavar="WINDOW",
+        help="Refine the audio offset with a visual search of +/- WINDOW seconds in video 2 around the frame at --video1_start."
+    )
+
+    args = parser.parse_args()
+
+    main(args.video1_path, args.video2_path, args.duration, args.video1_start, args.video2_start, args.sample_rate, args.max_offset, args.refine)
@@ -4,7 +4,13 @@ import cv2
 from PIL import Image, ImageTk
 import sys
 import os
+import threading
 import numpy as np
+from f1_23_index_scenes import candidate_frame_ranges, load_scene_index
+from f1_23_mask_indices import load_mask_indices
+from f1_23_proxy_frames import load_proxy
+from f1_23_red_scorer import RedScorer
+from f1_23_thumbnail_sprites import load_or_build_sprite_sheet
 
 class VideoFrameExtractor(tk.Tk):
     def __init__(self, file_path):
@@ -21,14 +27,47 @@ class VideoFrameExtractor(tk.Tk):
         self.mask_pixel_count = 0
         self.nearby_penalty_pixels = None
         self.nearby_penalty_pixel_count = 0
+        self.red_scorer = None
+        self.scan_frame = None  # Decode buffer reused by the scanning loops
         self.nearby_penalty_weight = 0.35
         self.nearby_penalty_radius_px = 10
-        self.search_window_increment_seconds = 5 * 60
-        self.search_window_start_seconds = 0
+        # Adaptive red-light scan: the stride widens where the mask shows no red and tightens where it does
+        self.red_scan_min_stride_seconds = 0.5
+        # Well under the ~3 s from the third light to lights out, so a lit gantry cannot be stepped over
+        self.red_scan_max_stride_seconds = 2.0
+        self.red_scan_min_lights_on_seconds = 1.0
+        # Dark frames in a row that confirm lights out
+        self.consecutive_drop_frames_required = 2
+        self.red_scan_start_frame = 0
+        self.red_scan_stride_frames = 1
+        # Forward gaps up to this long are decoded through instead of seeking over them, which decodes from
+        # the previous keyframe anyway. Every frame the scan decodes is then counted in scan_frames_decoded.
+        self.red_scan_max_decode_gap_seconds = 1.0
+        self.scan_frames_decoded = 0
+        self.scan_seeks = 0
+        self.scan_position = None  # Frame the next read returns, or None after another use of vid_cap
+        self.scene_index = None
+        self.proxy = None  # ProxyFrames of the video (f1_23_proxy_frames.py), if one was built
+        self.proxy_red_scorer = None  # Red scorer at the proxy resolution
+        # Samples (and indexed shots) whose red score stays below this cannot show the start lights
+        self.min_red_score = 0.3
+        self.sprite_sheet = None
+        self.sprite_sheet_job = None  # (video path, result holder) of the background sprite sheet build
+        self.scrubber_height = 40
+        self.scrubbing = False
 
         self.canvas = tk.Canvas(self)
         self.canvas.pack(fill=tk.BOTH, expand=True)
 
+        # Timeline scrubber: cached thumbnails while hovering/dragging, a real seek only on release
+        self.scrubber = tk.Canvas(self, height=self.scrubber_height, bg="black", highlightthickness=0)
+        self.scrubber.pack(side=tk.TOP, fill=tk.X)
+        self.scrubber.bind("<Motion>", self.on_scrubber_hover)
+        self.scrubber.bind("<ButtonPress-1>", self.on_scrubber_drag)
+        self.scrubber.bind("<B1-Motion>", self.on_scrubber_drag)
+        self.scrubber.bind("<ButtonRelease-1>", self.on_scrubber_release)
+        self.scrubber.bind("<Leave>", self.on_scrubber_leave)
+
         control_frame = tk.Frame(self)
         control_frame.pack(side=tk.TOP, fill=tk.X)
 
@@ -60,21 +99,25 @@ class VideoFrameExtractor(tk.Tk):
         # Load video from the given file path
         self.load_video(file_path)
 
+    @staticmethod
+    def format_time(time_in_seconds):
+        hours = int(time_in_seconds // 3600)
+        minutes = int((time_in_seconds % 3600) // 60)
+        seconds = time_in_seconds % 60
+
+        if hours > 0:
+            return f"{hours:02}:{minutes:02}:{seconds:06.4f}"
+        return f"{minutes:02}:{seconds:06.4f}"
+
     def update_status(self):
         if self.vid_cap is not None:
             time_in_seconds = self.current_frame / self.fps
-            hours = int(time_in_seconds // 3600)
-            minutes = int((time_in_seconds % 3600) // 60)
-            seconds = time_in_seconds % 60
-
-            if hours > 0:
-                time_str = f"{hours:02}:{minutes:02}:{seconds:06.4f}"
-            else:
-                time_str = f"{minutes:02}:{seconds:06.4f}"
+            time_str = self.format_time(time_in_seconds)
 
             self.status_label.config(text=f"Frame: {self.current_frame} Time: {time_str} ({time_in_seconds:06.4f}s)")
             self.jump_entry.delete(0, tk.END)
             self.jump_entry.insert(0, time_str)
+            self.draw_scrubber_marker(self.current_frame)
 
     def load_video(self, file_path):
         self.vid_cap = cv2.VideoCapture(file_path)
@@ -86,7 +129,10 @@ class VideoFrameExtractor(tk.Tk):
         self.total_frames = int(self.vid_cap.get(cv2.CAP_PROP_FRAME_COUNT))
         self.fps = self.vid_cap.get(cv2.CAP_PROP_FPS)
         self.current_frame = 0
-        self.search_window_start_seconds = 0
+        self.red_scan_start_frame = 0
+        self.scene_index = load_scene_index(file_path)
+        self.proxy = load_proxy(file_path)
+        self.start_sprite_sheet_job(file_path)
 
         frame_width = int(self.vid_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         frame_height = int(self.vid_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
@@ -96,14 +142,17 @@ class VideoFrameExtractor(tk.Tk):
         self.width = 960
         self.height = int(self.width * 9 / 16)
 
-        self.geometry(f"{self.width}x{self.height+100}")
+        self.geometry(f"{self.width}x{self.height + 100 + self.scrubber_height}")
         self.canvas.config(width=self.width, height=self.height)
 
         self.show_frame()
 
     def load_mask(self, frame_width, frame_height):
+        self.red_scorer = None
+        self.proxy_red_scorer = None
         mask_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mask.png")
-        mask = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
+        binary_mask = load_mask_indices(mask_path, frame_width, frame_height)
+        mask = binary_mask if binary_mask is not None else cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
 
         if mask is None:
             self.mask_pixels = None
@@ -113,8 +162,9 @@ class VideoFrameExtractor(tk.Tk):
             messagebox.showwarning("Mask Missing", f"Could not load mask file: {mask_path}")
             return
 
-        resized_mask = cv2.resize(mask, (frame_width, frame_height), interpolation=cv2.INTER_NEAREST)
-        _, binary_mask = cv2.threshold(resized_mask, 127, 255, cv2.THRESH_BINARY)
+        if binary_mask is None:
+            resized_mask = cv2.resize(mask, (frame_width, frame_height), interpolation=cv2.INTER_NEAREST)
+            _, binary_mask = cv2.threshold(resized_mask, 127, 255, cv2.THRESH_BINARY)
         self.mask_pixels = binary_mask > 0
         self.mask_pixel_count = int(np.count_nonzero(self.mask_pixels))
 
@@ -132,39 +182,77 @@ class VideoFrameExtractor(tk.Tk):
             self.nearby_penalty_pixels = None
             self.nearby_penalty_pixel_count = 0
             messagebox.showwarning("Mask Invalid", "mask.png did not contain any white mask pixels after resizing.")
+        elif self.proxy is not None:
+            self.proxy_red_scorer = self.build_proxy_red_scorer(binary_mask)
+
+    def build_proxy_red_scorer(self, binary_mask):
+        # Same mask and penalty ring as the full-resolution scorer, scaled to the proxy frames
+        proxy_height, proxy_width = self.proxy.frames.shape[1:3]
+        proxy_mask = cv2.resize(binary_mask, (proxy_width, proxy_height), interpolation=cv2.INTER_NEAREST) > 0
+        if not np.any(proxy_mask):
+            return None
+        kernel_size = max(3, 2 * int(round(self.nearby_penalty_radius_px * self.proxy.scale)) + 1)
+        dilated_mask = cv2.dilate(proxy_mask.astype(np.uint8), np.ones((kernel_size, kernel_size), dtype=np.uint8)) > 0
+        nearby_penalty_pixels = np.logical_and(dilated_mask, np.logical_not(proxy_mask))
+        return RedScorer(proxy_mask, nearby_penalty_pixels if np.any(nearby_penalty_pixels) else None, self.nearby_penalty_weight)
 
     def calculate_red_score(self, frame):
         if self.mask_pixels is None or self.mask_pixel_count == 0:
             return -1.0
 
-        rgb_frame = frame.astype(np.float32) / 255.0
-        r_channel = rgb_frame[:, :, 2]
-        g_channel = rgb_frame[:, :, 1]
-        b_channel = rgb_frame[:, :, 0]
-
-        # Blend geometric closeness to pure red with red dominance to reduce false positives.
-        distance_to_red = np.sqrt((1.0 - r_channel) ** 2 + g_channel ** 2 + b_channel ** 2)
-        closeness_to_red = 1.0 - (distance_to_red / np.sqrt(3.0))
-        red_dominance = np.clip(r_channel - np.maximum(g_channel, b_channel), 0.0, 1.0)
-
-        combined_score = (0.4 * closeness_to_red) + (0.6 * red_dominance)
-        in_mask_score = float(np.mean(combined_score[self.mask_pixels]))
-
-        nearby_penalty_score = 0.0
-        if self.nearby_penalty_pixels is not None and self.nearby_penalty_pixel_count > 0:
-            # Penalize nearby red bleed outside the circles.
-            nearby_penalty_score = float(np.mean(red_dominance[self.nearby_penalty_pixels]))
-
-        final_score = in_mask_score - (self.nearby_penalty_weight * nearby_penalty_score)
-        return float(np.clip(final_score, -1.0, 1.0))
-
-    def find_frame_before_red_drop(self, start_frame, peak_score):
+        if self.red_scorer is None:
+            self.red_scorer = RedScorer(self.mask_pixels, self.nearby_penalty_pixels, self.nearby_penalty_weight)
+        return self.red_scorer.score(frame)
+
+    def seek_scan_frame(self, frame_number):
+        gap = frame_number - self.scan_position if self.scan_position is not None else -1
+        if 0 <= gap <= self.red_scan_max_decode_gap_seconds * max(self.fps, 1):
+            for _ in range(gap):
+                if not self.vid_cap.grab():
+                    break
+                self.scan_frames_decoded += 1
+        else:
+            self.vid_cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+            self.scan_seeks += 1
+        self.scan_position = frame_number
+
+    def read_scan_frame(self):
+        # Decode into the same buffer every time; callers must copy a frame they want to keep.
+        ret, self.scan_frame = self.vid_cap.read(self.scan_frame)
+        if ret:
+            self.scan_frames_decoded += 1
+            self.scan_position += 1
+        return ret, self.scan_frame
+
+    def score_from_proxy(self, frame_number):
+        return self.proxy_red_scorer is not None and self.proxy.covers(frame_number, frame_number + 1)
+
+    def sample_red_score(self, frame_number, full_resolution=False):
+        """
+        Red score of one frame: read from the proxy without decoding if it covers the frame (unless
+        full_resolution), otherwise decoded. Returns None if the frame cannot be read.
+        """
+        if not full_resolution and self.score_from_proxy(frame_number):
+            return self.proxy_red_scorer.score(self.proxy.frame(frame_number))
+        self.seek_scan_frame(frame_number)
+        ret, frame = self.read_scan_frame()
+        return self.calculate_red_score(frame) if ret else None
+
+    def refinement_peak_score(self, frame_number, score):
+        # The refinement compares decoded frames, so a peak scored on the proxy is scored again at full resolution
+        if self.score_from_proxy(frame_number):
+            full_resolution_score = self.sample_red_score(frame_number, full_resolution=True)
+            if full_resolution_score is not None:
+                return full_resolution_score
+        return score
+
+    def find_frame_before_red_drop(self, start_frame, peak_score, end_frame=None):
         # Balanced defaults: require both relative and absolute drop to avoid noise-triggered detection.
         drop_ratio_threshold = 0.70
         drop_abs_threshold = 0.07
-        consecutive_drop_frames_required = 2
 
-        if self.vid_cap is None or start_frame >= self.total_frames - 1:
+        end_frame = self.total_frames if end_frame is None else min(end_frame, self.total_frames)
+        if self.vid_cap is None or start_frame >= end_frame - 1:
             return start_frame, peak_score, start_frame, peak_score, False
 
         last_stable_frame = start_frame
@@ -173,13 +261,14 @@ class VideoFrameExtractor(tk.Tk):
         first_drop_score = None
         drop_streak = 0
 
-        total_refine_frames = max(self.total_frames - (start_frame + 1), 1)
+        total_refine_frames = max(end_frame - (start_frame + 1), 1)
 
-        for offset, frame_number in enumerate(range(start_frame + 1, self.total_frames), start=1):
-            self.vid_cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-            ret, frame = self.vid_cap.read()
+        # Consecutive frames are read in order after a single seek
+        self.seek_scan_frame(start_frame + 1)
+        for offset, frame_number in enumerate(range(start_frame + 1, end_frame), start=1):
+            ret, frame = self.read_scan_frame()
             if not ret:
-                continue
+                break
 
             current_score = self.calculate_red_score(frame)
             relative_threshold = peak_score * drop_ratio_threshold
@@ -200,7 +289,7 @@ class VideoFrameExtractor(tk.Tk):
                 last_stable_frame = frame_number
                 last_stable_score = current_score
 
-            if offset % max(int(self.fps), 1) == 0 or frame_number == self.total_frames - 1:
+            if offset % max(int(self.fps), 1) == 0 or frame_number == end_frame - 1:
                 percent = (offset / total_refine_frames) * 100
                 refine_text = (
                     f"Refining lights-out frame... {percent:05.2f}% "
@@ -210,12 +299,39 @@ class VideoFrameExtractor(tk.Tk):
                 self.update_idletasks()
                 print(refine_text, end="\r", flush=True)
 
-            if drop_streak >= consecutive_drop_frames_required and first_drop_frame is not None:
+            if drop_streak >= self.consecutive_drop_frames_required and first_drop_frame is not None:
                 return last_stable_frame, last_stable_score, first_drop_frame, first_drop_score, True
 
         return start_frame, peak_score, start_frame, peak_score, False
 
+    def scan_sample_frames(self, start_frame):
+        """
+        Yield frame numbers to sample from start_frame to the end of the video, skipping shots the
+        scene index rules out. The stride is read from self.red_scan_stride_frames before each step,
+        so the caller can widen or tighten it between samples.
+        """
+        frame_ranges = [(start_frame, self.total_frames)]
+        if self.scene_index is not None:
+            # Skip shots that never show red in the mask region
+            frame_ranges = candidate_frame_ranges(self.scene_index, start_frame, self.total_frames, min_red_score=self.min_red_score)
+            print(f"Scene index: sampling {sum(end - start for start, end in frame_ranges)} of {self.total_frames - start_frame} frames")
+
+        frame_number = start_frame
+        for range_start, range_end in frame_ranges:
+            frame_number = max(frame_number, range_start)
+            while frame_number < range_end:
+                yield frame_number
+                frame_number += self.red_scan_stride_frames
+
     def auto_detect_red_frame(self):
+        """
+        Scan from the last detected start (or 0:00) to the end of the video for the lights-out frame.
+
+        The stride doubles (up to red_scan_max_stride_seconds) after every sample without red in the mask
+        and snaps back to red_scan_min_stride_seconds as soon as red appears. A red stretch of at least
+        red_scan_min_lights_on_seconds followed by a sharp drop is refined frame by frame, and the scan
+        stops at the first one that is confirmed. If none is confirmed, the highest red peak is refined.
+        """
         if self.vid_cap is None:
             return
 
@@ -223,96 +339,95 @@ class VideoFrameExtractor(tk.Tk):
             messagebox.showerror("Mask Error", "Cannot run detection without a valid mask.png.")
             return
 
-        stride_seconds = 0.5
-        stride_frames = max(1, int(round(self.fps * stride_seconds)))
-
-        current_window_start_seconds = self.search_window_start_seconds
-        current_window_end_seconds = current_window_start_seconds + self.search_window_increment_seconds
+        fps = self.fps if self.fps > 0 else 30.0
+        min_stride_frames = max(1, int(round(fps * self.red_scan_min_stride_seconds)))
+        max_stride_frames = max(min_stride_frames, int(round(fps * self.red_scan_max_stride_seconds)))
+        start_frame = min(self.red_scan_start_frame, self.total_frames)
 
-        if self.fps > 0:
-            start_frame = min(
-                self.total_frames,
-                max(0, int(round(current_window_start_seconds * self.fps))),
-            )
-            end_frame_exclusive = min(
-                self.total_frames,
-                max(1, int(round(current_window_end_seconds * self.fps))),
-            )
-        else:
-            start_frame = 0
-            end_frame_exclusive = self.total_frames
-
-        if start_frame >= self.total_frames or start_frame >= end_frame_exclusive:
+        if start_frame >= self.total_frames:
             messagebox.showinfo(
                 "Search Complete",
-                "No more 5-minute windows left in this video. Reload the video to restart from 0:00.",
+                "The scan reached the end of the video. Reload the video to restart from 0:00.",
             )
             return
 
-        window_start_minutes = current_window_start_seconds / 60.0
-        window_end_minutes = (end_frame_exclusive / self.fps) / 60.0 if self.fps > 0 else 0
-
-        self.status_label.config(
-            text=(
-                f"Scanning red lights in {window_start_minutes:.1f}-{window_end_minutes:.1f} min "
-                f"(every {stride_seconds:.1f}s)..."
-            )
-        )
+        scan_text = f"Scanning red lights from {start_frame / fps / 60.0:.1f} min to the end of the video..."
+        self.status_label.config(text=scan_text)
         self.update_idletasks()
-        print(
-            f"Scanning red lights in {window_start_minutes:.1f}-{window_end_minutes:.1f} min "
-            f"(every {stride_seconds:.1f}s)..."
-        )
+        print(scan_text)
 
+        self.scan_frames_decoded = 0
+        self.scan_seeks = 0
+        self.scan_position = None
+        self.red_scan_stride_frames = min_stride_frames
         best_frame_number = self.current_frame
         best_score = -1.0
+        best_end_sample = None  # First sample without red after the highest peak, bounding its refinement
         processed_samples = 0
-        printed_inline_progress = False
+        red_stretch = None  # [first red frame, last red frame, peak score] of the current stretch
+        detection = None
 
-        frame_indices = list(range(start_frame, end_frame_exclusive, stride_frames))
-        if end_frame_exclusive > start_frame and frame_indices and frame_indices[-1] != end_frame_exclusive - 1:
-            frame_indices.append(end_frame_exclusive - 1)
+        for frame_number in self.scan_sample_frames(start_frame):
+            score = self.sample_red_score(frame_number)
+            if score is None:
+                break
 
-        total_samples = len(frame_indices)
-
-        for sample_index, frame_number in enumerate(frame_indices, start=1):
-            self.vid_cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-            ret, frame = self.vid_cap.read()
-            if not ret:
-                continue
-
-            score = self.calculate_red_score(frame)
+            processed_samples += 1
             if score > best_score:
                 best_score = score
                 best_frame_number = frame_number
-
-            processed_samples += 1
-
-            if sample_index % max(int(self.fps), 1) == 0 or sample_index == total_samples:
-                percent = (sample_index / max(total_samples, 1)) * 100
+                best_end_sample = None
+            elif best_end_sample is None and score < self.min_red_score:
+                best_end_sample = frame_number
+
+            if score >= self.min_red_score:
+                # Red in the mask: sample densely so the lights-out moment is bracketed tightly
+                if red_stretch is None:
+                    red_stretch = [frame_number, frame_number, score]
+                red_stretch[1] = frame_number
+                red_stretch[2] = max(red_stretch[2], score)
+                self.red_scan_stride_frames = min_stride_frames
+            else:
+                if red_stretch is not None:
+                    lights_on_seconds = (red_stretch[1] - red_stretch[0]) / fps
+                    if lights_on_seconds >= self.red_scan_min_lights_on_seconds:
+                        # Lights on, then off: the drop lies between the last red sample and this one. The window
+                        # reaches past this sample so a drop exactly on it still has enough dark frames to confirm.
+                        print()
+                        result = self.find_frame_before_red_drop(
+                            red_stretch[1], self.refinement_peak_score(red_stretch[1], red_stretch[2]),
+                            end_frame=frame_number + self.consecutive_drop_frames_required,
+                        )
+                        if result[4]:
+                            detection = result
+                            break
+                    red_stretch = None
+                self.red_scan_stride_frames = min(self.red_scan_stride_frames * 2, max_stride_frames)
+
+            if processed_samples % 10 == 0:
                 progress_text = (
-                    f"Scanning red lights in {window_start_minutes:.1f}-{window_end_minutes:.1f} min "
-                    f"(every {stride_seconds:.1f}s)... "
-                    f"{percent:05.2f}% (best score: {best_score:.4f})"
+                    f"Scanning red lights... {frame_number / fps / 60.0:.1f} min "
+                    f"(stride {self.red_scan_stride_frames / fps:.1f}s, best score: {best_score:.4f})"
                 )
                 self.status_label.config(text=progress_text)
                 self.update_idletasks()
                 print(progress_text, end="\r", flush=True)
-                printed_inline_progress = True
 
-        if printed_inline_progress:
-            print()
+        print()
 
         if processed_samples == 0:
             messagebox.showerror("Detection Error", "No frames were processed during auto detection.")
             return
 
-        print("Refining detected peak to frame right before red lights disappear...")
-        pre_drop_frame, pre_drop_score, first_drop_frame, first_drop_score, drop_found = self.find_frame_before_red_drop(
-            best_frame_number,
-            best_score,
-        )
-        print()
+        if detection is None:
+            print("No confirmed lights-out; refining the highest red peak to the frame right before red lights disappear...")
+            # Like a confirmed stretch, the red ends before the first sample without it (or the end of the video)
+            end_frame = None if best_end_sample is None else best_end_sample + self.consecutive_drop_frames_required
+            detection = self.find_frame_before_red_drop(
+                best_frame_number, self.refinement_peak_score(best_frame_number, best_score), end_frame=end_frame,
+            )
+            print()
+        pre_drop_frame, pre_drop_score, first_drop_frame, first_drop_score, drop_found = detection
 
         self.current_frame = pre_drop_frame
         self.show_frame()
@@ -326,31 +441,19 @@ class VideoFrameExtractor(tk.Tk):
                 f"Pre-drop frame: {pre_drop_frame} ({pre_drop_time_seconds:.4f}s) score {pre_drop_score:.4f} | "
                 f"First drop frame: {first_drop_frame} ({first_drop_time_seconds:.4f}s) score {first_drop_score:.4f}"
             )
+            # The next click looks for a later start (e.g. a restart)
+            self.red_scan_start_frame = first_drop_frame + 1
         else:
             final_text = (
                 f"Frame: {best_frame_number} (peak red) | Peak score: {best_score:.4f} | "
                 "No significant drop found ahead"
             )
+            self.red_scan_start_frame = self.total_frames
 
         self.status_label.config(text=final_text)
         print(final_text)
         print(f"Selected frame/time: {self.current_frame} ({selected_time_seconds:.4f}s)")
-
-        self.search_window_start_seconds += self.search_window_increment_seconds
-        if self.fps > 0:
-            max_video_seconds = self.total_frames / self.fps
-            if self.search_window_start_seconds >= max_video_seconds:
-                print("Next search window: end of video reached")
-            else:
-                next_window_start_seconds = self.search_window_start_seconds
-                next_window_end_seconds = min(
-                    next_window_start_seconds + self.search_window_increment_seconds,
-                    max_video_seconds,
-                )
-                print(
-                    f"Next search window: {next_window_start_seconds / 60.0:.1f}-"
-                    f"{next_window_end_seconds / 60.0:.1f} min"
-                )
+        print(f"Decoded {self.scan_frames_decoded} frames and seeked {self.scan_seeks} times ({processed_samples} scan samples)")
 
     def show_frame(self):
         if self.vid_cap is not None:
@@ -427,14 +530,122 @@ class VideoFrameExtractor(tk.Tk):
             new_width = event.width
             new_height = int(new_width * 9 / 16)
             
-            if new_height > event.height - 100:
-                new_height = event.height - 100
+            if new_height > event.height - 100 - self.scrubber_height:
+                new_height = event.height - 100 - self.scrubber_height
                 new_width = int(new_height * 16 / 9)
             
             self.width = new_width
             self.height = new_height
             self.canvas.config(width=self.width, height=self.height)
             self.show_frame()
+            self.draw_scrubber()
+
+    def start_sprite_sheet_job(self, file_path):
+        # Decode the thumbnails in a background thread; the thread never touches Tk, the result is polled.
+        self.sprite_sheet = None
+        result = {}
+        self.sprite_sheet_job = (file_path, result)
+
+        def build():
+            try:
+                result["sprite_sheet"] = load_or_build_sprite_sheet(file_path)
+            except Exception as e:
+                print(f"Couldn't build thumbnails: {e}")
+                result["sprite_sheet"] = None
+
+        threading.Thread(target=build, daemon=True).start()
+        self.draw_scrubber()
+        self.after(200, self.poll_sprite_sheet_job, file_path)
+
+    def poll_sprite_sheet_job(self, file_path):
+        if self.sprite_sheet_job is None or self.sprite_sheet_job[0] != file_path:
+            return  # Another video was loaded in the meantime
+        result = self.sprite_sheet_job[1]
+        if "sprite_sheet" not in result:
+            self.after(200, self.poll_sprite_sheet_job, file_path)
+            return
+        self.sprite_sheet = result["sprite_sheet"]
+        self.draw_scrubber()
+
+    def draw_scrubber(self):
+        self.scrubber.delete("all")
+        width = self.scrubber.winfo_width()
+        if width <= 1:
+            return
+        if self.sprite_sheet is None:
+            text = "Building thumbnails..." if self.sprite_sheet_job is not None and "sprite_sheet" not in self.sprite_sheet_job[1] else "No thumbnails"
+            self.scrubber.create_text(width // 2, self.scrubber_height // 2, text=text, fill="white")
+            return
+
+        # Film strip of evenly spaced thumbnails across the whole video
+        strip_thumbnail_width = max(1, int(self.scrubber_height * 16 / 9))
+        count = max(1, width // strip_thumbnail_width + 1)
+        duration = self.total_frames / self.fps if self.fps > 0 else 0.0
+        strip = np.hstack([
+            cv2.resize(self.sprite_sheet.thumbnail_at_time((i + 0.5) / count * duration), (strip_thumbnail_width, self.scrubber_height), interpolation=cv2.INTER_AREA)
+            for i in range(count)
+        ])[:, :width]
+        self.scrubber_photo = ImageTk.PhotoImage(image=Image.fromarray(cv2.cvtColor(strip, cv2.COLOR_BGR2RGB)))
+        self.scrubber.create_image(0, 0, image=self.scrubber_photo, anchor=tk.NW)
+        self.draw_scrubber_marker(self.current_frame)
+
+    def draw_scrubber_marker(self, frame_number):
+        self.scrubber.delete("marker")
+        width = self.scrubber.winfo_width()
+        if self.total_frames > 0 and width > 1:
+            x = frame_number / self.total_frames * width
+            self.scrubber.create_line(x, 0, x, self.scrubber_height, fill="red", width=2, tags="marker")
+
+    def scrubber_frame(self, x):
+        fraction = min(max(x / max(self.scrubber.winfo_width(), 1), 0.0), 1.0)
+        return min(int(fraction * self.total_frames), max(self.total_frames - 1, 0))
+
+    def show_scrubber_preview(self, frame_number, full_size):
+        time_in_seconds = frame_number / self.fps if self.fps > 0 else 0.0
+        thumbnail = self.sprite_sheet.thumbnail_at_time(time_in_seconds)
+        if full_size:
+            preview_size = (self.width, self.height)
+            x, y = 0, 0
+        else:
+            preview_size = (2 * self.sprite_sheet.thumbnail_width, 2 * self.sprite_sheet.thumbnail_height)
+            pointer_x = frame_number / max(self.total_frames, 1) * self.width
+            x = int(min(max(pointer_x - preview_size[0] / 2, 0), max(self.width - preview_size[0], 0)))
+            y = max(self.height - preview_size[1] - 4, 0)
+        if preview_size[0] <= 0 or preview_size[1] <= 0:
+            return
+
+        preview = cv2.resize(thumbnail, preview_size, interpolation=cv2.INTER_LINEAR)
+        self.preview_photo = ImageTk.PhotoImage(image=Image.fromarray(cv2.cvtColor(preview, cv2.COLOR_BGR2RGB)))
+        self.canvas.delete("scrub_preview")
+        self.canvas.create_image(x, y, image=self.preview_photo, anchor=tk.NW, tags="scrub_preview")
+        self.canvas.create_text(
+            x + 4, y + 4, text=self.format_time(time_in_seconds), fill="white", anchor=tk.NW, tags="scrub_preview"
+        )
+
+    def on_scrubber_hover(self, event):
+        if self.sprite_sheet is not None and not self.scrubbing:
+            self.show_scrubber_preview(self.scrubber_frame(event.x), full_size=False)
+
+    def on_scrubber_drag(self, event):
+        if self.sprite_sheet is None:
+            return
+        self.scrubbing = True
+        frame_number = self.scrubber_frame(event.x)
+        self.show_scrubber_preview(frame_number, full_size=True)
+        self.draw_scrubber_marker(frame_number)
+
+    def on_scrubber_release(self, event):
+        if self.vid_cap is None or (self.sprite_sheet is not None and not self.scrubbing):
+            return
+        self.scrubbing = False
+        self.canvas.delete("scrub_preview")
+        # Only now seek and decode the real frame
+        self.current_frame = self.scrubber_frame(event.x)
+        self.show_frame()
+
+    def on_scrubber_leave(self, event):
+        if not self.scrubbing:
+            self.canvas.delete("scrub_preview")
 
 if __name__ == "__main__":
     if len(sys.argv) != 2:
@@ -1,12 +1,20 @@
-import cv2
-import numpy as np
 import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from f1_23_index_scenes import candidate_frame_ranges, load_scene_index, merge_frame_ranges
+from f1_23_proxy_frames import load_proxy
 
-def scale_frame(frame, scale_factor):
-    return cv2.resize(frame, None, fx=scale_factor, fy=scale_factor, interpolation=cv2.INTER_AREA) if scale_factor != 1 else frame
+def scale_frame(frame, scale_factor, dst=None):
+    import cv2
 
-def find_resolution_scale_factor(video1_path, video2_path):
-    cap1, cap2 = cv2.VideoCapture(video1_path), cv2.VideoCapture(video2_path)
+    return cv2.resize(frame, None, dst=dst, fx=scale_factor, fy=scale_factor, interpolation=cv2.INTER_AREA) if scale_factor != 1 else frame
+
+def find_resolution_scale_factor(video1_path, video2_path, vid_caps=None):
+    import cv2
+
+    # Captures passed in vid_caps are reused and left open
+    cap1, cap2 = vid_caps if vid_caps is not None else (cv2.VideoCapture(video1_path), cv2.VideoCapture(video2_path))
     width1, height1 = cap1.get(cv2.CAP_PROP_FRAME_WIDTH), cap1.get(cv2.CAP_PROP_FRAME_HEIGHT)
     width2, height2 = cap2.get(cv2.CAP_PROP_FRAME_WIDTH), cap2.get(cv2.CAP_PROP_FRAME_HEIGHT)
     
@@ -22,7 +30,8 @@ def find_resolution_scale_factor(video1_path, video2_path):
         scale_factor1 = min(width2 / width1, height2 / height1)  # Scale video1 to match video2's resolution
         scale_factor2 = 1  # Keep original size for video2
         
-    cap1.release(), cap2.release()
+    if vid_caps is None:
+        cap1.release(), cap2.release()
     return scale_factor1, scale_factor2
 
 
@@ -75,78 +84,248 @@ def crop_from_top_percentage(image, x1, x2):
     return cropped_image
 
 
-def gaussian_blur_and_histogram_equalization(image):
+def gaussian_blur_and_histogram_equalization(image, buffers=None):
     """
     Apply Gaussian Blur and then Histogram Equalization to an image.
 
     Parameters:
     - image: A cv2 image object (numpy array).
+    - buffers: Optional dict of scratch arrays kept between calls. Each intermediate is written
+      into its buffer from the previous call instead of being allocated again. The returned
+      image is one of these buffers, so it is overwritten by the next call.
 
     Returns:
     - result_image: The processed image after applying Gaussian Blur and Histogram Equalization.
     """
+    import cv2
+
+    if buffers is None:
+        buffers = {}
 
     # Apply Gaussian Blur to the image
-    blurred_image = cv2.GaussianBlur(image, (5, 5), 0)
+    blurred_image = buffers["blurred"] = cv2.GaussianBlur(image, (5, 5), 0, dst=buffers.get("blurred"))
     
     #Check if the image is colored (3 channels) or grayscale
     if len(blurred_image.shape) == 3 and blurred_image.shape[2] == 3:
         # Convert the image to the YCrCb color space
-        ycrcb_image = cv2.cvtColor(blurred_image, cv2.COLOR_BGR2YCrCb)
-        # Split the channels
-        y_channel, cr_channel, cb_channel = cv2.split(ycrcb_image)
-        # Apply Histogram Equalization to the Y channel
-        equalized_y_channel = cv2.equalizeHist(y_channel)
-        # Merge the channels back
-        merged_channels = cv2.merge((equalized_y_channel, cr_channel, cb_channel))
+        ycrcb_image = buffers["ycrcb"] = cv2.cvtColor(blurred_image, cv2.COLOR_BGR2YCrCb, dst=buffers.get("ycrcb"))
+        # Apply Histogram Equalization to the Y channel in place
+        y_channel = buffers["y"] = cv2.extractChannel(ycrcb_image, 0, dst=buffers.get("y"))
+        cv2.equalizeHist(y_channel, dst=y_channel)
+        cv2.insertChannel(y_channel, ycrcb_image, 0)
         # Convert back to the BGR color space
-        result_image = cv2.cvtColor(merged_channels, cv2.COLOR_YCrCb2BGR)
+        result_image = buffers["result"] = cv2.cvtColor(ycrcb_image, cv2.COLOR_YCrCb2BGR, dst=buffers.get("result"))
     else:
         # Assume the image is grayscale and directly apply Histogram Equalization
-        result_image = cv2.equalizeHist(blurred_image)
+        result_image = buffers["result"] = cv2.equalizeHist(blurred_image, dst=buffers.get("result"))
 
     return result_image
 
 
-def find_most_similar_frame(reference_frame, target_video_path, scale_factor, duration_limit, starting_frame_number):
+def split_into_tiles(image, tile_size):
+    """
+    Split an image into tiles ordered from most to least discriminative.
+
+    Parameters:
+    - image: cv2 image object the tiles are taken from (the reference crop)
+    - tile_size: Width and height of a tile in pixels (edge tiles may be smaller)
+
+    Returns:
+    - List of (row slice, column slice) tuples, highest pixel variance first
+    """
+    import numpy as np
+
+    height, width = image.shape[:2]
+    tiles = []
+    for y in range(0, height, tile_size):
+        for x in range(0, width, tile_size):
+            tile = (slice(y, min(y + tile_size, height)), slice(x, min(x + tile_size, width)))
+            tiles.append((float(np.var(image[tile])), tile))
+
+    # Flat tiles (sky, tarmac) say little about which frame matches, so they are summed last
+    tiles.sort(key=lambda item: item[0], reverse=True)
+    return [tile for _, tile in tiles]
+
+
+def tiled_sad(reference_frame, frame, tiles, best_score):
+    """
+    Sum of absolute differences accumulated tile by tile.
+
+    Stops as soon as the partial sum can no longer beat best_score.
+
+    Returns:
+    - (score, tiles_evaluated). score is only the full SAD if all tiles were evaluated.
+    """
+    import cv2
+
+    score = 0.0
+    for tiles_evaluated, tile in enumerate(tiles, start=1):
+        score += cv2.norm(reference_frame[tile], frame[tile], cv2.NORM_L1)
+        if score >= best_score:
+            return score, tiles_evaluated
+    return score, len(tiles)
+
+
+def print_tile_stats(label, tiles_evaluated, tile_count):
+    if not tiles_evaluated:
+        return
+    average_tiles = sum(tiles_evaluated) / len(tiles_evaluated)
+    pruned = 100 * (1 - average_tiles / tile_count)
+    print(f"{label}: {average_tiles:.1f} of {tile_count} tiles evaluated per frame on average ({pruned:.1f}% pruned)")
+
+
+def decode_strided_frames(target_cap, frame_ranges, stride):
+    """Yield (frame number, frame) for every stride-th frame of each range. The frame buffer is reused between yields."""
+    import cv2
+
+    frame = None
+    position = None
+    for range_start, range_end in frame_ranges:
+        if position != range_start:
+            target_cap.set(cv2.CAP_PROP_POS_FRAMES, range_start)
+            position = range_start
+        while position < range_end:
+            if (position - range_start) % stride == 0:
+                ret, frame = target_cap.read(frame)
+                if not ret:
+                    break
+                yield position, frame
+            elif not target_cap.grab():  # Skipped frames are decoded but not converted or scored
+                break
+            position += 1
+
+
+def coarse_temporal_search(target_cap, reference_frame, frame_ranges, stride, top_k, coarse_scale=0.125, proxy=None):
+    """
+    First level of the temporal pyramid: score every stride-th frame on heavily downscaled crops.
+
+    Parameters:
+    - target_cap: Open cv2.VideoCapture of the target video
+    - reference_frame: Reference image, already scaled to the comparison resolution
+    - frame_ranges: (start, end exclusive) frame ranges to sample
+    - stride: Distance in frames between sampled frames
+    - top_k: Number of best samples whose neighbourhoods are refined
+    - coarse_scale: Downscale factor applied to the cropped frames
+    - proxy: Optional ProxyFrames of the target video (see f1_23_proxy_frames.py). Samples are read from it
+      instead of being decoded when it covers frame_ranges.
+
+    Returns:
+    - (start, end exclusive) frame ranges around the top_k samples, to be searched frame by frame at full resolution
+    """
+    import cv2
+
+    reference_crop = crop_from_top_percentage(reference_frame, 20, 65)
+    reference_small = gaussian_blur_and_histogram_equalization(
+        cv2.resize(reference_crop, None, fx=coarse_scale, fy=coarse_scale, interpolation=cv2.INTER_AREA)
+    )
+    # Target crops are resized straight to the reference's small size, which also absorbs the resolution scale factor
+    small_size = (reference_small.shape[1], reference_small.shape[0])
+
+    if proxy is not None and all(proxy.covers(range_start, range_end) for range_start, range_end in frame_ranges):
+        # The proxy frames are already decoded and downscaled; only every stride-th one is read
+        sampled_frames = (
+            (position, proxy.frame(position))
+            for range_start, range_end in frame_ranges
+            for position in range(range_start, range_end, stride)
+        )
+    else:
+        sampled_frames = decode_strided_frames(target_cap, frame_ranges, stride)
+
+    samples = []  # (score, frame number)
+    small_frame, buffers = None, {}
+    for position, frame in sampled_frames:
+        small_frame = cv2.resize(crop_from_top_percentage(frame, 20, 65), small_size, dst=small_frame, interpolation=cv2.INTER_AREA)
+        processed_frame = gaussian_blur_and_histogram_equalization(small_frame, buffers)
+        samples.append((cv2.norm(reference_small, processed_frame, cv2.NORM_L1), position))
+
+    # The best frame lies strictly between a top sample's neighbours
+    regions = merge_frame_ranges((frame_number - stride + 1, frame_number + stride) for _, frame_number in sorted(samples)[:top_k])
+    return [
+        (max(region_start, range_start), min(region_end, range_end))
+        for region_start, region_end in regions
+        for range_start, range_end in frame_ranges
+        if max(region_start, range_start) < min(region_end, range_end)
+    ]
+
+
+def find_most_similar_frame(reference_frame, target_video_path, scale_factor, duration_limit, starting_frame_number, tile_size=64, show_progress=True, scene_index=None, coarse_stride=0, coarse_top_k=3, proxy=None, target_cap=None):
+    """
+    Find the frame of the target video most similar to reference_frame (top 20-65% crop, blurred and equalized).
+
+    With coarse_stride > 1 a temporal pyramid is used: every coarse_stride-th frame is scored on a
+    heavily downscaled crop first, and only the neighbourhoods of the coarse_top_k best samples are
+    compared frame by frame at full resolution. The coarse samples are read from proxy (ProxyFrames of
+    the target video) instead of being decoded, if given. target_cap is an open cv2.VideoCapture of
+    the target video to reuse instead of opening it; it is left open.
+
+    Returns:
+    - (best frame number, unscaled best frame, tiles evaluated per compared frame, tiles per frame)
+    """
+    import cv2
     
+    # The unprocessed reference is kept for the scene index histogram and the coarse search
+    raw_reference_frame = reference_frame
     reference_frame = gaussian_blur_and_histogram_equalization(crop_from_top_percentage(reference_frame, 20, 65))
+    tiles = split_into_tiles(reference_frame, tile_size)
  
-    target_cap = cv2.VideoCapture(target_video_path)
+    owns_capture = target_cap is None
+    if owns_capture:
+        target_cap = cv2.VideoCapture(target_video_path)
     target_cap.set(cv2.CAP_PROP_POS_FRAMES, starting_frame_number)
     fps = target_cap.get(cv2.CAP_PROP_FPS)  # Frames per second
     max_frame_number = starting_frame_number + int(fps * duration_limit)
     
     best_score, best_frame_number = float('inf'), -1
     best_frame_image = None  # Store the unscaled image of the most similar frame
+    tiles_evaluated = []  # Number of tiles compared for each frame before it was abandoned
     frame_count = starting_frame_number
-    
-    while frame_count < max_frame_number:
-        ret, frame = target_cap.read()
-        if not ret:
-            break
-        scaled_frame = scale_frame(frame, scale_factor)
-        cropped_scaled_frame = gaussian_blur_and_histogram_equalization(crop_from_top_percentage(scaled_frame, 20, 65))
-
-        # Compute the absolute difference
-        diff = cv2.absdiff(reference_frame, cropped_scaled_frame)
-        score = np.sum(diff)
 
-        if score < best_score:
-            best_score, best_frame_number = score, frame_count
-            best_frame_image = frame  # Store the current frame as it's the best match so far
-            cv2.imshow("Similar Frame Search", cv2.hconcat([reference_frame, cropped_scaled_frame]))
-            cv2.waitKey(1)
-
-        frame_count += 1
+    # With a scene index of the target video, only shots whose luma histogram is close to the reference are decoded
+    frame_ranges = [(starting_frame_number, max_frame_number)]
+    if scene_index is not None:
+        frame_ranges = candidate_frame_ranges(scene_index, starting_frame_number, max_frame_number, reference_image=raw_reference_frame, fall_back_to_window=True)
+    if coarse_stride > 1:
+        frame_ranges = coarse_temporal_search(target_cap, raw_reference_frame, frame_ranges, coarse_stride, coarse_top_k, proxy=proxy)
+        frame_count = None  # Force a seek to the first refinement range
+
+    # The decoded frame and every intermediate reuse the previous frame's arrays
+    frame, scaled_frame, buffers = None, None, {}
+    for range_start, range_end in frame_ranges:
+        if range_start != frame_count:
+            target_cap.set(cv2.CAP_PROP_POS_FRAMES, range_start)
+            frame_count = range_start
+
+        while frame_count < range_end:
+            ret, frame = target_cap.read(frame)
+            if not ret:
+                break
+            scaled_frame = scale_frame(frame, scale_factor, dst=scaled_frame)
+            cropped_scaled_frame = gaussian_blur_and_histogram_equalization(crop_from_top_percentage(scaled_frame, 20, 65), buffers)
+
+            # Compute the absolute difference, abandoning the frame once it cannot beat the best
+            score, frame_tiles_evaluated = tiled_sad(reference_frame, cropped_scaled_frame, tiles, best_score)
+            tiles_evaluated.append(frame_tiles_evaluated)
+
+            if score < best_score:
+                best_score, best_frame_number = score, frame_count
+                best_frame_image = frame.copy()  # Store the current frame as it's the best match so far
+                if show_progress:
+                    cv2.imshow("Similar Frame Search", cv2.hconcat([reference_frame, cropped_scaled_frame]))
+                    cv2.waitKey(1)
+
+            frame_count += 1
     
-    target_cap.release()
-    cv2.destroyWindow("Similar Frame Search")
-    return best_frame_number, best_frame_image
+    if owns_capture:
+        target_cap.release()
+    if show_progress:
+        cv2.destroyWindow("Similar Frame Search")
+    return best_frame_number, best_frame_image, tiles_evaluated, len(tiles)
 
 
 def display_matching_images(image1, image2, window_name="Matching Images"):
     # Concatenate images horizontally
+    import cv2
+
     concatenated_image = cv2.hconcat([image1, image2])
 
     # Display the concatenated image
@@ -157,24 +336,271 @@ def display_matching_images(image1, image2, window_name="Matching Images"):
     cv2.destroyAllWindows()
 
 
-def main(video1_path, video2_path, duration, video1_start_time, video2_start_time):
+def preprocess_window(video_path, scale_factor, start_frame, frame_count):
+    """
+    Decode a window of frames and keep the blurred, equalized 20-65% crop of each one.
+
+    Returns:
+    - Array of shape (frames read, crop height, crop width, 3)
+    """
+    import cv2
+    import numpy as np
+
+    cap = cv2.VideoCapture(video_path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    window = None
+    frame, scaled_frame, buffers = None, None, {}
+    frames_read = 0
+    while frames_read < frame_count:
+        ret, frame = cap.read(frame)
+        if not ret:
+            break
+        scaled_frame = scale_frame(frame, scale_factor, dst=scaled_frame)
+        if window is not None:
+            buffers["result"] = window[frames_read]  # Preprocess straight into the window
+        processed_frame = gaussian_blur_and_histogram_equalization(crop_from_top_percentage(scaled_frame, 20, 65), buffers)
+        if window is None:
+            window = np.empty((frame_count,) + processed_frame.shape, dtype=processed_frame.dtype)
+            window[0] = processed_frame
+        frames_read += 1
+    cap.release()
+    return window[:frames_read] if window is not None else None
+
+
+def search_window(reference_frame, window, tile_size=64):
+    """
+    Find the frame of a preprocessed window most similar to an already preprocessed reference crop.
+
+    Returns:
+    - (index of the best frame in the window, tiles evaluated per frame, tiles per frame)
+    """
+    tiles = split_into_tiles(reference_frame, tile_size)
+    best_score, best_index = float('inf'), -1
+    tiles_evaluated = []
+    for index, processed_frame in enumerate(window):
+        score, frame_tiles_evaluated = tiled_sad(reference_frame, processed_frame, tiles, best_score)
+        tiles_evaluated.append(frame_tiles_evaluated)
+        if score < best_score:
+            best_score, best_index = score, index
+    return best_index, tiles_evaluated, len(tiles)
+
+
+def read_frame(video_path, frame_number):
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+    ret, frame = cap.read()
+    cap.release()
+    return frame if ret else None
+
+
+def window_memory_mb(video_path, scale_factor, duration):
+    """Memory (in MB) needed to keep the preprocessed crops of a duration-second window of a video."""
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) * scale_factor)
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) * scale_factor)
+    frame_count = int(cap.get(cv2.CAP_PROP_FPS) * duration)
+    cap.release()
+    return frame_count * width * (int(0.65 * height) - int(0.2 * height)) * 3 / 1e6
+
+
+def search_video_chunk(reference_frame, tiles, video_path, scale_factor, start_frame, frame_count):
+    """
+    Stream frames [start_frame, start_frame + frame_count) of a video and compare each one's preprocessed crop
+    with an already preprocessed reference crop. Only the current frame is held in memory.
+
+    Returns:
+    - (best score, best frame number, tiles evaluated per frame)
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    best_score, best_frame_number = float('inf'), -1
+    tiles_evaluated = []
+    frame, scaled_frame, buffers = None, None, {}
+    for frame_number in range(start_frame, start_frame + frame_count):
+        ret, frame = cap.read(frame)
+        if not ret:
+            break
+        scaled_frame = scale_frame(frame, scale_factor, dst=scaled_frame)
+        processed_frame = gaussian_blur_and_histogram_equalization(crop_from_top_percentage(scaled_frame, 20, 65), buffers)
+        score, frame_tiles_evaluated = tiled_sad(reference_frame, processed_frame, tiles, best_score)
+        tiles_evaluated.append(frame_tiles_evaluated)
+        if score < best_score:
+            best_score, best_frame_number = score, frame_number
+    cap.release()
+    return best_score, best_frame_number, tiles_evaluated
+
+
+def search_video_chunked(reference_frame, video_path, scale_factor, start_frame, frame_count, workers, tile_size=64):
+    """
+    Search a window of a video split into one contiguous chunk per worker thread, each streamed from its own
+    decoder. Memory stays at a few frames per worker, whatever the window length or resolution.
+
+    Returns:
+    - (best frame number, tiles evaluated per frame, tiles per frame). Of equally good frames the earliest
+      is returned, as in a sequential search.
+    """
+    tiles = split_into_tiles(reference_frame, tile_size)
+    chunk_length = -(-frame_count // workers)
+    chunk_starts = range(start_frame, start_frame + frame_count, chunk_length)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            lambda chunk_start: search_video_chunk(reference_frame, tiles, video_path, scale_factor, chunk_start, min(chunk_length, start_frame + frame_count - chunk_start)),
+            chunk_starts,
+        ))
+    _, best_frame_number = min(((score, frame_number) for score, frame_number, _ in results if frame_number >= 0), default=(None, -1))
+    return best_frame_number, [count for _, _, chunk_tiles in results for count in chunk_tiles], len(tiles)
+
+
+def find_matching_frames_parallel(video1_path, video2_path, duration, video1_start_time, video2_start_time, in_memory=True, workers=None):
+    """
+    Same searches as find_matching_frames, using several cores.
+
+    With in_memory, both windows are decoded and preprocessed once, concurrently. Every search reference
+    is a frame of one of the two windows, so the forward, reverse and confirmation searches then only
+    compare arrays in memory. Otherwise (windows too large to keep, e.g. 1080p60) each search streams its
+    window in chunks on `workers` threads (search_video_chunked), so memory does not grow with the window.
+    """
+    import cv2
+
     scale_factor1, scale_factor2 = find_resolution_scale_factor(video1_path, video2_path)
     video1, video2 = cv2.VideoCapture(video1_path), cv2.VideoCapture(video2_path)
     fps_video1, fps_video2 = video1.get(cv2.CAP_PROP_FPS), video2.get(cv2.CAP_PROP_FPS)
+    video1.release(), video2.release()
+    video1_start_frame_num = int(fps_video1 * video1_start_time)
+    video2_start_frame_num = int(fps_video2 * video2_start_time)
+    videos = {
+        1: (video1_path, scale_factor1, video1_start_frame_num, int(fps_video1 * duration)),
+        2: (video2_path, scale_factor2, video2_start_frame_num, int(fps_video2 * duration)),
+    }
+
+    if in_memory:
+        # OpenCV releases the GIL while decoding and filtering, so the two windows use separate cores
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = {video: executor.submit(preprocess_window, *videos[video]) for video in videos}
+            windows = {video: future.result() for video, future in futures.items()}
+        start_frame_read = {video: windows[video] is not None for video in videos}
+
+        def reference(video, frame_number):
+            return windows[video][frame_number - videos[video][2]]
+
+        def search(reference_frame, video):
+            index, tiles_evaluated, tile_count = search_window(reference_frame, windows[video])
+            return videos[video][2] + index, tiles_evaluated, tile_count
+    else:
+        workers = workers or os.cpu_count() or 1
+        start_frame_read = {video: read_frame(videos[video][0], videos[video][2]) is not None for video in videos}
+
+        def reference(video, frame_number):
+            video_path, scale_factor, _, _ = videos[video]
+            return gaussian_blur_and_histogram_equalization(crop_from_top_percentage(scale_frame(read_frame(video_path, frame_number), scale_factor), 20, 65))
+
+        def search(reference_frame, video):
+            return search_video_chunked(reference_frame, *videos[video], workers)
+
+    if not start_frame_read[1]:
+        print("Error reading start frame of video 1.")
+        return None
+    if not start_frame_read[2]:
+        print("Error reading start frame of video 2.")
+        return None
+
+    print(f"Video 1 reference: {video1_start_frame_num} ({video1_start_frame_num / fps_video1}s)")
+
+    # Step 1: Find similar frame in video 2
+    frame_number_video2, tiles_evaluated, tile_count = search(reference(1, video1_start_frame_num), 2)
+    print(f"Step 1: Similar frame in video 2 found at frame number: {frame_number_video2} ({frame_number_video2 / fps_video2}s)")
+    print_tile_stats("Step 1", tiles_evaluated, tile_count)
+
+    # Step 2: Use the found frame in video 2 to perform a reverse search in video 1
+    frame_number_video1, tiles_evaluated, tile_count = search(reference(2, frame_number_video2), 1)
+    print(f"Step 2: Reverse search frame in video 1 found at frame number: {frame_number_video1} ({frame_number_video1 / fps_video1}s)")
+    print_tile_stats("Step 2", tiles_evaluated, tile_count)
+
+    best_frame_number_video1 = video1_start_frame_num
+    if abs(frame_number_video1 - video1_start_frame_num) <= 1:
+        print("Reverse search successfully returned to the first frame of video 1. The match is confirmed.")
+    else:
+        print("Reverse search did not return to the first frame of video 1. Performing another reverse search in video 2.")
+        # Step 3: Search video 2 again with the reverse search result to confirm the match. Its reference is
+        # the frame step 2 found, so it cannot start before step 2 ends. With video 1's start frame instead it
+        # would only repeat step 1 and always confirm.
+        best_frame_number_video1 = frame_number_video1
+        prev_frame_number_video2 = frame_number_video2
+        frame_number_video2, tiles_evaluated, tile_count = search(reference(1, frame_number_video1), 2)
+        print(f"Step 3: Third search in video 2 found a similar frame at frame number: {frame_number_video2} ({frame_number_video2 / fps_video2}s)")
+        print_tile_stats("Step 3", tiles_evaluated, tile_count)
+        if abs(frame_number_video2 - prev_frame_number_video2) <= 1:
+            print("The third search confirmed the frame found in the first search.")
+        else:
+            print("The third search found a different frame. No matching frames found.")
+            return None
+
+    return {
+        "frame_number_video1": frame_number_video1, "fps_video1": fps_video1,
+        "best_frame_video1": read_frame(video1_path, best_frame_number_video1), "scale_factor1": scale_factor1,
+        "frame_number_video2": frame_number_video2, "fps_video2": fps_video2,
+        "best_frame_video2": read_frame(video2_path, frame_number_video2), "scale_factor2": scale_factor2,
+    }
+
+
+def find_matching_frames(video1_path, video2_path, duration, video1_start_time, video2_start_time, show_progress=True, use_scene_index=False, coarse_stride=0, coarse_top_k=3, parallel=True, memory_limit_mb=2048, use_proxy=False, vid_caps=None):
+    """
+    Find the earliest mutually matching frames of two videos with a forward, reverse and (if needed) confirmation search.
+    With use_scene_index, shots are skipped using the indexes built by f1_23_index_scenes.py (if present).
+    coarse_stride and coarse_top_k select the temporal pyramid search of find_most_similar_frame.
+    With use_proxy, its coarse level reads the proxies built by f1_23_proxy_frames.py (if present) instead of decoding.
+
+    With parallel, exhaustive searches use several cores (find_matching_frames_parallel) on machines with
+    more than one core. If both preprocessed windows fit in memory_limit_mb they are decoded concurrently
+    and kept in memory; otherwise each search streams its window in chunks, one decoder per core.
+
+    vid_caps is an optional pair of open cv2.VideoCapture of the two videos that the serial search reuses
+    instead of opening the videos for every step; they are left open.
+
+    Returns:
+    - dict with the frame number, fps, unscaled best frame and scale factor of each video, or None if no match was confirmed
+    """
+    import cv2
+
+    if parallel and coarse_stride <= 1 and not use_scene_index and (os.cpu_count() or 1) > 1:
+        scale_factor1, scale_factor2 = find_resolution_scale_factor(video1_path, video2_path)
+        required_mb = window_memory_mb(video1_path, scale_factor1, duration) + window_memory_mb(video2_path, scale_factor2, duration)
+        in_memory = required_mb <= memory_limit_mb
+        if not in_memory:
+            print(f"Preprocessed windows need {required_mb:.0f} MB (limit {memory_limit_mb} MB); streaming each search in parallel chunks instead.")
+        return find_matching_frames_parallel(video1_path, video2_path, duration, video1_start_time, video2_start_time, in_memory=in_memory)
+
+    scale_factor1, scale_factor2 = find_resolution_scale_factor(video1_path, video2_path, vid_caps)
+    scene_index1 = load_scene_index(video1_path) if use_scene_index else None
+    scene_index2 = load_scene_index(video2_path) if use_scene_index else None
+    proxy1 = load_proxy(video1_path) if use_proxy else None
+    proxy2 = load_proxy(video2_path) if use_proxy else None
+    search_options = {"show_progress": show_progress, "coarse_stride": coarse_stride, "coarse_top_k": coarse_top_k}
+    owns_captures = vid_caps is None
+    video1, video2 = (cv2.VideoCapture(video1_path), cv2.VideoCapture(video2_path)) if owns_captures else vid_caps
+    fps_video1, fps_video2 = video1.get(cv2.CAP_PROP_FPS), video2.get(cv2.CAP_PROP_FPS)
     video1_start_frame_num = int(fps_video1 * video1_start_time)
     video2_start_frame_num = int(fps_video2 * video2_start_time)
     video1.set(cv2.CAP_PROP_POS_FRAMES, video1_start_frame_num)
     video2.set(cv2.CAP_PROP_POS_FRAMES, video2_start_frame_num)
     ret, first_frame_video1 = video1.read()
-    video1.release()
+    if owns_captures:
+        video1.release()
     if not ret:
         print("Error reading start frame of video 1.")
-        return
+        return None
     ret, first_frame_video2 = video2.read()
-    video2.release()    
+    if owns_captures:
+        video2.release()    
     if not ret:
         print("Error reading start frame of video 2.")
-        return
+        return None
     
     scaled_first_frame_video1 = scale_frame(first_frame_video1, scale_factor1)
     cropped_first_frame_video1 = scaled_first_frame_video1[:int(scaled_first_frame_video1.shape[0] * 0.6), :, :]
@@ -183,13 +609,21 @@ def main(video1_path, video2_path, duration, video1_start_time, video2_start_tim
     print(f"Video 1 reference: {frame_number_video1} ({frame_number_video1 / fps_video1}s)")
 
     # Step 1: Find similar frame in video 2
-    frame_number_video2, best_frame_video2 = find_most_similar_frame(scaled_first_frame_video1, video2_path, scale_factor2, duration, video2_start_frame_num)
+    frame_number_video2, best_frame_video2, tiles_evaluated, tile_count = find_most_similar_frame(scaled_first_frame_video1, video2_path, scale_factor2, duration, video2_start_frame_num, scene_index=scene_index2, proxy=proxy2, target_cap=None if owns_captures else video2, **search_options)
+    if best_frame_video2 is None:
+        print("No frames of video 2 could be searched. No matching frames found.")
+        return None
     print(f"Step 1: Similar frame in video 2 found at frame number: {frame_number_video2} ({frame_number_video2 / fps_video2}s)")
+    print_tile_stats("Step 1", tiles_evaluated, tile_count)
 
     # Step 2: Use the found frame in video 2 to perform a reverse search in video 1
     scaled_frame_video2 = scale_frame(best_frame_video2, scale_factor2)
-    frame_number_video1, reverse_search_best_frame_video1 = find_most_similar_frame(scaled_frame_video2, video1_path, scale_factor1, duration, video1_start_frame_num)
+    frame_number_video1, reverse_search_best_frame_video1, tiles_evaluated, tile_count = find_most_similar_frame(scaled_frame_video2, video1_path, scale_factor1, duration, video1_start_frame_num, scene_index=scene_index1, proxy=proxy1, target_cap=None if owns_captures else video1, **search_options)
+    if reverse_search_best_frame_video1 is None:
+        print("No frames of video 1 could be searched. No matching frames found.")
+        return None
     print(f"Step 2: Reverse search frame in video 1 found at frame number: {frame_number_video1} ({frame_number_video1 / fps_video1}s)")
+    print_tile_stats("Step 2", tiles_evaluated, tile_count)
 
     # Step 3: If reverse search does not return to the
     # Check if the reverse search returns to the first frame of video 1
@@ -201,18 +635,53 @@ def main(video1_path, video2_path, duration, video1_start_time, video2_start_tim
         best_frame_video1 = reverse_search_best_frame_video1
         scaled_frame_video1 = scale_frame(best_frame_video1, scale_factor1)
         prev_frame_number_video2 = frame_number_video2
-        frame_number_video2, best_frame_video2 = find_most_similar_frame(scaled_frame_video1, video2_path, scale_factor2, duration, video2_start_frame_num)
+        frame_number_video2, best_frame_video2, tiles_evaluated, tile_count = find_most_similar_frame(scaled_frame_video1, video2_path, scale_factor2, duration, video2_start_frame_num, scene_index=scene_index2, proxy=proxy2, target_cap=None if owns_captures else video2, **search_options)
+        if best_frame_video2 is None:
+            print("No frames of video 2 could be searched. No matching frames found.")
+            return None
         print(f"Step 3: Third search in video 2 found a similar frame at frame number: {frame_number_video2} ({frame_number_video2 / fps_video2}s)")
+        print_tile_stats("Step 3", tiles_evaluated, tile_count)
         if abs(frame_number_video2 - prev_frame_number_video2) <= 1:
             print("The third search confirmed the frame found in the first search.")
         else:
             print("The third search found a different frame. No matching frames found.")
-            return
-    
+            return None
+
+    return {
+        "frame_number_video1": frame_number_video1, "fps_video1": fps_video1,
+        "best_frame_video1": best_frame_video1, "scale_factor1": scale_factor1,
+        "frame_number_video2": frame_number_video2, "fps_video2": fps_video2,
+        "best_frame_video2": best_frame_video2, "scale_factor2": scale_factor2,
+    }
+
+
+def main(video1_path, video2_path, duration, video1_start_time, video2_start_time, use_scene_index=False, coarse_stride=0, coarse_top_k=3, parallel=True, compare_serial=False, memory_limit_mb=2048, use_proxy=False):
+    search_options = {"use_scene_index": use_scene_index, "coarse_stride": coarse_stride, "coarse_top_k": coarse_top_k, "use_proxy": use_proxy}
+    start_time = time.time()
+    match = find_matching_frames(video1_path, video2_path, duration, video1_start_time, video2_start_time, parallel=parallel, memory_limit_mb=memory_limit_mb, **search_options)
+    search_time = time.time() - start_time
+    print(f"Search wall-clock time: {search_time:.2f} seconds")
+
+    if compare_serial:
+        start_time = time.time()
+        serial_match = find_matching_frames(video1_path, video2_path, duration, video1_start_time, video2_start_time, show_progress=False, parallel=False, **search_options)
+        serial_time = time.time() - start_time
+        same_result = (match is None and serial_match is None) or (
+            match is not None and serial_match is not None
+            and match["frame_number_video1"] == serial_match["frame_number_video1"]
+            and match["frame_number_video2"] == serial_match["frame_number_video2"]
+        )
+        print(f"Serial search wall-clock time: {serial_time:.2f} seconds ({serial_time / max(search_time, 1e-9):.2f}x the time, same result: {'yes' if same_result else 'NO'})")
+
+    if match is None:
+        return
+
+    frame_number_video1, fps_video1 = match["frame_number_video1"], match["fps_video1"]
+    frame_number_video2, fps_video2 = match["frame_number_video2"], match["fps_video2"]
     print(f"Matching Frame Video 1: {frame_number_video1}, Time: {frame_number_video1/fps_video1:.6f} seconds")
     print(f"Matching Frame Video 2: {frame_number_video2}, Time: {frame_number_video2/fps_video2:.6f} seconds")
     print(f"Time Difference: {frame_number_video1/fps_video1 - frame_number_video2/fps_video2:.6f} seconds")
-    display_matching_images(scale_frame(best_frame_video1, scale_factor1), scale_frame(best_frame_video2, scale_factor2))
+    display_matching_images(scale_frame(match["best_frame_video1"], match["scale_factor1"]), scale_frame(match["best_frame_video2"], match["scale_factor2"]))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Find and display matching frames between two videos after adjusting their resolution.")
@@ -221,10 +690,24 @@ if __name__ == "__main__":
     parser.add_argument("--duration", type=float, default=10.0, help="Maximum duration (in seconds) to search for a match from the start of the second video.")
     parser.add_argument("--video1_start", type=float, default=0, help="Video 1 start time (in seconds). Frames before this time are ignored.")
     parser.add_argument("--video2_start", type=float, default=0, help="Video 2 start time (in seconds). Frames before this time are ignored.")
+    parser.add_argument("--scene_index", action="store_true", help="Skip shots that cannot match using the scene indexes built by f1_23_index_scenes.py.")
+    parser.add_argument(
+        "--coarse_stride", type=int, default=0,
+        help="Temporal pyramid search: score every n-th frame on downscaled crops first and refine only around the best ones at full resolution. "
+             "Useful for long --duration windows (default: 0, compare every frame at full resolution)."
+    )
+    parser.add_argument("--coarse_top_k", type=int, default=3, help="Number of coarse candidates refined at full resolution (with --coarse_stride).")
+    parser.add_argument("--proxy", action="store_true", help="Read the coarse samples of --coarse_stride from the proxies built by f1_23_proxy_frames.py instead of decoding.")
+    parser.add_argument("--serial", action="store_true", help="Decode and search the two videos one after the other instead of concurrently.")
+    parser.add_argument("--compare_serial", action="store_true", help="Also run the serial search and report its wall-clock time.")
+    parser.add_argument("--memory_limit_mb", type=int, default=2048, help="Largest memory (in MB) the preprocessed windows may use before the parallel search streams its windows in chunks instead.")
 
     args = parser.parse_args()
 
-    main(args.video1_path, args.video2_path, args.duration, args.video1_start, args.video2_start)
+    main(
+        args.video1_path, args.video2_path, args.duration, args.video1_start, args.video2_start,
+        args.scene_index, args.coarse_stride, args.coarse_top_k, parallel=not args.serial, compare_serial=args.compare_serial, memory_limit_mb=args.memory_limit_mb, use_proxy=args.proxy,
+    )
 
 
 
@@ -1,99 +1,290 @@
-import cv2
-import numpy as np
 import argparse
-import tkinter as tk
-from tkinter import filedialog
+import csv
+import functools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from f1_23_index_scenes import candidate_frame_ranges, load_scene_index, merge_frame_ranges
+from f1_23_ingest import load_ingested_start
+from f1_23_mask_indices import load_mask_indices
+from f1_23_proxy_frames import load_proxy
 
-# Set up argument parser
-parser = argparse.ArgumentParser(description="Find the best matching frame in a video.")
-parser.add_argument("--video_path", type=str, help="Path to the video file.")
-parser.add_argument("--limit_seconds", type=int, default=None, help="Limit search to the first n seconds of the video.")
-args = parser.parse_args()
 
-# Initialize Tkinter root if needed
-if not args.video_path:
-    root = tk.Tk()
-    root.withdraw()  # Use to hide the tiny Tkinter window
+@functools.lru_cache(maxsize=4)
+def load_mask_and_reference(mask_path, reference_path):
+    import cv2
 
-    # Open file dialog to select the video
-    args.video_path = filedialog.askopenfilename(title="Select video file", filetypes=[("MP4 files", "*.mp4"), ("All files", "*.*")])
+    mask = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
+    reference = cv2.imread(reference_path)
+    if mask is None or reference is None:
+        raise ValueError(f"Couldn't load {mask_path} or {reference_path}")
+    return mask, reference
+
+
+@functools.lru_cache(maxsize=8)
+def compile_mask_and_reference(mask_path, reference_path, frame_width, frame_height):
+    """
+    Resize the mask and reference image to a video resolution and keep only the masked pixels.
+
+    Cached, so each process compiles a mask/reference pair once per resolution and reuses it for every video.
+
+    Returns:
+    - (flat indices of the mask pixels, reference pixel values at those indices as int16)
+    """
+    import cv2
+    import numpy as np
+
+    mask, reference = load_mask_and_reference(mask_path, reference_path)
+    # The sparse indices exported by f1_23_create_image_mask.py skip resizing the mask image
+    binary_mask = load_mask_indices(mask_path, frame_width, frame_height)
+    mask = binary_mask if binary_mask is not None else cv2.resize(mask, (frame_width, frame_height))
+    reference = cv2.resize(reference, (frame_width, frame_height))
+    indices = np.flatnonzero(mask)
+    return indices, reference.reshape(-1, 3)[indices].astype(np.int16)
+
+
+def proxy_candidate_ranges(proxy, frame_ranges, mask, reference, limit_frames, tolerance):
+    """
+    Score every frame on the proxy (no decoding) and return the frame ranges close to the best proxy score,
+    which are then compared at full resolution.
+    """
+    import cv2
+    import numpy as np
+
+    proxy_height, proxy_width = proxy.frames.shape[1:3]
+    proxy_mask_indices = np.flatnonzero(cv2.resize(mask, (proxy_width, proxy_height), interpolation=cv2.INTER_NEAREST))
+    proxy_reference = cv2.resize(reference, (proxy_width, proxy_height), interpolation=cv2.INTER_AREA).reshape(-1, 3)[proxy_mask_indices].astype(np.int16)
+    proxy_frame_numbers, proxy_scores = [], []
+    for range_start, range_end in frame_ranges:
+        for chunk_start in range(range_start, range_end, 256):
+            chunk = proxy.frame_range(chunk_start, min(chunk_start + 256, range_end))
+            masked_pixels = chunk.reshape(len(chunk), -1, 3)[:, proxy_mask_indices].astype(np.int16)
+            proxy_scores.append(np.abs(masked_pixels - proxy_reference).sum(axis=(1, 2)))
+            proxy_frame_numbers.append(np.arange(chunk_start, chunk_start + len(chunk)))
+    proxy_scores, proxy_frame_numbers = np.concatenate(proxy_scores), np.concatenate(proxy_frame_numbers)
+    close_frames = proxy_frame_numbers[proxy_scores <= proxy_scores.min() * (1 + tolerance)]
+    return merge_frame_ranges((max(int(frame_number) - 2, 0), min(int(frame_number) + 3, limit_frames)) for frame_number in close_frames)
+
+
+def find_start_frame(
+    video_path,
+    mask_path="mask.png",
+    reference_path="reference_image.jpg",
+    limit_seconds=None,
+    use_scene_index=False,
+    use_proxy=False,
+    proxy_tolerance=0.05,
+    show_progress=False,
+    vid_cap=None,
+):
+    """
+    Find the frame of a video most similar to the masked portion of the reference image
+    (sum of absolute differences over the mask pixels).
+
+    Parameters:
+    - limit_seconds: Only search the first limit_seconds of the video
+    - use_scene_index: Only scan shots whose luma histogram is close to the reference (f1_23_index_scenes.py)
+    - use_proxy: Score every frame on the proxy first (f1_23_proxy_frames.py) and decode only the frames
+      within proxy_tolerance of the best proxy score
+    - vid_cap: Optional open cv2.VideoCapture of the video to reuse; it is left open
+
+    Returns:
+    - dict with 'video_path', 'frame_number', 'time' (seconds) and 'score'
+    """
+    import cv2
+    import numpy as np
+
+    owns_capture = vid_cap is None
+    if owns_capture:
+        vid_cap = cv2.VideoCapture(video_path)
+    if not vid_cap.isOpened():
+        raise ValueError(f"Couldn't open video: {video_path}")
+
+    try:
+        fps = vid_cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(vid_cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        frame_width, frame_height = int(vid_cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(vid_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        limit_frames = min(int(limit_seconds * fps), total_frames) if limit_seconds else total_frames
+        indices, reference_values = compile_mask_and_reference(mask_path, reference_path, frame_width, frame_height)
+
+        frame_ranges = [(0, limit_frames)]
+        if use_scene_index:
+            # Only scan shots whose luma histogram is close to the reference image
+            scene_index = load_scene_index(video_path)
+            if scene_index is None:
+                print(f"No scene index found for {video_path}; scanning every frame. Build one with f1_23_index_scenes.py.")
+            else:
+                _, reference = load_mask_and_reference(mask_path, reference_path)
+                frame_ranges = candidate_frame_ranges(scene_index, 0, limit_frames, reference_image=reference, fall_back_to_window=True)
+                print(f"Scene index: scanning {sum(end - start for start, end in frame_ranges)} of {limit_frames} frames of {video_path}")
+
+        if use_proxy:
+            proxy = load_proxy(video_path)
+            if proxy is None or not all(proxy.covers(start, end) for start, end in frame_ranges):
+                print(f"No proxy covering the search range of {video_path} found; decoding every frame. Build one with f1_23_proxy_frames.py, or limit the search to the proxy with --limit_seconds.")
+            else:
+                mask, reference = load_mask_and_reference(mask_path, reference_path)
+                frame_ranges = proxy_candidate_ranges(proxy, frame_ranges, mask, reference, limit_frames, proxy_tolerance)
+                print(f"Proxy: decoding {sum(end - start for start, end in frame_ranges)} of {limit_frames} frames of {video_path}")
+
+        best_frame_number, lowest_score = -1, float("inf")
+        # Decode, gather and difference into the same buffers every frame
+        frame = None
+        pixels = np.empty(reference_values.shape, dtype=np.uint8)
+        diff = np.empty(reference_values.shape, dtype=np.int16)
+        position = None
+        for range_start, range_end in frame_ranges:
+            if position != range_start:
+                vid_cap.set(cv2.CAP_PROP_POS_FRAMES, range_start)
+                position = range_start
+            while position < range_end:
+                ret, frame = vid_cap.read(frame)
+                if not ret:
+                    break
+                # mode="clip" lets take() write straight into out (indices are always in range)
+                np.take(frame.reshape(-1, 3), indices, axis=0, out=pixels, mode="clip")
+                np.subtract(pixels, reference_values, out=diff)
+                np.abs(diff, out=diff)
+                score = int(diff.sum())
+                if score < lowest_score:
+                    best_frame_number, lowest_score = position, score
+
+                if show_progress:
+                    print(f"\rProcessing video: {100 * position / max(limit_frames, 1):.2f}% - Current Lowest Score: {lowest_score}", end="")
+                position += 1
+    finally:
+        if owns_capture:
+            vid_cap.release()
+
+    if show_progress:
+        print("\nProcessing complete.")
+    if best_frame_number < 0:
+        raise ValueError(f"No frames of {video_path} were processed.")
+    return {"video_path": video_path, "frame_number": best_frame_number, "time": best_frame_number / fps, "score": lowest_score}
+
+
+def find_start_frame_or_error(video_path, options):
+    """find_start_frame for a process pool: failures are reported in the result instead of raised."""
+    try:
+        return find_start_frame(video_path, **options)
+    except Exception as e:
+        return {"video_path": video_path, "error": str(e)}
+
+
+def find_start_frames(video_paths, workers=None, **options):
+    """
+    Find the start frame of several videos concurrently, one video per worker process.
+
+    Returns:
+    - List of find_start_frame results (or {'video_path', 'error'}) in the order of video_paths
+    """
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers or min(len(video_paths), os.cpu_count() or 1)) as executor:
+        futures = {executor.submit(find_start_frame_or_error, video_path, options): video_path for video_path in video_paths}
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if "error" in result:
+                print(f"{len(results)}/{len(video_paths)} {result['video_path']}: error: {result['error']}")
+            else:
+                print(f"{len(results)}/{len(video_paths)} {result['video_path']}: frame {result['frame_number']} ({result['time']:.4f}s)")
+    return [results[video_path] for video_path in video_paths]
+
+
+def save_results(results, output_path):
+    """Write the results to a .csv file, or to a .json file for any other extension."""
+    if output_path.lower().endswith(".csv"):
+        with open(output_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["video_path", "frame_number", "time", "score", "error"])
+            writer.writeheader()
+            writer.writerows(results)
+    else:
+        with open(output_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+def show_best_frame(video_path, frame_number):
+    import cv2
+
+    vid_cap = cv2.VideoCapture(video_path)
+    vid_cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+    ret, frame = vid_cap.read()
+    vid_cap.release()
+    if ret:
+        cv2.imshow("Best Match", frame)
+        cv2.waitKey(0)
+        cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find the best matching frame in one or more videos.")
+    parser.add_argument("video_paths", nargs="*", help="Paths to the video files. Several videos are searched concurrently.")
+    parser.add_argument("--video_path", type=str, help="Path to a video file (same as a positional video path).")
+    parser.add_argument("--limit_seconds", type=int, default=None, help="Limit search to the first n seconds of the video.")
+    parser.add_argument("--mask_path", default="mask.png", help="Mask of the start lights (default: mask.png).")
+    parser.add_argument("--reference_path", default="reference_image.jpg", help="Reference image (default: reference_image.jpg).")
+    parser.add_argument("--scene_index", action="store_true", help="Skip shots that cannot match using the scene index built by f1_23_index_scenes.py.")
+    parser.add_argument(
+        "--proxy", action="store_true",
+        help="Score every frame on the proxy built by f1_23_proxy_frames.py first, and decode only the frames that come close to the best proxy score."
+    )
+    parser.add_argument("--proxy_tolerance", type=float, default=0.05, help="Frames within this fraction of the best proxy score are compared at full resolution (with --proxy).")
+    parser.add_argument("--workers", type=int, default=None, help="Number of videos searched in parallel (default: one per core).")
+    parser.add_argument("--headless", action="store_true", help="Never open a window (no file dialog, no best-frame display).")
+    parser.add_argument("--output", default=None, help="Write the best frame/time of every video to this .json or .csv file.")
+    parser.add_argument("--rescan", action="store_true", help="Search again even if f1_23_ingest.py already stored a result for a video.")
+    args = parser.parse_args()
+
+    video_paths = args.video_paths + ([args.video_path] if args.video_path else [])
+    if not video_paths and not args.headless:
+        import tkinter as tk
+        from tkinter import filedialog
+
+        root = tk.Tk()
+        root.withdraw()  # Use to hide the tiny Tkinter window
+
+        # Open file dialog to select the videos
+        video_paths = list(filedialog.askopenfilenames(title="Select video files", filetypes=[("MP4 files", "*.mp4"), ("All files", "*.*")]))
 
     # Ensure a file was selected
-    if not args.video_path:
+    if not video_paths:
         print("No file selected.")
         exit()
 
-# Load the input image and the mask
-input_image = cv2.imread('reference_image.jpg')
-mask = cv2.imread('mask.png', 0)  # Load mask in grayscale
-
-# Load the selected video
-video = cv2.VideoCapture(args.video_path)
-if not video.isOpened():
-    print("Error: Couldn't open video.")
-    exit()
-
-# Get the first frame to determine its resolution
-ret, first_frame = video.read()
-if not ret:
-    print("Error: Couldn't read the first frame of the video.")
-    exit()
-
-# Resize mask and input_image to match the video frame's resolution
-frame_height, frame_width = first_frame.shape[:2]
-mask = cv2.resize(mask, (frame_width, frame_height))
-input_image = cv2.resize(input_image, (frame_width, frame_height))
-
-# Reset video to start
-video.set(cv2.CAP_PROP_POS_FRAMES, 0)
-
-# Initialize variables for the best match
-best_frame = None
-best_frame_time = 0
-lowest_score = float('inf')  # Initialize with infinity
-
-# Get the FPS and total number of frames in the video
-fps = video.get(cv2.CAP_PROP_FPS)
-total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
-limit_frames = args.limit_seconds * fps if args.limit_seconds else total_frames
-
-# Processing loop
-while video.isOpened():
-    ret, frame = video.read()
-    current_frame_index = int(video.get(cv2.CAP_PROP_POS_FRAMES)) - 1  # Get current frame index (0-based)
-    
-    if not ret or current_frame_index >= limit_frames:
-        break
-
-    # Apply mask
-    masked_input = cv2.bitwise_and(input_image, input_image, mask=mask)
-    masked_frame = cv2.bitwise_and(frame, frame, mask=mask)
-
-    # Compute the absolute difference
-    diff = cv2.absdiff(masked_input, masked_frame)
-    
-    # Calculate the Sum of Absolute Differences (SAD)
-    score = np.sum(diff)
-
-    # Update best match if the current frame is a better match
-    if score < lowest_score:
-        lowest_score = score
-        best_frame = frame
-        best_frame_time = current_frame_index / fps  # Calculate time in seconds
-
-    # Print progress
-    completion_percentage = (current_frame_index / limit_frames) * 100
-    print(f"\rProcessing video: {completion_percentage:.2f}% - Current Lowest Score: {lowest_score}", end="")
-
-# After processing all frames up to the limit
-print("\nProcessing complete.")
-
-# Display the best matching frame, its time, and frame number
-if best_frame is not None:
-    best_frame_number = int(best_frame_time * fps)  # Calculate the frame number from the time
-    print(f"Best frame time: {best_frame_time} seconds (Frame number: {best_frame_number})")
-    cv2.imshow('Best Match', best_frame)
-    cv2.waitKey(0)
-    cv2.destroyAllWindows()
-else:
-    print("No best frame found.")
+    options = {
+        "mask_path": os.path.abspath(args.mask_path), "reference_path": os.path.abspath(args.reference_path),
+        "limit_seconds": args.limit_seconds, "use_scene_index": args.scene_index,
+        "use_proxy": args.proxy, "proxy_tolerance": args.proxy_tolerance,
+    }
+    # Results stored by f1_23_ingest.py with the same mask, reference, limit and filters are used as they are
+    ingested = {}
+    if not args.rescan:
+        for video_path in video_paths:
+            result = load_ingested_start(video_path, **options)
+            if result is not None:
+                print(f"{video_path}: using the result stored during ingest (--rescan to search again)")
+                ingested[video_path] = {**result, "video_path": video_path}
+    scan_paths = [video_path for video_path in video_paths if video_path not in ingested]
+
+    if len(scan_paths) == 1:
+        try:
+            scanned = [find_start_frame(scan_paths[0], show_progress=True, **options)]
+        except ValueError as e:
+            scanned = [{"video_path": scan_paths[0], "error": str(e)}]
+    else:
+        scanned = find_start_frames(scan_paths, args.workers, **options) if scan_paths else []
+    results_by_path = {**ingested, **{result["video_path"]: result for result in scanned}}
+    results = [results_by_path[video_path] for video_path in video_paths]
+
+    for result in results:
+        if "error" in result:
+            print(f"{result['video_path']}: {result['error']}")
+        else:
+            print(f"{result['video_path']}: Best frame time: {result['time']} seconds (Frame number: {result['frame_number']})")
+
+    if args.output:
+        save_results(results, args.output)
+        print(f"Results saved to {args.output}")
+
+    if len(results) == 1 and "error" not in results[0] and not args.headless:
+        show_best_frame(results[0]["video_path"], results[0]["frame_number"])
@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import subprocess
+
+THUMBNAIL_SIZE = (128, 72)
+SPRITE_COLUMNS = 32
+DEFAULT_INTERVAL_SECONDS = 5.0
+
+
+def sprite_sheet_paths(video_path):
+    """Paths of the sprite sheet image and its metadata, saved next to the video."""
+    return f"{video_path}.sprites.jpg", f"{video_path}.sprites.json"
+
+
+def decode_keyframe_thumbnails(video_path, interval_seconds, thumbnail_size):
+    """
+    Decode one thumbnail per interval with ffmpeg, decoding keyframes only and scaling in the decoder process.
+
+    Thumbnail i shows the last keyframe at or before i * interval_seconds.
+
+    Returns:
+    - List of BGR thumbnails, or None if ffmpeg is not available
+    """
+    import numpy as np
+
+    width, height = thumbnail_size
+    cmd = [
+        "ffmpeg", "-v", "error",
+        "-skip_frame", "nokey", "-i", video_path,
+        "-an", "-sn",
+        "-vf", f"fps=1/{interval_seconds},scale={width}:{height}",
+        "-f", "rawvideo", "-pix_fmt", "bgr24", "-",
+    ]
+    try:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except FileNotFoundError:
+        return None
+
+    thumbnails = []
+    frame_bytes = width * height * 3
+    while True:
+        data = process.stdout.read(frame_bytes)
+        if len(data) < frame_bytes:
+            break
+        thumbnails.append(np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3))
+    process.stdout.close()
+    if process.wait() != 0:
+        return None
+    return thumbnails
+
+
+def decode_sampled_thumbnails(video_path, interval_seconds, thumbnail_size):
+    """
+    Fallback without ffmpeg: grab every frame with OpenCV, but only retrieve and resize one per interval.
+
+    Returns:
+    - List of BGR thumbnails
+    """
+    import cv2
+
+    vid_cap = cv2.VideoCapture(video_path)
+    fps = vid_cap.get(cv2.CAP_PROP_FPS)
+    interval_frames = max(1, int(round(interval_seconds * fps)))
+    thumbnails = []
+    frame = None
+    frame_number = 0
+    while vid_cap.grab():
+        if frame_number % interval_frames == 0:
+            ret, frame = vid_cap.retrieve(frame)
+            if ret:
+                thumbnails.append(cv2.resize(frame, thumbnail_size, interpolation=cv2.INTER_AREA))
+        frame_number += 1
+    vid_cap.release()
+    return thumbnails
+
+
+def build_sprite_sheet(video_path, interval_seconds=DEFAULT_INTERVAL_SECONDS, thumbnail_size=THUMBNAIL_SIZE):
+    """
+    Decode a video once at reduced resolution into a grid of thumbnails, one per interval.
+
+    Returns:
+    - (sprite sheet image, metadata dict with 'interval_seconds', 'thumbnail_size', 'columns' and 'count'),
+      or None if no thumbnails could be decoded
+    """
+    import numpy as np
+
+    thumbnails = decode_keyframe_thumbnails(video_path, interval_seconds, thumbnail_size)
+    if not thumbnails:
+        thumbnails = decode_sampled_thumbnails(video_path, interval_seconds, thumbnail_size)
+    if not thumbnails:
+        return None
+
+    width, height = thumbnail_size
+    columns = min(SPRITE_COLUMNS, len(thumbnails))
+    rows = (len(thumbnails) + columns - 1) // columns
+    sheet = np.zeros((rows * height, columns * width, 3), dtype=np.uint8)
+    for i, thumbnail in enumerate(thumbnails):
+        row, column = divmod(i, columns)
+        sheet[row * height:(row + 1) * height, column * width:(column + 1) * width] = thumbnail
+
+    metadata = {
+        "interval_seconds": interval_seconds,
+        "thumbnail_size": list(thumbnail_size),
+        "columns": columns,
+        "count": len(thumbnails),
+    }
+    return sheet, metadata
+
+
+def save_sprite_sheet(video_path, sheet, metadata):
+    import cv2
+
+    image_path, metadata_path = sprite_sheet_paths(video_path)
+    stat = os.stat(video_path)
+    cv2.imwrite(image_path, sheet, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    with open(metadata_path, "w") as f:
+        json.dump({**metadata, "video_stat": [stat.st_size, stat.st_mtime]}, f)
+
+
+class SpriteSheet:
+    """Thumbnails of a video at a fixed interval, cut from a sprite sheet on demand."""
+
+    def __init__(self, sheet, metadata):
+        self.sheet = sheet
+        self.interval_seconds = metadata["interval_seconds"]
+        self.thumbnail_width, self.thumbnail_height = metadata["thumbnail_size"]
+        self.columns = metadata["columns"]
+        self.count = metadata["count"]
+
+    def thumbnail(self, index):
+        row, column = divmod(min(max(index, 0), self.count - 1), self.columns)
+        return self.sheet[
+            row * self.thumbnail_height:(row + 1) * self.thumbnail_height,
+            column * self.thumbnail_width:(column + 1) * self.thumbnail_width,
+        ]
+
+    def thumbnail_at_time(self, time_in_seconds):
+        return self.thumbnail(int(time_in_seconds // self.interval_seconds))
+
+
+def load_sprite_sheet(video_path):
+    """Load the sprite sheet saved next to a video, or None if it is missing or older than the video."""
+    import cv2
+
+    image_path, metadata_path = sprite_sheet_paths(video_path)
+    if not os.path.exists(image_path) or not os.path.exists(metadata_path):
+        return None
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+    stat = os.stat(video_path)
+    if tuple(metadata["video_stat"]) != (stat.st_size, stat.st_mtime):
+        return None
+    sheet = cv2.imread(image_path)
+    if sheet is None:
+        return None
+    return SpriteSheet(sheet, metadata)
+
+
+def load_or_build_sprite_sheet(video_path, interval_seconds=DEFAULT_INTERVAL_SECONDS):
+    """Load the cached sprite sheet of a video, building and caching it first if needed."""
+    sprite_sheet = load_sprite_sheet(video_path)
+    if sprite_sheet is not None:
+        return sprite_sheet
+    result = build_sprite_sheet(video_path, interval_seconds)
+    if result is None:
+        return None
+    sheet, metadata = result
+    save_sprite_sheet(video_path, sheet, metadata)
+    return SpriteSheet(sheet, metadata)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build the thumbnail sprite sheet used by the timeline scrubber of f1_23_search_frame.py. "
+                    "The GUI builds it in the background when it is missing; this pre-builds it for a batch of videos."
+    )
+    parser.add_argument("video_paths", nargs="+", help="Videos to process. Saved as <video>.sprites.jpg and <video>.sprites.json.")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL_SECONDS, help="Seconds between thumbnails.")
+
+    args = parser.parse_args()
+
+    for video_path in args.video_paths:
+        result = build_sprite_sheet(video_path, args.interval)
+        if result is None:
+            print(f"Error: Couldn't decode {video_path}")
+            continue
+        sheet, metadata = result
+        save_sprite_sheet(video_path, sheet, metadata)
+        print(f"Saved {sprite_sheet_paths(video_path)[0]}: {metadata['count']} thumbnails")
@@ -1,4 +1,7 @@
 import argparse
+import json
+import os
+import re
 import subprocess
 import time
 import threading
@@ -12,6 +15,233 @@ def get_video_duration(video_path):
     return float(result.stdout.strip())
 
 
+def load_drift_segments(drift_map_path, left_start_time, right_start_time):
+    """Load the piecewise right-video offsets written by f1_23_drift_map.py."""
+    with open(drift_map_path) as f:
+        drift_map = json.load(f)
+    if abs(drift_map["left_start_time"] - left_start_time) > 1e-3 or abs(drift_map["right_start_time"] - right_start_time) > 1e-3:
+        print("Warning: the drift map was measured with different start times; its offsets may not apply.")
+    return drift_map["segments"]
+
+
+def right_segment_filters(right_start_time, final_duration, drift_segments):
+    """
+    Filter graph chains that cut the right video's video and audio into per-segment trims with their own
+    offsets and concatenate them, so the right side follows the drift map in the same decode.
+
+    Returns:
+    - (video chain ending in [rv], audio chain ending in [ar_raw])
+    """
+    # Zero-length segments must not reach trim, where a duration of 0 means "no limit"
+    segments = [s for s in drift_segments if s["start"] < final_duration and s["end"] > s["start"]]
+    count = len(segments)
+    video_chain = f"[1:v]split={count}" + "".join(f"[rv{i}]" for i in range(count)) + ";"
+    audio_chain = f"[1:a]asplit={count}" + "".join(f"[ra{i}]" for i in range(count)) + ";"
+    for i, segment in enumerate(segments):
+        start = max(0.0, right_start_time + segment["start"] + segment["offset"])
+        duration = min(segment["end"], final_duration) - segment["start"]
+        video_chain += f"[rv{i}]trim=start={start}:duration={duration},setpts=PTS-STARTPTS[rvs{i}];"
+        audio_chain += f"[ra{i}]atrim=start={start}:duration={duration},asetpts=PTS-STARTPTS[ras{i}];"
+    video_chain += "".join(f"[rvs{i}]" for i in range(count)) + f"concat=n={count}:v=1:a=0[rv]"
+    audio_chain += "".join(f"[ras{i}]" for i in range(count)) + f"concat=n={count}:v=0:a=1[ar_raw]"
+    return video_chain, audio_chain
+
+
+AUDIO_MODES = ["mix", "left", "right", "none"]
+
+
+def audio_filter_complex(audio_mode, left_start_time, right_start_time, final_duration, drift_segments=None):
+    """Filter graph chains that trim the audio track(s) selected by audio_mode ("mix", "left" or "right") into [a]."""
+    left_audio = f"[0:a]atrim=start={left_start_time}:duration={final_duration},asetpts=PTS-STARTPTS"
+    if drift_segments:
+        # The right side is cut into segments, each with its own offset from the drift map
+        _, right_audio_chain = right_segment_filters(right_start_time, final_duration, drift_segments)
+        right_audio = f"{right_audio_chain};[ar_raw]anull"
+    else:
+        right_audio = f"[1:a]atrim=start={right_start_time}:duration={final_duration},asetpts=PTS-STARTPTS"
+
+    if audio_mode == "left":
+        return f"{left_audio}[a]"
+    if audio_mode == "right":
+        return f"{right_audio}[a]"
+    return f"{left_audio}[al];{right_audio}[ar];[al][ar]amix=inputs=2:duration=first:dropout_transition=3[a]"
+
+
+def single_pass_filter_complex(left_start_time, right_start_time, final_duration, drift_segments=None, audio_mode="mix"):
+    """Filter graph that trims, crops, scales and pads both videos and stacks them into [v] (and the selected audio into [a])."""
+    if drift_segments:
+        right_video_chain, _ = right_segment_filters(right_start_time, final_duration, drift_segments)
+        right_video_input = f"{right_video_chain};[rv]"
+    else:
+        right_video_input = f"[1:v]trim=start={right_start_time}:duration={final_duration},setpts=PTS-STARTPTS,"
+    filter_complex = (
+        f"[0:v]trim=start={left_start_time}:duration={final_duration},setpts=PTS-STARTPTS,"
+        f"crop=in_w*0.75:in_h,scale=960:-1,pad=960:1080:(ow-iw)/2:(oh-ih)/2:black[left];"
+        f"{right_video_input}"
+        f"crop=in_w*0.75:in_h,scale=960:-1,pad=960:1080:(ow-iw)/2:(oh-ih)/2:black[right];"
+        f"[left][right]hstack=inputs=2[v]"
+    )
+    if audio_mode != "none":
+        filter_complex += ";" + audio_filter_complex(audio_mode, left_start_time, right_start_time, final_duration, drift_segments)
+    return filter_complex
+
+
+def audio_stream_args(
+    audio_mode, audio_codec,
+    left_video_path, left_start_time,
+    right_video_path, right_start_time,
+    final_duration, drift_segments=None,
+):
+    """
+    How the selected audio gets into the single-pass output.
+
+    - "mix": both tracks are decoded, trimmed, mixed and encoded to AAC.
+    - "left" / "right": only that track is used. With audio_codec "copy" its packets are copied without
+      decoding from an extra input seeked to the start time (accurate to one audio frame). With "aac" only
+      that track is decoded, trimmed and encoded. A right track cut by a drift map is always re-encoded.
+    - "none": no audio.
+
+    Returns:
+    - (extra input args, audio_mode of the filter graph, audio map and codec args)
+    """
+    if audio_mode == "none":
+        return [], "none", ["-an"]
+    if audio_mode in ("left", "right") and audio_codec == "copy":
+        if audio_mode == "right" and drift_segments:
+            print("The drift map cuts the right audio into segments, so it is re-encoded instead of copied.")
+        else:
+            video_path, start_time = (left_video_path, left_start_time) if audio_mode == "left" else (right_video_path, right_start_time)
+            return ["-ss", str(start_time), "-t", str(final_duration), "-i", video_path], "none", ["-map", "2:a:0", "-c:a", "copy"]
+    return [], audio_mode, ["-map", "[a]", "-c:a", "aac", "-b:a", "192k"]
+
+
+def measure_audio_path(
+    left_video_path, left_start_time,
+    right_video_path, right_start_time,
+    final_duration, drift_segments, audio_inputs, graph_audio_mode, audio_args,
+):
+    """
+    Run the audio part of the single-pass render on its own (decode, trim, mix and encode, or copy) into
+    the null muxer. The render does this work in the same ffmpeg process as the video, so timing it
+    separately is the way to see what it costs.
+
+    Returns:
+    - (wall-clock seconds, CPU seconds)
+    """
+    cmd = [
+        "ffmpeg", "-v", "info", "-nostats", "-benchmark",
+        "-i", left_video_path, "-i", right_video_path,
+    ] + audio_inputs
+    if graph_audio_mode != "none":
+        cmd += ["-filter_complex", audio_filter_complex(graph_audio_mode, left_start_time, right_start_time, final_duration, drift_segments)]
+    cmd += ["-vn"] + audio_args + ["-f", "null", "-"]
+    return run_audio_benchmark(cmd)
+
+
+def measure_three_step_audio_path(
+    left_video_path, left_start_time,
+    right_video_path, right_start_time,
+    final_duration, audio_mode, audio_codec,
+):
+    """
+    Run the audio part of the three-step render on its own: each side copies its selected audio track
+    (in parallel, as the side encodes do), then the combine step mixes and encodes it, or copies or
+    re-encodes the single track. The combine step reads the trimmed tracks straight from the sources.
+
+    Returns:
+    - (wall-clock seconds, CPU seconds)
+    """
+    sides = [
+        (label, video_path, start_time)
+        for label, video_path, start_time in (("left", left_video_path, left_start_time), ("right", right_video_path, right_start_time))
+        if audio_mode in ("mix", label)
+    ]
+    side_times = [
+        run_audio_benchmark([
+            "ffmpeg", "-v", "info", "-nostats", "-benchmark",
+            "-i", video_path, "-ss", str(start_time), "-t", str(final_duration),
+            "-vn", "-c:a", "copy", "-f", "null", "-",
+        ])
+        for _, video_path, start_time in sides
+    ]
+
+    cmd = ["ffmpeg", "-v", "info", "-nostats", "-benchmark"]
+    for _, video_path, start_time in sides:
+        cmd += ["-ss", str(start_time), "-t", str(final_duration), "-i", video_path]
+    if audio_mode == "mix":
+        cmd += ["-filter_complex", "[0:a][1:a]amix=inputs=2:duration=first:dropout_transition=3[a]", "-map", "[a]", "-c:a", "aac", "-b:a", "192k"]
+    else:
+        cmd += ["-map", "0:a:0"] + (["-c:a", "copy"] if audio_codec == "copy" else ["-c:a", "aac", "-b:a", "192k"])
+    combine_wall_time, combine_cpu_time = run_audio_benchmark(cmd + ["-vn", "-f", "null", "-"])
+
+    return (
+        max(wall_time for wall_time, _ in side_times) + combine_wall_time,
+        sum(cpu_time for _, cpu_time in side_times) + combine_cpu_time,
+    )
+
+
+def run_audio_benchmark(cmd):
+    """Run an ffmpeg command with -benchmark. Returns (wall-clock seconds, CPU seconds)."""
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    bench_match = re.search(r"bench: utime=([\d.]+)s stime=([\d.]+)s rtime=([\d.]+)s", result.stderr)
+    if result.returncode != 0 or bench_match is None:
+        raise RuntimeError(f"Timing the audio path failed: {result.stderr[-500:]}")
+    return float(bench_match.group(3)), float(bench_match.group(1)) + float(bench_match.group(2))
+
+
+def output_duration(left_video_path, left_start_time, right_video_path, right_start_time, output_length=None, drift_segments=None):
+    """Length of the output: the shortest available duration of the two videos, or output_length if shorter."""
+    left_available_duration = get_video_duration(left_video_path) - left_start_time
+    right_available_duration = get_video_duration(right_video_path) - right_start_time
+    if drift_segments:
+        # Positive offsets move the right side later, leaving less of it to show
+        right_available_duration -= max(0.0, max(segment["offset"] for segment in drift_segments))
+
+    final_duration = min(left_available_duration, right_available_duration)
+    if output_length is not None:
+        final_duration = min(final_duration, output_length)
+    return final_duration
+
+
+def output_container_args(output_format, output_path, segment_length=4.0):
+    """
+    ffmpeg output options (ending with the output path) for the chosen container.
+
+    - "mp4": a regular MP4, only playable once the encode has finished.
+    - "fmp4": a fragmented MP4 with a fragment every segment_length seconds. It can be watched while it is
+      written, and stays playable up to the last complete fragment if the render is interrupted.
+    - "hls": an HLS playlist of fragmented MP4 segments, updated as each segment is finished.
+
+    Returns:
+    - (output args, path to open for watching)
+    """
+    if output_format == "mp4":
+        return [output_path], output_path
+
+    # A keyframe at every segment boundary, so fragments and segments have a steady length
+    keyframe_args = ["-force_key_frames", f"expr:gte(t,n_forced*{segment_length})"]
+    if output_format == "fmp4":
+        return keyframe_args + [
+            "-movflags", "+frag_keyframe+empty_moov+default_base_moof",
+            "-f", "mp4", output_path,
+        ], output_path
+
+    if output_format == "hls":
+        playlist_path = os.path.splitext(output_path)[0] + ".m3u8"
+        segment_stem = os.path.splitext(playlist_path)[0]
+        return keyframe_args + [
+            "-f", "hls",
+            "-hls_time", str(segment_length),
+            "-hls_playlist_type", "event",
+            "-hls_segment_type", "fmp4",
+            "-hls_fmp4_init_filename", f"{os.path.basename(segment_stem)}_init.mp4",
+            "-hls_segment_filename", f"{segment_stem}_%05d.m4s",
+            playlist_path,
+        ], playlist_path
+
+    raise ValueError(f"Unknown output format: {output_format}")
+
+
 def process_and_combine_videos(
     left_video_path, left_start_time,
     right_video_path, right_start_time,
@@ -20,45 +250,49 @@ def process_and_combine_videos(
     preset="medium",
     use_hwaccel=False,
     single_pass=True,
+    drift_map_path=None,
+    crf=18,
+    output_format="mp4",
+    audio_mode="mix",
+    audio_codec="copy",
+    audio_timing=False,
 ):
-    left_available_duration = get_video_duration(left_video_path) - left_start_time
-    right_available_duration = get_video_duration(right_video_path) - right_start_time
+    drift_segments = None
+    if drift_map_path is not None:
+        if not single_pass:
+            raise ValueError("A drift map can only be applied by the single-pass renderer.")
+        drift_segments = load_drift_segments(drift_map_path, left_start_time, right_start_time)
 
     # Only process up to the shortest available duration (or output_length if specified)
-    final_duration = min(left_available_duration, right_available_duration)
-    if output_length is not None:
-        final_duration = min(final_duration, output_length)
+    final_duration = output_duration(left_video_path, left_start_time, right_video_path, right_start_time, output_length, drift_segments)
 
     video_encoder = "h264_videotoolbox" if use_hwaccel else "libx264"
     # VideoToolbox uses -q:v (quality scale) instead of -crf
-    quality_args = ["-q:v", "50"] if use_hwaccel else ["-crf", "18"]
+    quality_args = ["-q:v", "50"] if use_hwaccel else ["-crf", str(crf)]
+    output_args, watch_path = output_container_args(output_format, output_path)
+    if output_format != "mp4":
+        print(f"Progressive output: {watch_path} can be opened while the render is running.")
+    audio_inputs, graph_audio_mode, audio_args = audio_stream_args(
+        audio_mode, audio_codec, left_video_path, left_start_time, right_video_path, right_start_time, final_duration, drift_segments,
+    )
 
     if single_pass:
         # --------------- Single-pass: crop + hstack + encode in one ffmpeg call ---------------
         # This avoids writing/reading two intermediate files and re-encoding a third time.
-        filter_complex = (
-            f"[0:v]trim=start={left_start_time}:duration={final_duration},setpts=PTS-STARTPTS,"
-            f"crop=in_w*0.75:in_h,scale=960:-1,pad=960:1080:(ow-iw)/2:(oh-ih)/2:black[left];"
-            f"[1:v]trim=start={right_start_time}:duration={final_duration},setpts=PTS-STARTPTS,"
-            f"crop=in_w*0.75:in_h,scale=960:-1,pad=960:1080:(ow-iw)/2:(oh-ih)/2:black[right];"
-            f"[left][right]hstack=inputs=2[v];"
-            f"[0:a]atrim=start={left_start_time}:duration={final_duration},asetpts=PTS-STARTPTS[al];"
-            f"[1:a]atrim=start={right_start_time}:duration={final_duration},asetpts=PTS-STARTPTS[ar];"
-            f"[al][ar]amix=inputs=2:duration=first:dropout_transition=3[a]"
-        )
+        filter_complex = single_pass_filter_complex(left_start_time, right_start_time, final_duration, drift_segments, graph_audio_mode)
         cmd = [
             "ffmpeg",
             "-i", left_video_path,
             "-i", right_video_path,
+        ] + audio_inputs + [
             "-filter_complex", filter_complex,
-            "-map", "[v]", "-map", "[a]",
+            "-map", "[v]",
             "-c:v", video_encoder,
         ] + quality_args + [
             "-preset", preset,  # ignored by videotoolbox but harmless
-            "-c:a", "aac", "-b:a", "192k",
+        ] + audio_args + [
             "-threads", "0",
-            output_path
-        ]
+        ] + output_args
         # Remove -preset for hwaccel (VideoToolbox doesn't support it)
         if use_hwaccel:
             cmd = [x for x in cmd if x != "-preset" and x != preset]
@@ -82,6 +316,8 @@ def process_and_combine_videos(
 
         def process_side(label, in_path, start_sec, out_path):
             t0 = time.time()
+            # The side's audio is copied as is and only encoded once, in the combine step; unused audio is dropped
+            side_audio_args = ["-c:a", "copy"] if audio_mode in ("mix", label) else ["-an"]
             crop_cmd = [
                 "ffmpeg", "-i", in_path, "-ss", str(start_sec),
                 "-vf", "crop=in_w*0.75:in_h,scale=960:-1,pad=960:1080:(ow-iw)/2:(oh-ih)/2:black",
@@ -89,6 +325,7 @@ def process_and_combine_videos(
                 "-c:v", video_encoder,
             ] + quality_args + [
                 "-preset", preset,
+            ] + side_audio_args + [
                 "-threads", "0", out_path
             ]
             if use_hwaccel:
@@ -111,17 +348,27 @@ def process_and_combine_videos(
             raise RuntimeError(f"Side processing failed: {exceptions}")
 
         # Combine videos (stream-copy video from already-encoded temp files, re-encode audio only)
+        combine_filter = "[0:v][1:v]hstack=inputs=2:shortest=1[v]"
+        if audio_mode == "mix":
+            combine_filter += ";[0:a][1:a]amix=inputs=2:duration=first:dropout_transition=3[a]"
+            combine_audio_args = ["-map", "[a]", "-c:a", "aac", "-b:a", "192k"]
+        elif audio_mode in ("left", "right"):
+            audio_input = "0:a:0" if audio_mode == "left" else "1:a:0"
+            codec_args = ["-c:a", "copy"] if audio_codec == "copy" else ["-c:a", "aac", "-b:a", "192k"]
+            combine_audio_args = ["-map", audio_input] + codec_args
+        else:
+            combine_audio_args = ["-an"]
         start_time = time.time()
         combine_cmd = [
             "ffmpeg", "-i", left_temp, "-i", right_temp,
-            "-filter_complex", "[0:v][1:v]hstack=inputs=2:shortest=1[v];[0:a][1:a]amix=inputs=2:duration=first:dropout_transition=3[a]",
-            "-map", "[v]", "-map", "[a]",
+            "-filter_complex", combine_filter,
+            "-map", "[v]",
             "-c:v", video_encoder,
         ] + quality_args + [
             "-preset", preset,
-            "-c:a", "aac", "-b:a", "192k",
-            "-threads", "0", output_path
-        ]
+        ] + combine_audio_args + [
+            "-threads", "0",
+        ] + output_args
         if use_hwaccel:
             combine_cmd = [x for x in combine_cmd if x != "-preset" and x != preset]
 
@@ -130,16 +377,33 @@ def process_and_combine_videos(
 
         subprocess.run(["rm", left_temp, right_temp])
 
-        wall_time = max(timings["left"], timings["right"]) + combine_time
+        total_time = max(timings["left"], timings["right"]) + combine_time
         print("\nProcessing Times (parallel three-step):")
         print(f"Left video processing time:  {timings['left']:.2f} seconds")
         print(f"Right video processing time: {timings['right']:.2f} seconds")
         print(f"Video combining time:        {combine_time:.2f} seconds")
-        print(f"Wall-clock total time:       {wall_time:.2f} seconds  (left+right ran in parallel)")
+        print(f"Wall-clock total time:       {total_time:.2f} seconds  (left+right ran in parallel)")
         print(f"Video duration: {final_duration:.2f} seconds")
-        efficiency = wall_time / final_duration * 100
+        efficiency = total_time / final_duration * 100
         print(f"Efficiency: {efficiency:.2f}% of the final output video duration")
 
+    if audio_timing and audio_mode != "none":
+        # Measured after the render, so it does not compete with it for the CPU
+        if single_pass:
+            audio_wall_time, audio_cpu_time = measure_audio_path(
+                left_video_path, left_start_time, right_video_path, right_start_time,
+                final_duration, drift_segments, audio_inputs, graph_audio_mode, audio_args,
+            )
+            audio_encoded = graph_audio_mode != "none"
+        else:
+            audio_wall_time, audio_cpu_time = measure_three_step_audio_path(
+                left_video_path, left_start_time, right_video_path, right_start_time, final_duration, audio_mode, audio_codec,
+            )
+            audio_encoded = audio_mode == "mix" or audio_codec == "aac"
+        print(f"Audio path ({audio_mode}, {'AAC encode' if audio_encoded else 'copy'}) on its own: "
+              f"{audio_wall_time:.2f} seconds wall-clock, {audio_cpu_time:.2f} seconds CPU "
+              f"({audio_wall_time / total_time * 100:.1f}% of the render time)")
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
@@ -156,6 +420,18 @@ if __name__ == "__main__":
         choices=["ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow"],
         help="libx264 encoding preset (default: medium). Use 'fast' or 'ultrafast' for maximum speed."
     )
+    parser.add_argument(
+        "--output_format", default="mp4", choices=["mp4", "fmp4", "hls"],
+        help="mp4: regular MP4 (default). fmp4: fragmented MP4 that can be watched while rendering and survives interruptions. "
+             "hls: HLS playlist (.m3u8) with fragmented MP4 segments, updated as the render progresses."
+    )
+    parser.add_argument("--crf", type=int, default=18, help="libx264 constant rate factor (default: 18). Lower is better quality and larger.")
+    parser.add_argument(
+        "--auto_tune", type=float, default=None, metavar="TIME_BUDGET",
+        help="Pick --preset and --crf automatically: the slowest preset that renders within TIME_BUDGET seconds "
+             "and keeps --min_ssim (see f1_23_encoder_autotune.py)."
+    )
+    parser.add_argument("--min_ssim", type=float, default=0.97, help="Quality floor for --auto_tune (default: 0.97).")
     parser.add_argument(
         "--hwaccel", action="store_true",
         help="Use macOS VideoToolbox hardware H.264 encoder (h264_videotoolbox) for near-realtime encoding."
@@ -165,9 +441,38 @@ if __name__ == "__main__":
         help="Use the older three-step approach (process left, process right, combine) with parallel left/right encoding. "
              "By default the faster single-pass mode is used."
     )
+    parser.add_argument(
+        "--audio", default="mix", choices=AUDIO_MODES,
+        help="mix: mix both commentary tracks (default). left / right: only that video's audio. none: no audio."
+    )
+    parser.add_argument(
+        "--audio_codec", default="copy", choices=["copy", "aac"],
+        help="For --audio left/right: copy the track without decoding it (default), or re-encode it to AAC 192k "
+             "(e.g. if the source codec does not fit the output container). --audio mix is always encoded to AAC."
+    )
+    parser.add_argument(
+        "--audio_timing", action="store_true",
+        help="After the render, run its audio path (single-pass or three-step) on its own and report how long it takes."
+    )
+    parser.add_argument(
+        "--drift_map", default=None,
+        help="Drift map from f1_23_drift_map.py. The right video is cut into segments with their own offsets (single-pass mode only)."
+    )
 
     args = parser.parse_args()
 
+    if args.auto_tune is not None:
+        if args.hwaccel:
+            parser.error("--auto_tune tunes libx264 and cannot be combined with --hwaccel")
+        from f1_23_encoder_autotune import auto_tune_encoder, print_results
+
+        chosen, results = auto_tune_encoder(
+            args.left_video_path, args.left_start_time, args.right_video_path, args.right_start_time, args.auto_tune,
+            min_ssim=args.min_ssim, output_length=args.output_length, drift_map_path=args.drift_map,
+        )
+        print_results(results, chosen)
+        args.preset, args.crf = chosen["preset"], chosen["crf"]
+
     process_and_combine_videos(
         args.left_video_path, args.left_start_time,
         args.right_video_path, args.right_start_time,
@@ -175,4 +480,10 @@ if __name__ == "__main__":
         preset=args.preset,
         use_hwaccel=args.hwaccel,
         single_pass=not args.three_step,
+        drift_map_path=args.drift_map,
+        crf=args.crf,
+        output_format=args.output_format,
+        audio_mode=args.audio,
+        audio_codec=args.audio_codec,
+        audio_timing=args.audio_timing,
     )
@@ -0,0 +1,47 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from benchmark_cli_startup import HEAVY_MODULES, LIGHT_COMMANDS, REPO_DIR
+from f1_23_ingest import file_stat, manifest_path
+
+# Prints the heavy modules loaded after running the snippet passed in as a string
+PROBE = """
+import json, sys
+try:
+    exec({snippet!r})
+except SystemExit:
+    pass
+print(json.dumps(sorted({{name.split(".")[0] for name in sys.modules}} & set({heavy!r}))))
+"""
+
+
+def heavy_modules_loaded(snippet):
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(snippet=snippet, heavy=HEAVY_MODULES)],
+        cwd=REPO_DIR, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+@pytest.mark.parametrize("command", LIGHT_COMMANDS)
+def test_light_command_help_loads_no_heavy_modules(command):
+    assert heavy_modules_loaded(f"import f1_23; f1_23.main([{command!r}, '--help'])") == []
+
+
+def test_ingest_manifest_readers_load_no_heavy_modules(tmp_path):
+    video_path = tmp_path / "race.mp4"
+    video_path.write_bytes(b"")
+    mask_path, reference_path = tmp_path / "mask.png", tmp_path / "reference.jpg"
+    mask_path.write_bytes(b"")
+    reference_path.write_bytes(b"")
+    with open(manifest_path(str(video_path)), "w") as f:
+        json.dump({"video_stat": file_stat(str(video_path)), "start": {"options": {}, "result": {}}}, f)
+    snippet = (
+        "from f1_23_ingest import load_ingested_start, load_manifest\n"
+        f"load_manifest({str(video_path)!r})\n"
+        f"load_ingested_start({str(video_path)!r}, {str(mask_path)!r}, {str(reference_path)!r})\n"
+    )
+    assert heavy_modules_loaded(snippet) == []
@@ -0,0 +1,38 @@
+import subprocess
+
+import pytest
+
+from f1_create_split_screen_video import measure_three_step_audio_path
+
+BENCH = "bench: utime={cpu}s stime=0.000s rtime={wall}s\n"
+
+
+@pytest.fixture
+def ffmpeg_calls(monkeypatch):
+    """Record the ffmpeg commands; side copies take 1 s, the combine step 2 s."""
+    calls = []
+
+    def run(cmd, **kwargs):
+        calls.append(cmd)
+        seconds = 2.0 if "-map" in cmd else 1.0
+        return subprocess.CompletedProcess(cmd, 0, stderr=BENCH.format(cpu=seconds, wall=seconds))
+
+    monkeypatch.setattr(subprocess, "run", run)
+    return calls
+
+
+def test_three_step_mix_timing_copies_both_sides_then_encodes(ffmpeg_calls):
+    wall_time, cpu_time = measure_three_step_audio_path("left.mp4", 10.0, "right.mp4", 12.0, 60.0, "mix", "copy")
+
+    side_copies, combine = ffmpeg_calls[:-1], ffmpeg_calls[-1]
+    assert len(side_copies) == 2 and all(cmd[cmd.index("-c:a") + 1] == "copy" for cmd in side_copies)
+    assert "amix" in combine[combine.index("-filter_complex") + 1] and combine[combine.index("-c:a") + 1] == "aac"
+    # The side copies run in parallel in the render
+    assert (wall_time, cpu_time) == (3.0, 4.0)
+
+
+def test_three_step_single_track_timing_reads_only_that_side(ffmpeg_calls):
+    measure_three_step_audio_path("left.mp4", 10.0, "right.mp4", 12.0, 60.0, "right", "copy")
+
+    assert all("left.mp4" not in cmd for cmd in ffmpeg_calls)
+    assert ffmpeg_calls[-1][ffmpeg_calls[-1].index("-c:a") + 1] == "copy"
@@ -0,0 +1,38 @@
+from f1_23_drift_map import build_segments
+from f1_create_split_screen_video import right_segment_filters
+
+FRAME_DURATION = 1 / 60
+
+
+def checkpoint(time, offset, confidence=1.0):
+    return {"time": time, "offset": offset, "confidence": confidence}
+
+
+def test_constant_offset_is_one_segment():
+    segments = build_segments([checkpoint(0.0, 0.0), checkpoint(30.0, 0.0)], 60.0, FRAME_DURATION, 0.5)
+    assert segments == [{"start": 0.0, "end": 60.0, "offset": 0.0}]
+
+
+def test_offset_change_splits_halfway_between_checkpoints():
+    segments = build_segments([checkpoint(0.0, 0.0), checkpoint(30.0, 2.0)], 60.0, FRAME_DURATION, 0.5)
+    assert [(s["start"], s["end"]) for s in segments] == [(0.0, 15.0), (15.0, 60.0)]
+    assert abs(segments[1]["offset"] - 2.0) < FRAME_DURATION
+
+
+def test_nonzero_offset_at_first_checkpoint_has_no_empty_segment():
+    segments = build_segments([checkpoint(0.0, 10.0), checkpoint(30.0, 10.0)], 60.0, FRAME_DURATION, 0.5)
+    assert len(segments) == 1
+    assert segments[0]["start"] == 0.0 and segments[0]["end"] == 60.0
+    assert abs(segments[0]["offset"] - 10.0) < FRAME_DURATION
+
+
+def test_low_confidence_checkpoints_keep_the_previous_offset():
+    segments = build_segments([checkpoint(0.0, 0.0), checkpoint(30.0, 5.0, confidence=0.1)], 60.0, FRAME_DURATION, 0.5)
+    assert segments == [{"start": 0.0, "end": 60.0, "offset": 0.0}]
+
+
+def test_right_segment_filters_skip_zero_length_segments():
+    segments = [{"start": 0.0, "end": 0.0, "offset": 10.0}, {"start": 0.0, "end": 60.0, "offset": 10.0}]
+    video_chain, audio_chain = right_segment_filters(0.0, 60.0, segments)
+    assert "duration=0.0" not in video_chain and "duration=0.0" not in audio_chain
+    assert "split=1" in video_chain
@@ -0,0 +1,71 @@
+import cv2
+import numpy as np
+import pytest
+
+from f1_23_index_scenes import HISTOGRAM_BINS, build_scene_index, candidate_frame_ranges, save_scene_index
+from f1_23_search_matching_frame import find_matching_frames
+from f1_23_search_start_frame import find_start_frame
+
+
+def scene_index(histograms, shot_starts):
+    return {
+        "fps": 30.0,
+        "histograms": np.asarray(histograms, dtype=np.float32),
+        "red_scores": np.zeros(len(histograms), dtype=np.float32),
+        "shot_starts": np.asarray(shot_starts, dtype=np.int32),
+    }
+
+
+def one_bin_histograms(frame_count, histogram_bin):
+    histograms = np.zeros((frame_count, HISTOGRAM_BINS), dtype=np.float32)
+    histograms[:, histogram_bin] = 1.0
+    return histograms
+
+
+@pytest.fixture
+def dark_video(tmp_path):
+    """40 dark frames (a moving square on black) with a scene index whose histograms are all white, so it rejects every shot."""
+    video_path = str(tmp_path / "dark.avi")
+    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+    for i in range(40):
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        frame[10:30, i:i + 20] = 60
+        writer.write(frame)
+    writer.release()
+
+    index = build_scene_index(video_path, str(tmp_path / "missing_mask.png"))
+    index["histograms"] = one_bin_histograms(len(index["histograms"]), HISTOGRAM_BINS - 1)
+    save_scene_index(video_path, index)
+    return video_path
+
+
+def test_candidate_frame_ranges_keeps_matching_shots():
+    histograms = np.concatenate((one_bin_histograms(10, 0), one_bin_histograms(10, HISTOGRAM_BINS - 1)))
+    reference = np.zeros((8, 8), dtype=np.uint8)
+    assert candidate_frame_ranges(scene_index(histograms, [0, 10]), 0, 20, reference_image=reference) == [(0, 10)]
+
+
+def test_candidate_frame_ranges_falls_back_when_every_shot_is_rejected():
+    index = scene_index(one_bin_histograms(20, HISTOGRAM_BINS - 1), [0, 10])
+    reference = np.zeros((8, 8), dtype=np.uint8)
+    assert candidate_frame_ranges(index, 5, 15, reference_image=reference) == []
+    assert candidate_frame_ranges(index, 5, 15, reference_image=reference, fall_back_to_window=True) == [(5, 15)]
+
+
+def test_start_search_falls_back_when_the_scene_index_rejects_everything(dark_video, tmp_path):
+    mask_path, reference_path = str(tmp_path / "mask.png"), str(tmp_path / "reference.png")
+    mask = np.zeros((48, 64), dtype=np.uint8)
+    mask[10:30, 20:40] = 255
+    cv2.imwrite(mask_path, mask)
+    reference = np.zeros((48, 64, 3), dtype=np.uint8)
+    reference[10:30, 20:40] = 60
+    cv2.imwrite(reference_path, reference)
+
+    result = find_start_frame(dark_video, mask_path, reference_path, use_scene_index=True)
+    assert result["frame_number"] == 20
+
+
+def test_matching_search_falls_back_when_the_scene_index_rejects_everything(dark_video):
+    match = find_matching_frames(dark_video, dark_video, 1.0, 0.0, 0.0, show_progress=False, use_scene_index=True)
+    assert match is not None
+    assert match["frame_number_video1"] == match["frame_number_video2"] == 0
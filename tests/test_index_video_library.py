@@ -0,0 +1,17 @@
+import numpy as np
+
+from f1_23_index_video_library import load_index, save_index
+
+
+def test_index_saved_without_extension_is_found_again(tmp_path):
+    index_path = str(tmp_path / "library_index")
+    index = load_index(index_path)
+    index["videos"]["race.mp4"] = (1234.0, 5678.0)
+    index["hashes"] = np.ones((1, 8), dtype=np.uint8)
+    index["video_ids"] = np.zeros(1, dtype=np.int32)
+    index["times"] = np.zeros(1, dtype=np.float32)
+
+    save_index(index_path, index)
+
+    assert (tmp_path / "library_index.npz").exists()
+    assert load_index(index_path)["videos"] == {"race.mp4": (1234.0, 5678.0)}
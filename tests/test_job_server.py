@@ -0,0 +1,44 @@
+import cv2
+import numpy as np
+
+import f1_23_job_server
+from f1_23_index_scenes import scene_index_path
+from f1_23_job_server import job_cache_key, run_match_job
+
+
+def moving_square_video(path, frame_count=30):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (256, 192))
+    for i in range(frame_count):
+        frame = np.full((192, 256, 3), 40, dtype=np.uint8)
+        frame[40:120, 4 * i:4 * i + 60] = 220
+        writer.write(frame)
+    writer.release()
+
+
+def test_cache_key_follows_the_scene_index_only_when_the_job_uses_it(tmp_path):
+    video_path = str(tmp_path / "race.avi")
+    open(video_path, "wb").close()
+    job = {"type": "match", "video1_path": video_path, "video2_path": video_path, "scene_index": True}
+    key_before = job_cache_key(job)
+    key_without_index = job_cache_key({**job, "scene_index": False})
+
+    with open(scene_index_path(video_path), "wb") as f:
+        f.write(b"index")
+
+    assert job_cache_key(job) != key_before
+    assert job_cache_key({**job, "scene_index": False}) == key_without_index
+
+
+def test_match_jobs_reuse_the_warm_video_handles(tmp_path, monkeypatch):
+    monkeypatch.setattr(f1_23_job_server, "_video_handles", None)
+    video1_path, video2_path = str(tmp_path / "left.avi"), str(tmp_path / "right.avi")
+    moving_square_video(video1_path)
+    moving_square_video(video2_path)
+    job = {"type": "match", "video1_path": video1_path, "video2_path": video2_path, "duration": 0.5}
+
+    results = [run_match_job(job) for _ in range(2)]
+
+    assert results[0] == results[1]
+    assert results[0]["frame_number_video1"] == results[0]["frame_number_video2"] == 0
+    assert f1_23_job_server._video_handles.stats()["misses"] == 2
+    assert f1_23_job_server._video_handles.stats()["hits"] == 2
@@ -0,0 +1,40 @@
+import os
+
+import cv2
+import numpy as np
+
+from f1_23_mask_indices import load_mask_indices, save_mask_indices
+from f1_23_search_start_frame import compile_mask_and_reference
+
+
+def saved_mask(tmp_path, indices_mask):
+    """An all-black mask.png with sparse indices saved from indices_mask."""
+    mask_path = str(tmp_path / "mask.png")
+    cv2.imwrite(mask_path, np.zeros(indices_mask.shape, dtype=np.uint8))
+    save_mask_indices(mask_path, indices_mask)
+    return mask_path
+
+
+def test_mask_indices_older_than_the_mask_image_are_ignored(tmp_path):
+    indices_mask = np.zeros((24, 32), dtype=np.uint8)
+    indices_mask[0, :3] = 255
+    mask_path = saved_mask(tmp_path, indices_mask)
+
+    assert np.count_nonzero(load_mask_indices(mask_path, 32, 24)) == 3
+    assert load_mask_indices(mask_path, 64, 48) is None
+
+    mask_mtime = os.path.getmtime(str(tmp_path / "mask_indices.npz")) + 10
+    os.utime(mask_path, (mask_mtime, mask_mtime))
+    assert load_mask_indices(mask_path, 32, 24) is None
+
+
+def test_start_search_uses_the_mask_indices(tmp_path):
+    indices_mask = np.zeros((24, 32), dtype=np.uint8)
+    indices_mask[4:8, 10:20] = 255
+    mask_path = saved_mask(tmp_path, indices_mask)
+    reference_path = str(tmp_path / "reference.png")
+    cv2.imwrite(reference_path, np.zeros((24, 32, 3), dtype=np.uint8))
+
+    indices, _ = compile_mask_and_reference(mask_path, reference_path, 32, 24)
+
+    assert np.array_equal(indices, np.flatnonzero(indices_mask))
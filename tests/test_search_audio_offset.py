@@ -0,0 +1,26 @@
+import subprocess
+
+import pytest
+
+from f1_23_search_audio_offset import extract_audio
+
+
+def failing_ffmpeg(monkeypatch, stderr):
+    def run(cmd, **kwargs):
+        raise subprocess.CalledProcessError(1, cmd, stderr=stderr)
+
+    monkeypatch.setattr(subprocess, "run", run)
+
+
+def test_video_without_audio_gives_no_samples(monkeypatch, capsys):
+    failing_ffmpeg(monkeypatch, b"Output file #0 does not contain any stream\n")
+
+    assert len(extract_audio("silent.mp4", 0, 10, 4000)) == 0
+    assert "No audio stream in silent.mp4" in capsys.readouterr().out
+
+
+def test_other_ffmpeg_failures_are_raised(monkeypatch):
+    failing_ffmpeg(monkeypatch, b"missing.mp4: No such file or directory\n")
+
+    with pytest.raises(subprocess.CalledProcessError):
+        extract_audio("missing.mp4", 0, 10, 4000)
@@ -0,0 +1,91 @@
+import types
+
+import cv2
+import numpy as np
+import pytest
+
+from f1_23_proxy_frames import build_proxy
+from f1_23_search_frame import VideoFrameExtractor
+
+FPS = 30
+
+
+def red_light_video(path, lights_out_frame, frame_count, is_red=None):
+    """Solid red frames up to lights_out_frame (or where is_red(frame number) holds), black frames otherwise."""
+    is_red = is_red or (lambda frame_number: frame_number < lights_out_frame)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), FPS, (32, 24))
+    for frame_number in range(frame_count):
+        frame = np.zeros((24, 32, 3), dtype=np.uint8)
+        if is_red(frame_number):
+            frame[:, :, 2] = 255
+        writer.write(frame)
+    writer.release()
+
+
+def headless_extractor(video_path):
+    """A VideoFrameExtractor without a Tk window, with the red score read from the red channel."""
+    extractor = VideoFrameExtractor.__new__(VideoFrameExtractor)
+    extractor.vid_cap = cv2.VideoCapture(video_path)
+    extractor.fps = FPS
+    extractor.total_frames = int(extractor.vid_cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    extractor.current_frame = 0
+    extractor.mask_pixels = np.zeros(1, dtype=np.intp)
+    extractor.mask_pixel_count = 1
+    extractor.scan_frame = None
+    extractor.scene_index = None
+    extractor.proxy = None
+    extractor.proxy_red_scorer = None
+    extractor.min_red_score = 0.3
+    extractor.red_scan_min_stride_seconds = 0.5
+    extractor.red_scan_max_stride_seconds = 2.0
+    extractor.red_scan_min_lights_on_seconds = 1.0
+    extractor.red_scan_start_frame = 0
+    extractor.red_scan_max_decode_gap_seconds = 1.0
+    extractor.consecutive_drop_frames_required = 2
+    extractor.status_label = types.SimpleNamespace(config=lambda **kwargs: None)
+    extractor.update_idletasks = lambda: None
+    extractor.show_frame = lambda: None
+    extractor.calculate_red_score = lambda frame: float(frame[:, :, 2].mean()) / 255.0
+    return extractor
+
+
+# 60 is a stride sample (every 15 frames at 30 fps), 61 is not
+@pytest.mark.parametrize("lights_out_frame", [60, 61])
+def test_lights_out_is_confirmed_on_and_between_stride_samples(tmp_path, capsys, lights_out_frame):
+    video_path = str(tmp_path / "lights.avi")
+    red_light_video(video_path, lights_out_frame, 300)
+    extractor = headless_extractor(video_path)
+
+    extractor.auto_detect_red_frame()
+
+    assert extractor.current_frame == lights_out_frame - 1
+    assert extractor.red_scan_start_frame == lights_out_frame + 1
+    assert "No confirmed lights-out" not in capsys.readouterr().out
+
+
+def test_unconfirmed_peak_is_refined_only_up_to_the_next_sample_without_red(tmp_path):
+    video_path = str(tmp_path / "flicker.avi")
+    # Red on every other frame: no two dark frames in a row ever confirm a drop
+    red_light_video(video_path, None, 300, is_red=lambda frame_number: frame_number % 2 == 0)
+    extractor = headless_extractor(video_path)
+
+    extractor.auto_detect_red_frame()
+
+    assert extractor.red_scan_start_frame == extractor.total_frames
+    # The peak at frame 0 is refined up to the dark sample at frame 15, not to the end of the video
+    assert extractor.scan_frames_decoded < 100
+
+
+def test_red_scan_samples_the_proxy_and_decodes_only_the_refinement(tmp_path):
+    video_path = str(tmp_path / "lights.avi")
+    red_light_video(video_path, 60, 300)
+    decoded = headless_extractor(video_path)
+    decoded.auto_detect_red_frame()
+
+    extractor = headless_extractor(video_path)
+    extractor.proxy = build_proxy(video_path, scale=0.5, duration=None)
+    extractor.proxy_red_scorer = types.SimpleNamespace(score=extractor.calculate_red_score)
+    extractor.auto_detect_red_frame()
+
+    assert extractor.current_frame == decoded.current_frame == 59
+    assert extractor.scan_frames_decoded < decoded.scan_frames_decoded